@@ -0,0 +1,240 @@
+import abc
+
+from autodocstrings.errors import CompletionError
+from typing import Any, Dict, List, Mapping, Optional
+
+
+class RetryableError(Exception):
+    """
+    A failed completion request that may succeed if it is sent again later.
+
+    Parameters:
+    - reason (str): Why the request failed.
+    - retry_after (Optional[float]): The delay in seconds requested by the server before retrying, if any.
+    """
+
+    def __init__(self, reason: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+def _retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Get the delay requested by the server before retrying a throttled request.
+
+    Parameters:
+    - headers (Optional[Mapping[str, str]]): The headers of the response to the throttled request.
+
+    Returns:
+    - Optional[float]: The delay in seconds, or None if the server did not request one.
+    """
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+    try:
+        return float(headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _check_completions(
+    completions: List[str], prompts: List[str], api: str
+) -> List[str]:
+    """
+    Check that the response to a batch of prompts holds a completion per prompt, raising CompletionError otherwise.
+
+    Parameters:
+    - completions (List[str]): The completions of the response.
+    - prompts (List[str]): The prompts of the batch.
+    - api (str): The name of the API, for the error message.
+
+    Returns:
+    - List[str]: The completions.
+    """
+    if len(completions) != len(prompts):
+        # Some OpenAI-compatible servers only complete the first prompt of a batch
+        raise CompletionError(
+            f"{api} answered {len(completions)} completions to {len(prompts)} prompts,"
+            " it may only support a batch size of 1"
+        )
+    return completions
+
+
+class CompletionBackend(abc.ABC):
+    """
+    Client of a text completion API, which completes a batch of prompts in a single request.
+    """
+
+    @abc.abstractmethod
+    def complete(
+        self, model: str, prompts: List[str], parameters: Dict[str, Any]
+    ) -> List[str]:
+        """
+        Complete a batch of prompts.
+
+        Raises RetryableError if the request may succeed when sent again later, and
+        CompletionError if the API does not answer a completion per prompt.
+
+        Parameters:
+        - model (str): The model completing the prompts.
+        - prompts (List[str]): The prompts to complete.
+        - parameters (Dict[str, Any]): The sampling parameters of the request.
+
+        Returns:
+        - List[str]: The completion of every prompt, in the same order.
+        """
+
+    def close(self) -> None:
+        """
+        Release the connections of the client.
+        """
+
+    def __enter__(self) -> "CompletionBackend":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class OpenAIBackend(CompletionBackend):
+    """
+    Completion backend using the OpenAI Python client.
+
+    The client is only imported by the first request, as it takes longer to load than
+    most runs spend parsing.
+
+    Parameters:
+    - api_key (Optional[str]): The OpenAI API key. The key configured in the openai module is used if not provided.
+    """
+
+    def __init__(self, api_key: Optional[str] = None) -> None:
+        self.api_key = api_key
+
+    def complete(
+        self, model: str, prompts: List[str], parameters: Dict[str, Any]
+    ) -> List[str]:
+        import openai
+
+        from openai.error import (
+            OpenAIError,
+            RateLimitError,
+            ServiceUnavailableError,
+        )
+
+        try:
+            completions = openai.Completion.create(
+                engine=model, prompt=prompts, api_key=self.api_key, **parameters
+            )
+        except RateLimitError as error:
+            raise RetryableError(
+                "OpenAI rate limit reached", _retry_after(error.headers)
+            ) from error
+        except ServiceUnavailableError as error:
+            raise RetryableError(
+                "OpenAI API unavailable", _retry_after(error.headers)
+            ) from error
+        except OpenAIError as error:
+            # The request was rejected, such as for an invalid API key
+            raise CompletionError(f"The OpenAI API failed: {error}") from error
+
+        # The index of every choice is the position of its prompt in the batch
+        choices = sorted(completions.choices, key=lambda choice: choice.index)
+        return _check_completions(
+            [choice.text for choice in choices], prompts, "The OpenAI API"
+        )
+
+
+class HTTPBackend(CompletionBackend):
+    """
+    Completion backend sending requests to an OpenAI-compatible API over a pool of keep-alive connections.
+
+    The connections are reused by the following requests, so that only the first
+    requests pay for the TCP and TLS handshakes.
+
+    Parameters:
+    - base_url (str): The base URL of the API, such as https://api.openai.com/v1.
+    - api_key (Optional[str]): The API key sent as a bearer token, if any.
+    - pool_size (int): The maximum number of connections kept open, which should be the maximum number of requests in flight.
+    - timeout (float): The time in seconds after which a request is abandoned.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        pool_size: int = 1,
+        timeout: float = 60.0,
+    ) -> None:
+        import requests
+
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._session.mount(
+            self.base_url,
+            HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True),
+        )
+        if api_key is not None:
+            self._session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def complete(
+        self, model: str, prompts: List[str], parameters: Dict[str, Any]
+    ) -> List[str]:
+        import requests
+
+        try:
+            response = self._session.post(
+                f"{self.base_url}/completions",
+                json={"model": model, "prompt": prompts, **parameters},
+                timeout=self.timeout,
+            )
+        except requests.Timeout as error:
+            raise RetryableError(
+                f"{self.base_url} did not answer within {self.timeout:g} seconds"
+            ) from error
+        except (
+            requests.ConnectionError,
+            requests.exceptions.ChunkedEncodingError,
+        ) as error:
+            # The connection failed or was dropped before the whole response was read
+            raise RetryableError(f"Lost the connection to {self.base_url}") from error
+        if response.status_code == 429 or response.status_code >= 500:
+            # The server is throttling or overloaded
+            raise RetryableError(
+                f"{self.base_url} answered {response.status_code}",
+                _retry_after(response.headers),
+            )
+        if not response.ok:
+            # The request was rejected, such as for an invalid API key
+            raise CompletionError(
+                f"{self.base_url} answered {response.status_code} {response.reason}"
+            )
+
+        # The index of every choice is the position of its prompt in the batch
+        choices = sorted(response.json()["choices"], key=lambda choice: choice["index"])
+        return _check_completions(
+            [choice["text"] for choice in choices], prompts, self.base_url
+        )
+
+    def close(self) -> None:
+        self._session.close()
+
+
+def make_backend(
+    api_key: Optional[str] = None, api_base: Optional[str] = None, pool_size: int = 1
+) -> CompletionBackend:
+    """
+    Create the client of the completion API of a run.
+
+    Parameters:
+    - api_key (Optional[str]): The API key. The key configured in the openai module is used if not provided.
+    - api_base (Optional[str]): The base URL of an OpenAI-compatible completion API. The OpenAI Python client is used if not provided.
+    - pool_size (int): The maximum number of requests in flight, which is the number of connections kept open to the API.
+
+    Returns:
+    - CompletionBackend: The client.
+    """
+    if api_base is not None:
+        # Keep one connection open for every request in flight
+        return HTTPBackend(api_base, api_key, pool_size=pool_size)
+    return OpenAIBackend(api_key)
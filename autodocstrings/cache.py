@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from typing import Any, Optional
+
+# Default number of docstrings kept in the cache
+DEFAULT_MAX_ENTRIES = 50000
+
+# Default age (in seconds) after which a cached docstring is discarded
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+
+
+class DocstringCache:
+    """
+    Persistent on-disk cache of generated docstrings, backed by SQLite.
+
+    Entries are content-addressed: the key is a hash of everything that influences the
+    generated docstring, so an entry never has to be invalidated, only evicted.
+
+    Parameters:
+    - cache_dir (str): The directory in which the cache database is stored.
+    - max_entries (int): The maximum number of docstrings kept. The least recently used ones are evicted first.
+    - max_age (float): The age in seconds after which a docstring is discarded.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_age: float = DEFAULT_MAX_AGE,
+    ) -> None:
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            os.path.join(cache_dir, "docstrings.sqlite3"), check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS docstrings (
+                key TEXT PRIMARY KEY,
+                docstring TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """)
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(**fields: Any) -> str:
+        """
+        Compute the cache key of a docstring request.
+
+        Parameters:
+        - **fields (Any): The JSON-serializable values that influence the generated docstring.
+
+        Returns:
+        - str: The hexadecimal SHA-256 digest of the fields.
+        """
+        payload = json.dumps(fields, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a docstring in the cache.
+
+        Parameters:
+        - key (str): The cache key of the docstring request.
+
+        Returns:
+        - Optional[str]: The cached docstring, or None if it is missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT docstring FROM docstrings WHERE key = ? AND created_at >= ?",
+                (key, now - self.max_age),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE docstrings SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+        return row[0]
+
+    def contains(self, key: str) -> bool:
+        """
+        Check whether a docstring is in the cache, without marking it as used.
+
+        Parameters:
+        - key (str): The cache key of the docstring request.
+
+        Returns:
+        - bool: Whether the docstring is cached and not expired.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM docstrings WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.max_age),
+            ).fetchone()
+        return row is not None
+
+    def set(self, key: str, docstring: str) -> None:
+        """
+        Store a docstring in the cache.
+
+        Parameters:
+        - key (str): The cache key of the docstring request.
+        - docstring (str): The generated docstring.
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO docstrings VALUES (?, ?, ?, ?)",
+                (key, docstring, now, now),
+            )
+            self._connection.commit()
+
+    def evict(self) -> None:
+        """
+        Remove the expired docstrings, then the least recently used ones above the size limit.
+        """
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM docstrings WHERE created_at < ?",
+                (time.time() - self.max_age,),
+            )
+            self._connection.execute(
+                """
+                DELETE FROM docstrings WHERE key IN (
+                    SELECT key FROM docstrings ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+            self._connection.commit()
+
+    def close(self, evict: bool = True) -> None:
+        """
+        Evict the stale docstrings and close the cache database.
+
+        Parameters:
+        - evict (bool): Whether to evict the stale docstrings before closing the database.
+        """
+        if evict:
+            self.evict()
+        self._connection.close()
+
+    def __enter__(self) -> "DocstringCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,277 @@
+import ast
+
+from autodocstrings.ratelimit import estimate_tokens
+from typing import Callable, List
+
+# The length above which string literals are shortened
+LONG_STRING = 80
+
+# The number of elements above which collection literals are shortened
+LONG_COLLECTION = 8
+
+# The nodes that define a new scope, whose exits do not leave the function
+SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+
+# The nodes through which a function hands something back to its caller
+EXITS = (ast.Return, ast.Raise, ast.Yield, ast.YieldFrom)
+
+
+def to_source(node: ast.AST) -> str:
+    """
+    Render an AST back to code.
+
+    astor renders the code the same way on every Python version, but not the syntax
+    added after it, such as match statements. The standard library renders those, as
+    the versions parsing them have ast.unparse.
+
+    Parameters:
+    - node (ast.AST): The AST.
+
+    Returns:
+    - str: The code, without leading and trailing whitespace.
+    """
+    # Only load astor for the rare functions which need to be rendered
+    import astor
+
+    try:
+        return astor.to_source(node).strip()
+    except AttributeError:
+        return ast.unparse(node).strip()
+
+
+def _ellipsis() -> ast.stmt:
+    """
+    Build the statement standing for elided code.
+
+    Returns:
+    - ast.stmt: The `...` statement.
+    """
+    return ast.Expr(ast.Constant(value=...))
+
+
+def _is_ellipsis(statement: ast.stmt) -> bool:
+    """
+    Check whether a statement stands for elided code.
+
+    Parameters:
+    - statement (ast.stmt): The statement.
+
+    Returns:
+    - bool: Whether the statement is `...`.
+    """
+    return (
+        isinstance(statement, ast.Expr)
+        and isinstance(statement.value, ast.Constant)
+        and statement.value.value is ...
+    )
+
+
+def _exits(node: ast.AST) -> bool:
+    """
+    Check whether a node returns, raises or yields, outside of the nested scopes.
+
+    Parameters:
+    - node (ast.AST): The node.
+
+    Returns:
+    - bool: Whether the node contains a return, raise or yield of the enclosing function.
+    """
+    if isinstance(node, EXITS):
+        return True
+    if isinstance(node, SCOPES):
+        return False
+    return any(_exits(child) for child in ast.iter_child_nodes(node))
+
+
+def _is_compound(statement: ast.stmt) -> bool:
+    """
+    Check whether a statement is a control flow statement with a body.
+
+    Parameters:
+    - statement (ast.stmt): The statement.
+
+    Returns:
+    - bool: Whether the statement has a body of statements and does not define a scope.
+    """
+    return hasattr(statement, "body") and not isinstance(statement, SCOPES)
+
+
+def _blocks(statement: ast.stmt) -> List[ast.AST]:
+    """
+    List the nodes of a control flow statement that hold a body.
+
+    Parameters:
+    - statement (ast.stmt): The control flow statement.
+
+    Returns:
+    - List[ast.AST]: The statement itself and its exception handlers or match cases.
+    """
+    return (
+        [statement]
+        + getattr(statement, "handlers", [])
+        + getattr(statement, "cases", [])
+    )
+
+
+def _prune_blocks(statement: ast.stmt) -> None:
+    """
+    Elide the statements that do not exit in every body of a control flow statement.
+
+    Parameters:
+    - statement (ast.stmt): The control flow statement, modified in place.
+    """
+    for block in _blocks(statement):
+        for field in ("body", "orelse", "finalbody"):
+            body = getattr(block, field, None)
+            if body:
+                setattr(block, field, _prune(body, keep_control_flow=False))
+
+
+def _prune(body: List[ast.stmt], keep_control_flow: bool) -> List[ast.stmt]:
+    """
+    Elide the statements of a body that do not exit, keeping the path to those that do.
+
+    Parameters:
+    - body (List[ast.stmt]): The statements.
+    - keep_control_flow (bool): Whether to keep the control flow statements that do not exit, with their bodies elided.
+
+    Returns:
+    - List[ast.stmt]: The statements, with every run of elided ones replaced by `...`.
+    """
+    pruned: List[ast.stmt] = []
+    for statement in body:
+        exits = _exits(statement)
+        if _is_compound(statement) and (exits or keep_control_flow):
+            _prune_blocks(statement)
+            pruned.append(statement)
+        elif exits:
+            pruned.append(statement)
+        elif not pruned or not _is_ellipsis(pruned[-1]):
+            pruned.append(_ellipsis())
+    return pruned
+
+
+def _elide_nested_bodies(function: ast.FunctionDef) -> None:
+    """
+    Elide the bodies of the functions and classes defined in a function.
+
+    Parameters:
+    - function (ast.FunctionDef): The function, modified in place.
+    """
+    for node in ast.walk(function):
+        if node is not function and isinstance(node, SCOPES[:3]):
+            node.body = [_ellipsis()]
+
+
+def _elide_long_literals(function: ast.FunctionDef) -> None:
+    """
+    Shorten the long string and collection literals of a function.
+
+    Parameters:
+    - function (ast.FunctionDef): The function, modified in place.
+    """
+    for node in ast.walk(function):
+        if (
+            isinstance(node, ast.Constant)
+            and isinstance(node.value, (str, bytes))
+            and len(node.value) > LONG_STRING
+        ):
+            ellipsis = "..." if isinstance(node.value, str) else b"..."
+            node.value = node.value[: LONG_STRING // 2] + ellipsis
+        elif (
+            isinstance(node, (ast.List, ast.Tuple, ast.Set))
+            and isinstance(getattr(node, "ctx", ast.Load()), ast.Load)
+            and len(node.elts) > LONG_COLLECTION
+        ):
+            node.elts = node.elts[:LONG_COLLECTION] + [ast.Constant(value=...)]
+        elif isinstance(node, ast.Dict) and len(node.keys) > LONG_COLLECTION:
+            # A missing key unpacks its value, which renders as **...
+            node.keys = node.keys[:LONG_COLLECTION] + [None]
+            node.values = node.values[:LONG_COLLECTION] + [ast.Constant(value=...)]
+
+
+def _elide_control_flow_bodies(function: ast.FunctionDef) -> None:
+    """
+    Elide the statements that do not exit in the bodies of the top-level control flow of a function.
+
+    Parameters:
+    - function (ast.FunctionDef): The function, modified in place.
+    """
+    for statement in function.body:
+        if _is_compound(statement):
+            _prune_blocks(statement)
+
+
+def _elide_statements(function: ast.FunctionDef) -> None:
+    """
+    Elide the top-level statements of a function that do not exit, keeping its control flow.
+
+    Parameters:
+    - function (ast.FunctionDef): The function, modified in place.
+    """
+    function.body = _prune(function.body, keep_control_flow=True)
+
+
+def _elide_control_flow(function: ast.FunctionDef) -> None:
+    """
+    Elide everything in a function but the statements that exit and the path to them.
+
+    Parameters:
+    - function (ast.FunctionDef): The function, modified in place.
+    """
+    function.body = _prune(function.body, keep_control_flow=False)
+
+
+def _elide_body(function: ast.FunctionDef) -> None:
+    """
+    Elide the whole body of a function, keeping its signature.
+
+    Parameters:
+    - function (ast.FunctionDef): The function, modified in place.
+    """
+    function.body = [_ellipsis()]
+
+
+# The compaction steps, from the least to the most lossy, each applied on top of the previous ones
+STEPS: List[Callable[[ast.FunctionDef], None]] = [
+    _elide_nested_bodies,
+    _elide_long_literals,
+    _elide_control_flow_bodies,
+    _elide_statements,
+    _elide_control_flow,
+    _elide_body,
+]
+
+
+def compact_code(code_block: str, max_tokens: int) -> str:
+    """
+    Shrink the code of a function step by step until it fits in a token budget.
+
+    The signature, type hints, decorators, and the return, raise and yield statements
+    are kept as long as possible, along with the control flow leading to them. The
+    nested function bodies, long literals and other statements are replaced by `...`.
+
+    Parameters:
+    - code_block (str): The dedented code of the function.
+    - max_tokens (int): The estimated number of tokens the code must fit in.
+
+    Returns:
+    - str: The code unchanged if it fits, else the first compacted version that fits, or the signature alone.
+    """
+    if estimate_tokens(code_block) <= max_tokens:
+        return code_block
+    try:
+        tree = ast.parse(code_block)
+    except SyntaxError:
+        return code_block
+    function = tree.body[0]
+    if len(tree.body) != 1 or not isinstance(
+        function, (ast.FunctionDef, ast.AsyncFunctionDef)
+    ):
+        return code_block
+    for step in STEPS:
+        step(function)
+        compacted = to_source(tree)
+        if estimate_tokens(compacted) <= max_tokens:
+            break
+    return compacted
@@ -0,0 +1,22 @@
+from typing import Optional
+
+# The colors of the messages, as named by typer
+RED = "red"
+GREEN = "green"
+YELLOW = "yellow"
+
+
+def secho(message: str, fg: Optional[str] = None) -> None:
+    """
+    Print a message to the standard output, in color if it is a terminal.
+
+    typer is only imported with the first message, so that the runs printing none, such
+    as those of --help or of an excluded file, do not pay for it.
+
+    Parameters:
+    - message (str): The message.
+    - fg (Optional[str]): The color of the message, one of RED, GREEN and YELLOW. The default color of the terminal is used if not provided.
+    """
+    import typer
+
+    typer.secho(message, fg=fg)
@@ -0,0 +1,35 @@
+class AutodocstringsError(Exception):
+    """
+    Error ending a run, which the command line prints before exiting with status 1.
+    """
+
+
+class ConfigurationError(AutodocstringsError):
+    """
+    Error raised when a run cannot start, such as an invalid input, a missing API key or an unknown git reference.
+    """
+
+
+class RetriesExceededError(AutodocstringsError):
+    """
+    Error raised when a completion request is still throttled after the maximum number of retries.
+    """
+
+
+class CompletionError(AutodocstringsError):
+    """
+    Error raised when the completion API rejects a request, such as for an invalid API key, or answers it with something else than a completion of every prompt.
+    """
+
+
+class FailedFilesError(AutodocstringsError):
+    """
+    Error raised once the other files are processed, when some files of a run could not be parsed.
+
+    Parameters:
+    - failed (int): The number of files which could not be parsed.
+    """
+
+    def __init__(self, failed: int) -> None:
+        super().__init__(f"Failed to parse {failed} files")
+        self.failed = failed
@@ -0,0 +1,240 @@
+import ast
+import re
+import time
+
+from autodocstrings.compaction import to_source
+from autodocstrings.patching import (
+    DocstringSlot,
+    function_source,
+    has_docstring,
+    line_offsets,
+    locate_docstring,
+)
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# A function definition, which always starts its own line
+FUNCTION_DEFINITION = re.compile(r"^[ \t\f]*def[ \t\f]+(\w+)", re.MULTILINE)
+
+
+class Candidate(NamedTuple):
+    """
+    A function whose docstring needs to be generated.
+    """
+
+    slot: DocstringSlot
+    code_block: str
+    name: str
+    path: str
+
+
+def _add_time(timings: Optional[Dict[str, float]], phase: str, seconds: float) -> None:
+    """
+    Add the time spent in a phase to the timings, if they are collected.
+
+    Parameters:
+    - timings (Optional[Dict[str, float]]): The time spent in every phase, in seconds.
+    - phase (str): The name of the phase.
+    - seconds (float): The time spent.
+    """
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+def _functions(tree: ast.AST) -> Iterator[Tuple[ast.FunctionDef, str]]:
+    """
+    Find the function definitions of a tree in the order of the source, with their qualified names.
+
+    Parameters:
+    - tree (ast.AST): The parsed source.
+
+    Returns:
+    - Iterator[Tuple[ast.FunctionDef, str]]: Every function definition and its path, like Foo.bar or foo.<locals>.bar.
+    """
+    stack = [(tree, "")]
+    while stack:
+        node, prefix = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            path = prefix + node.name
+            if isinstance(node, ast.FunctionDef):
+                yield node, path
+            prefix = path + ("." if isinstance(node, ast.ClassDef) else ".<locals>.")
+        # Visit the children in the order of the source
+        children = list(ast.iter_child_nodes(node))
+        stack.extend((child, prefix) for child in reversed(children))
+
+
+def _render(node: ast.FunctionDef) -> str:
+    """
+    Regenerate the code of a function from its AST, leaving its docstring out.
+
+    It is only used for the functions whose code cannot be sliced out of the source.
+
+    Parameters:
+    - node (ast.FunctionDef): The function definition.
+
+    Returns:
+    - str: The code of the function and its decorators.
+    """
+    body = node.body
+    if has_docstring(node):
+        node.body = body[1:]
+    try:
+        return to_source(node)
+    finally:
+        node.body = body
+
+
+def _overlaps(node: ast.FunctionDef, changed_lines: List[Tuple[int, int]]) -> bool:
+    """
+    Check whether a function overlaps any of a list of line ranges.
+
+    Parameters:
+    - node (ast.FunctionDef): The function definition.
+    - changed_lines (List[Tuple[int, int]]): The first and last line of every range.
+
+    Returns:
+    - bool: Whether a line of the function or of its decorators is in one of the ranges.
+    """
+    start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+    return any(
+        first <= node.end_lineno and start <= last for first, last in changed_lines
+    )
+
+
+def may_have_candidates(source: str, skip_constructor_docstrings: bool) -> bool:
+    """
+    Check cheaply whether a Python source may hold functions to document, without parsing it.
+
+    Parameters:
+    - source (str): The source code.
+    - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
+
+    Returns:
+    - bool: False if the source defines no function to document for sure, True otherwise.
+    """
+    for match in FUNCTION_DEFINITION.finditer(source):
+        if match.group(1) != "__init__" or not skip_constructor_docstrings:
+            return True
+    return False
+
+
+def find_candidates(
+    source: str,
+    replace_existing_docstrings: bool,
+    skip_constructor_docstrings: bool,
+    timings: Optional[Dict[str, float]] = None,
+    changed_lines: Optional[List[Tuple[int, int]]] = None,
+) -> List[Candidate]:
+    """
+    Find the functions of a Python source whose docstrings need to be generated.
+
+    Parameters:
+    - source (str): The source code.
+    - replace_existing_docstrings (bool): Whether to replace existing docstrings.
+    - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
+    - timings (Optional[Dict[str, float]]): The time spent in every phase, to which the parsing and rendering times are added.
+    - changed_lines (Optional[List[Tuple[int, int]]]): The first and last line of the changed ranges of the source. Only the functions overlapping one of them are documented. Every function is if not provided.
+
+    Returns:
+    - List[Candidate]: The functions to document, in the order they were found.
+    """
+    # Skip the sources without functions to document before parsing them
+    start = time.perf_counter()
+    possible = may_have_candidates(source, skip_constructor_docstrings)
+    _add_time(timings, "scan", time.perf_counter() - start)
+    if not possible:
+        return []
+
+    # Parse the source into an AST
+    start = time.perf_counter()
+    tree = ast.parse(source)
+    offsets = line_offsets(source)
+    _add_time(timings, "parse", time.perf_counter() - start)
+
+    candidates = []
+    for node, path in _functions(tree):
+        # Skip the constructor definition if necessary
+        if node.name == "__init__" and skip_constructor_docstrings:
+            continue
+        # Skip the unchanged functions before rendering them
+        if changed_lines is not None and not _overlaps(node, changed_lines):
+            continue
+        # Check if the node has a docstring, and we don't want to replace it
+        if has_docstring(node) and not replace_existing_docstrings:
+            continue
+        slot = locate_docstring(source, offsets, node)
+
+        # Slice the code block out of the source, leaving the docstring out
+        start = time.perf_counter()
+        code_block = function_source(source, offsets, node)
+        if code_block is None:
+            code_block = _render(node)
+        _add_time(timings, "render", time.perf_counter() - start)
+        candidates.append(Candidate(slot, code_block, node.name, path))
+
+    return candidates
+
+
+def read_candidates(
+    file: str,
+    replace_existing_docstrings: bool,
+    skip_constructor_docstrings: bool,
+    timings: Optional[Dict[str, float]] = None,
+    changed_lines: Optional[List[Tuple[int, int]]] = None,
+) -> Tuple[str, List[Candidate]]:
+    """
+    Read a Python file and find the functions whose docstrings need to be generated.
+
+    Parameters:
+    - file (str): The path to the Python file.
+    - replace_existing_docstrings (bool): Whether to replace existing docstrings.
+    - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
+    - timings (Optional[Dict[str, float]]): The time spent in every phase, to which the reading, parsing and rendering times are added.
+    - changed_lines (Optional[List[Tuple[int, int]]]): The first and last line of the changed ranges of the file. Only the functions overlapping one of them are documented. Every function is if not provided.
+
+    Returns:
+    - Tuple[str, List[Candidate]]: The contents of the file, and the functions to document.
+    """
+    # Read the file contents, keeping its line breaks untouched
+    start = time.perf_counter()
+    with open(file, "r", newline="") as f:
+        file_contents = f.read()
+    _add_time(timings, "read", time.perf_counter() - start)
+
+    candidates = find_candidates(
+        file_contents,
+        replace_existing_docstrings,
+        skip_constructor_docstrings,
+        timings,
+        changed_lines,
+    )
+    return file_contents, candidates
+
+
+def timed_read_candidates(
+    file: str,
+    replace_existing_docstrings: bool,
+    skip_constructor_docstrings: bool,
+    changed_lines: Optional[List[Tuple[int, int]]] = None,
+) -> Tuple[str, List[Candidate], Dict[str, float]]:
+    """
+    Read a Python file and find the functions whose docstrings need to be generated, timing every phase.
+
+    Parameters:
+    - file (str): The path to the Python file.
+    - replace_existing_docstrings (bool): Whether to replace existing docstrings.
+    - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
+    - changed_lines (Optional[List[Tuple[int, int]]]): The first and last line of the changed ranges of the file. Only the functions overlapping one of them are documented. Every function is if not provided.
+
+    Returns:
+    - Tuple[str, List[Candidate], Dict[str, float]]: The contents of the file, the functions to document, and the time spent in every phase.
+    """
+    timings: Dict[str, float] = {}
+    file_contents, candidates = read_candidates(
+        file,
+        replace_existing_docstrings,
+        skip_constructor_docstrings,
+        timings,
+        changed_lines,
+    )
+    return file_contents, candidates, timings
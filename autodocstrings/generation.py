@@ -0,0 +1,167 @@
+import time
+
+from autodocstrings.backends import CompletionBackend, OpenAIBackend, RetryableError
+from autodocstrings.cache import DocstringCache
+from autodocstrings.console import YELLOW, secho
+from autodocstrings.errors import RetriesExceededError
+from autodocstrings.metrics import Metrics
+from autodocstrings.prompts import COMPLETION_PARAMETERS, build_prompt, cache_key
+from autodocstrings.ratelimit import Budget, RateLimiter, estimate_tokens
+from autodocstrings.routing import SMALL_MODEL_ENGINE, route
+from typing import Any, Dict, List, Optional, Tuple
+
+# The maximum number of attempts at a throttled request
+MAX_RETRIES = 10
+
+
+def _complete(
+    prompts: List[str],
+    model: str,
+    parameters: Dict[str, Any],
+    rate_limiter: RateLimiter,
+    backend: CompletionBackend,
+    metrics: Metrics,
+) -> List[str]:
+    """
+    Send a batch of prompts to the completion API in a single request, retrying it when throttled.
+
+    Raises RetriesExceededError if it is still throttled after MAX_RETRIES attempts.
+
+    Parameters:
+    - prompts (List[str]): The prompts to complete.
+    - model (str): The model completing the prompts.
+    - parameters (Dict[str, Any]): The sampling parameters of the request.
+    - rate_limiter (RateLimiter): The rate limiter shared by the requests to the API.
+    - backend (CompletionBackend): The client of the completion API.
+    - metrics (Metrics): The metrics of the run, to which the latency and retries of the request are added.
+
+    Returns:
+    - List[str]: The completion of every prompt, in the same order.
+    """
+    tokens = sum(
+        estimate_tokens(prompt) + parameters["max_tokens"] for prompt in prompts
+    )
+
+    for retries in range(MAX_RETRIES):
+        with metrics.timer("rate_limit_wait"):
+            rate_limiter.acquire(tokens)
+        succeeded = False
+        start = time.perf_counter()
+        try:
+            completions = backend.complete(model, prompts, parameters)
+            succeeded = True
+        except RetryableError as error:
+            # Handle rate limiting and server errors
+            delay = rate_limiter.throttle(retries, error.retry_after)
+            metrics.increment("retries")
+            metrics.increment("retry_delay_seconds", delay)
+            secho(
+                f"####### {error}, retrying in {delay:.1f} seconds #######",
+                fg=YELLOW,
+            )
+            continue
+        finally:
+            rate_limiter.release(succeeded)
+            latency = time.perf_counter() - start
+            metrics.add_time("api", latency)
+            metrics.observe("api_latency_seconds", latency)
+            metrics.increment("api_requests")
+
+        return completions
+
+    raise RetriesExceededError("Maximum number of retries exceeded. Giving up.")
+
+
+def generate_docstrings(
+    requests: List[Tuple[str, str]],
+    cache: Optional[DocstringCache] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    backend: Optional[CompletionBackend] = None,
+    metrics: Optional[Metrics] = None,
+    budget: Optional[Budget] = None,
+) -> List[Optional[str]]:
+    """
+    Generate new docstrings for a batch of code blocks, with a single OpenAI API request per model.
+
+    The code blocks are routed by complexity: the trivial ones are documented from a
+    template, and the others are sent to the model matching their complexity.
+
+    Parameters:
+    - requests (List[Tuple[str, str]]): The code blocks to generate a docstring for, with their names.
+    - cache (Optional[DocstringCache]): The cache of previously generated docstrings to check before calling the API.
+    - rate_limiter (Optional[RateLimiter]): The rate limiter shared by the requests to the API. The request is only retried with backoff if not provided.
+    - backend (Optional[CompletionBackend]): The client of the completion API. The OpenAI Python client is used if not provided.
+    - metrics (Optional[Metrics]): The metrics of the run, to which the cache hits and the requests are added.
+    - budget (Optional[Budget]): The budget of requests and tokens of the run. Unlimited if not provided.
+
+    Returns:
+    - List[Optional[str]]: The generated docstrings, in the same order as the code blocks. Those which did not fit in the budget are None.
+    """
+    if metrics is None:
+        metrics = Metrics()
+
+    docstrings: List[Optional[str]] = [None] * len(requests)
+    # The prompts missing from the cache by model, with the position, cache key and
+    # maximum number of tokens of their docstrings
+    misses: Dict[str, List[Tuple[int, Optional[str], str, int]]] = {}
+    for index, (code_block, block_name) in enumerate(requests):
+        with metrics.timer("route"):
+            code_route = route(code_block)
+        if code_route.docstring is not None:
+            # Document the trivial functions without calling the API
+            docstrings[index] = code_route.docstring
+            metrics.increment("templated_functions")
+            continue
+
+        # Reuse the docstring generated by a previous run for the same request
+        key = None
+        if cache is not None:
+            key = cache_key(code_block, block_name, code_route)
+            with metrics.timer("cache"):
+                docstrings[index] = cache.get(key)
+            if docstrings[index] is not None:
+                metrics.increment("cache_hits")
+                continue
+            metrics.increment("cache_misses")
+
+        prompt = build_prompt(code_block, block_name)
+        misses.setdefault(code_route.model, []).append(
+            (index, key, prompt, code_route.max_tokens)
+        )
+
+    for model, model_misses in misses.items():
+        # The completions of a request share the length of the longest one
+        parameters = dict(
+            COMPLETION_PARAMETERS,
+            max_tokens=max(max_tokens for _, _, _, max_tokens in model_misses),
+        )
+        prompts = [prompt for _, _, prompt, _ in model_misses]
+
+        # Leave out the docstrings which do not fit in the budget of the run
+        if budget is not None:
+            costs = [
+                estimate_tokens(prompt) + parameters["max_tokens"] for prompt in prompts
+            ]
+            count = budget.reserve(costs)
+            prompts = prompts[:count]
+            model_misses = model_misses[:count]
+            if not prompts:
+                continue
+
+        # Use the OpenAI API to generate the docstrings missing from the cache
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+        if backend is None:
+            backend = OpenAIBackend()
+        if model == SMALL_MODEL_ENGINE:
+            metrics.increment("small_model_functions", len(prompts))
+        completions = _complete(
+            prompts, model, parameters, rate_limiter, backend, metrics
+        )
+        for (index, key, _, _), docstring in zip(model_misses, completions):
+            docstrings[index] = docstring
+            if cache is not None:
+                with metrics.timer("cache"):
+                    cache.set(key, docstring)
+
+    return docstrings
@@ -0,0 +1,192 @@
+import os
+import re
+import subprocess
+
+from typing import Dict, List, Optional, Tuple
+
+# The header of a diff hunk, giving the lines it covers in the new version of the file
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+# An escape sequence of a path quoted by git, either an octal byte or a character
+QUOTED_PATH_ESCAPE = re.compile(r"\\([0-7]{3}|.)")
+
+# The characters escaped by git in the quoted paths, by escape sequence
+PATH_ESCAPES = {
+    "a": "\a",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+    "v": "\v",
+}
+
+LineRange = Tuple[int, int]
+
+
+class GitDiffError(Exception):
+    """
+    Error raised when the changes since a git reference cannot be read.
+    """
+
+
+class GitChanges:
+    """
+    The lines of the Python files changed since a git reference.
+
+    Parameters:
+    - files (Dict[str, Optional[List[LineRange]]]): The changed line ranges of every changed file, by path. None stands for a new file, whose every line changed.
+    """
+
+    def __init__(self, files: Dict[str, Optional[List[LineRange]]]) -> None:
+        self._files = {os.path.realpath(file): lines for file, lines in files.items()}
+
+    def is_changed(self, file: str) -> bool:
+        """
+        Check whether a file changed.
+
+        Parameters:
+        - file (str): The path to the file.
+
+        Returns:
+        - bool: Whether the file changed.
+        """
+        return os.path.realpath(file) in self._files
+
+    def changed_lines(self, file: str) -> Optional[List[LineRange]]:
+        """
+        Get the lines of a changed file that changed.
+
+        Parameters:
+        - file (str): The path to the changed file.
+
+        Returns:
+        - Optional[List[LineRange]]: The first and last line of every changed range, starting at 1, or None if every line changed.
+        """
+        return self._files[os.path.realpath(file)]
+
+
+def unquote_path(path: str) -> str:
+    """
+    Decode a path printed by git, which quotes the paths with special characters like C strings.
+
+    Parameters:
+    - path (str): The path, quoted or not.
+
+    Returns:
+    - str: The path, with its octal escapes decoded as the bytes of a file system path.
+    """
+    if len(path) < 2 or not (path.startswith('"') and path.endswith('"')):
+        return path
+    data = bytearray()
+    position = 1
+    for match in QUOTED_PATH_ESCAPE.finditer(path, 1, len(path) - 1):
+        data += path[position : match.start()].encode()
+        escape = match.group(1)
+        if len(escape) == 3:
+            data.append(int(escape, 8))
+        else:
+            data += PATH_ESCAPES.get(escape, escape).encode()
+        position = match.end()
+    data += path[position:-1].encode()
+    return os.fsdecode(bytes(data))
+
+
+def parse_diff(diff: str, root: str) -> Dict[str, List[LineRange]]:
+    """
+    Find the changed line ranges of a diff without context lines.
+
+    Parameters:
+    - diff (str): The output of git diff --unified=0.
+    - root (str): The directory the paths of the diff are relative to.
+
+    Returns:
+    - Dict[str, List[LineRange]]: The changed line ranges of the new version of every file, by path.
+    """
+    files: Dict[str, List[LineRange]] = {}
+    ranges: Optional[List[LineRange]] = None
+    for line in diff.splitlines():
+        if line.startswith("+++ "):
+            # git ends the paths with spaces with a tab, and quotes those with special characters
+            path = unquote_path(line[4:].rstrip("\t"))
+            if path == "/dev/null":
+                # The file was deleted
+                ranges = None
+            else:
+                ranges = files.setdefault(os.path.join(root, path[2:]), [])
+            continue
+        match = HUNK_HEADER.match(line)
+        if match is None or ranges is None:
+            continue
+        start = int(match.group(1))
+        count = 1 if match.group(2) is None else int(match.group(2))
+        if count == 0:
+            # Lines were removed after the start line, which touches both of its neighbors
+            ranges.append((max(start, 1), start + 1))
+        else:
+            ranges.append((start, start + count - 1))
+    return files
+
+
+def _git(directory: str, *args: str) -> str:
+    """
+    Run a git command.
+
+    Parameters:
+    - directory (str): The directory in which the command is run.
+    - *args (str): The arguments of the command.
+
+    Returns:
+    - str: The output of the command.
+    """
+    try:
+        result = subprocess.run(
+            # Print the non-ASCII paths as they are rather than quoted
+            ["git", "-c", "core.quotePath=false", "-C", directory, *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+    except FileNotFoundError:
+        raise GitDiffError("git is not installed")
+    except subprocess.CalledProcessError as error:
+        raise GitDiffError(error.stderr.strip())
+    return result.stdout
+
+
+def git_changes(ref: str, path: str) -> GitChanges:
+    """
+    Find the lines of the Python files changed since a git reference, including the untracked files.
+
+    Parameters:
+    - ref (str): The git reference the working tree is compared with.
+    - path (str): A file or directory of the git repository.
+
+    Returns:
+    - GitChanges: The changed lines.
+    """
+    directory = path if os.path.isdir(path) else os.path.dirname(path) or "."
+    root = _git(directory, "rev-parse", "--show-toplevel").strip()
+    diff = _git(
+        root,
+        "diff",
+        "--unified=0",
+        "--no-color",
+        "--no-ext-diff",
+        "--src-prefix=a/",
+        "--dst-prefix=b/",
+        ref,
+        "--",
+        "*.py",
+    )
+    files: Dict[str, Optional[List[LineRange]]] = {}
+    files.update(parse_diff(diff, root))
+    # Separate the untracked paths with NUL characters, so that none of them is quoted
+    untracked = _git(
+        root, "ls-files", "--others", "--exclude-standard", "-z", "--", "*.py"
+    )
+    for file in untracked.split("\0"):
+        if file:
+            files[os.path.join(root, file)] = None
+    return GitChanges(files)
@@ -0,0 +1,164 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+
+from typing import Any, Dict, Optional, Tuple
+
+
+def _hash_code(code_block: str) -> str:
+    """
+    Compute the SHA-256 digest of a code block.
+
+    Parameters:
+    - code_block (str): The code block.
+
+    Returns:
+    - str: The hexadecimal digest of the code block.
+    """
+    return hashlib.sha256(code_block.encode("utf-8")).hexdigest()
+
+
+class Journal:
+    """
+    Write-ahead log of the docstrings generated by a run, used to resume it after a crash.
+
+    Every docstring is appended to the journal as soon as it is generated, keyed by the
+    file, the path of the function in it and the hash of its code. The journal starts
+    with the settings of the run, and is only replayed if they did not change. It is
+    discarded once the run completes. Only the replayed entries are kept in memory, the
+    appended ones are only written.
+
+    A new journal is created exclusively, so that two runs never share one: it raises
+    FileExistsError if the file already exists and is not resumed.
+
+    Parameters:
+    - path (str): The path to the journal file, in the JSON Lines format.
+    - settings (Dict[str, Any]): The JSON-serializable settings that influence the generated docstrings.
+    - resume (bool): Whether to replay the entries of an existing journal. It is truncated if written with other settings.
+    """
+
+    def __init__(self, path: str, settings: Dict[str, Any], resume: bool) -> None:
+        self.path = path
+        self._entries: Dict[Tuple[str, str, str], str] = {}
+        self._lock = threading.Lock()
+        # Only take over the journal of an interrupted run when resuming it
+        mode = "x"
+        if resume and os.path.exists(path):
+            with open(path, "r") as f:
+                contents = f.read()
+            self._entries = self._parse(contents, settings)
+            mode = "w"
+        if self._entries:
+            self._file = open(path, "a")
+            if not contents.endswith("\n"):
+                # Terminate the entry the run died while writing
+                self._file.write("\n")
+        else:
+            self._file = open(path, mode)
+            self._write({"settings": settings})
+
+    @staticmethod
+    def _parse(
+        contents: str, settings: Dict[str, Any]
+    ) -> Dict[Tuple[str, str, str], str]:
+        """
+        Parse the entries of a journal written with the same settings.
+
+        Parameters:
+        - contents (str): The contents of the journal file.
+        - settings (Dict[str, Any]): The settings of the run.
+
+        Returns:
+        - Dict[Tuple[str, str, str], str]: The docstrings by file, function path and code hash, empty if the settings differ.
+        """
+        entries = {}
+        lines = contents.splitlines()
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except ValueError:
+            return {}
+        if header.get("settings") != settings:
+            return {}
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The run died while writing its last entry
+                continue
+            key = (entry["file"], entry["function"], entry["sha256"])
+            entries[key] = entry["docstring"]
+        return entries
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        """
+        Append an entry to the journal file and flush it to the operating system.
+
+        Parameters:
+        - entry (Dict[str, Any]): The JSON-serializable entry.
+        """
+        self._file.write(json.dumps(entry, sort_keys=True) + "\n")
+        self._file.flush()
+
+    def get(self, file: str, function: str, code_block: str) -> Optional[str]:
+        """
+        Look up the docstring generated for a function before the run was interrupted.
+
+        Parameters:
+        - file (str): The path to the file of the function.
+        - function (str): The path of the function in the file.
+        - code_block (str): The code of the function.
+
+        Returns:
+        - Optional[str]: The docstring, or None if it was not generated.
+        """
+        key = (os.path.abspath(file), function, _hash_code(code_block))
+        with self._lock:
+            return self._entries.get(key)
+
+    def append(self, file: str, function: str, code_block: str, docstring: str) -> None:
+        """
+        Record a generated docstring.
+
+        Parameters:
+        - file (str): The path to the file of the function.
+        - function (str): The path of the function in the file.
+        - code_block (str): The code of the function.
+        - docstring (str): The generated docstring.
+        """
+        with self._lock:
+            if not self._file.closed:
+                self._write(
+                    {
+                        "file": os.path.abspath(file),
+                        "function": function,
+                        "sha256": _hash_code(code_block),
+                        "docstring": docstring,
+                    }
+                )
+
+    def __len__(self) -> int:
+        """
+        Count the replayed entries.
+
+        Returns:
+        - int: The number of docstrings generated before the run was interrupted.
+        """
+        with self._lock:
+            return len(self._entries)
+
+    def close(self) -> None:
+        """
+        Close the journal file, keeping it to resume the run.
+        """
+        with self._lock:
+            self._file.close()
+
+    def discard(self) -> None:
+        """
+        Close and remove the journal file, once the run completed.
+        """
+        self.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
@@ -1,79 +1,377 @@
 import argparse
-import ast
-import astor
-import openai
+import concurrent.futures
+import contextlib
+import functools
+import json
+import multiprocessing
 import os
 import sys
-import typer
 import time
-import textwrap
-import black
 
-from openai.error import RateLimitError
-from typing import List
+from autodocstrings.backends import make_backend
+from autodocstrings.cache import DocstringCache
+from autodocstrings.console import GREEN, RED, YELLOW, secho
+from autodocstrings.errors import (
+    AutodocstringsError,
+    ConfigurationError,
+    FailedFilesError,
+)
+from autodocstrings.extract import Candidate, timed_read_candidates
+from autodocstrings.generation import generate_docstrings
+from autodocstrings.gitdiff import GitChanges, GitDiffError, git_changes
+from autodocstrings.journal import Journal
+from autodocstrings.manifest import Manifest
+from autodocstrings.metrics import Metrics, profile
+from autodocstrings.patching import apply_edits
+from autodocstrings.plan import Plan, estimate_duration, make_plan, print_plan
+from autodocstrings.prompts import run_settings
+from autodocstrings.priority import PRIORITIES, prioritize
+from autodocstrings.ratelimit import Budget, RateLimiter
+from autodocstrings.report import RunReport, merge_reports, print_report
+from autodocstrings.scheduler import (
+    DEDUPLICATION_WINDOW,
+    PENDING_REQUESTS_PER_BATCH,
+    DocstringScheduler,
+)
+from autodocstrings.walker import Shard, iter_python_files, matches_any
+from autodocstrings.watch import Watcher
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
 
+# The number of files taken from the walk for every thread processing them, which bounds
+# the files read and waiting for their docstrings at the same time
+FILES_IN_FLIGHT_PER_WORKER = 2
 
-def generate_docstring(code_block: str, block_name: str) -> str:
+
+def generate_docstring(
+    code_block: str,
+    block_name: str,
+    cache: Optional[DocstringCache] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+) -> str:
     """
     Generate a new docstring for the given code block using the OpenAI API.
 
     Parameters:
     - code_block (str): The code block to generate a docstring for.
     - block_name (str): The name of the code block.
+    - cache (Optional[DocstringCache]): The cache of previously generated docstrings to check before calling the API.
+    - rate_limiter (Optional[RateLimiter]): The rate limiter shared by the requests to the API. The request is only retried with backoff if not provided.
 
     Returns:
     - str: The generated docstring.
     """
-    # Remove leading indentation from the code block
-    stripped_code_block = textwrap.dedent(code_block)
+    return generate_docstrings([(code_block, block_name)], cache, rate_limiter)[0]
+
+
+def _journal_docstring(
+    journal: Journal,
+    file: str,
+    candidate: Candidate,
+    future: concurrent.futures.Future,
+) -> None:
+    """
+    Append a generated docstring to the journal, as soon as it is generated.
+
+    Parameters:
+    - journal (Journal): The journal of the run.
+    - file (str): The path to the file of the function.
+    - candidate (Candidate): The function.
+    - future (concurrent.futures.Future): The future of its docstring, which is done.
+    """
+    if future.exception() is None and future.result() is not None:
+        journal.append(file, candidate.path, candidate.code_block, future.result())
+
+
+def _skip_file(file: str, metrics: Metrics, report: Optional[RunReport]) -> None:
+    """
+    Count a file skipped without being parsed.
+
+    Parameters:
+    - file (str): The path to the file.
+    - metrics (Metrics): The metrics of the run.
+    - report (Optional[RunReport]): The report of the run, in which the file is recorded.
+    """
+    metrics.increment("skipped_files")
+    if report is not None:
+        report.record(file, "skipped")
+
+
+class _ParsedFile(NamedTuple):
+    """
+    A Python file whose functions to document were found.
+    """
+
+    file: str
+    contents: str
+    candidates: List[Candidate]
+    start: float
+
+
+def _parse_file(
+    file: str,
+    replace_existing_docstrings: bool,
+    skip_constructor_docstrings: bool,
+    manifest: Optional[Manifest],
+    process_pool: Optional[concurrent.futures.Executor],
+    metrics: Metrics,
+    changes: Optional[GitChanges],
+    report: Optional[RunReport],
+) -> Optional[_ParsedFile]:
+    """
+    Read a Python file and find the functions to document, unless the file can be skipped.
+
+    Parameters:
+    - file (str): The path to the Python file.
+    - replace_existing_docstrings (bool): Whether to replace existing docstrings.
+    - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
+    - manifest (Optional[Manifest]): The manifest of the last successful run. The file is skipped if it did not change since then.
+    - process_pool (Optional[concurrent.futures.Executor]): The pool of processes in which the file is parsed. It is parsed in the current process if not provided.
+    - metrics (Metrics): The metrics of the run, to which the timings of the file are added.
+    - changes (Optional[GitChanges]): The lines changed since a git reference. Only the functions overlapping them are documented. Every function is if not provided.
+    - report (Optional[RunReport]): The report of the run, in which the file is recorded if it is skipped or cannot be parsed.
+
+    Returns:
+    - Optional[_ParsedFile]: The contents of the file and its functions to document, or None if it is skipped or cannot be parsed.
+    """
+    start = time.perf_counter()
+
+    # Skip the file if none of its lines changed since the git reference
+    changed_lines = None
+    if changes is not None:
+        if not changes.is_changed(file):
+            _skip_file(file, metrics, report)
+            return None
+        changed_lines = changes.changed_lines(file)
+
+    # Skip the file if it did not change since the last successful run
+    if manifest is not None:
+        with metrics.timer("manifest"):
+            unchanged = manifest.is_unchanged(file)
+        if unchanged:
+            _skip_file(file, metrics, report)
+            return None
+
+    # Find the functions to document, in another process if possible
+    arguments = dict(
+        file=file,
+        replace_existing_docstrings=replace_existing_docstrings,
+        skip_constructor_docstrings=skip_constructor_docstrings,
+        changed_lines=changed_lines,
+    )
+    try:
+        if process_pool is None:
+            file_contents, candidates, timings = timed_read_candidates(**arguments)
+        else:
+            file_contents, candidates, timings = process_pool.submit(
+                timed_read_candidates, **arguments
+            ).result()
+    except (SyntaxError, UnicodeDecodeError, ValueError) as error:
+        # Carry on with the other files, the run fails once they are updated
+        secho(f"Skipping {file}: {error}", fg=RED)
+        metrics.increment("failed_files")
+        if report is not None:
+            report.record(file, "failed", error=str(error))
+        return None
+    for phase, seconds in timings.items():
+        metrics.add_time(phase, seconds)
+    return _ParsedFile(file, file_contents, candidates, start)
+
+
+def _submit_candidate(
+    file: str,
+    candidate: Candidate,
+    scheduler: DocstringScheduler,
+    metrics: Metrics,
+    journal: Optional[Journal],
+) -> concurrent.futures.Future:
+    """
+    Schedule the generation of the docstring of a function, unless the journal already holds it.
+
+    Parameters:
+    - file (str): The path to the file of the function.
+    - candidate (Candidate): The function.
+    - scheduler (DocstringScheduler): The scheduler used to generate the docstrings.
+    - metrics (Metrics): The metrics of the run, to which the resumed functions are added.
+    - journal (Optional[Journal]): The journal to which the generated docstring is appended, and from which that of an interrupted run is replayed.
+
+    Returns:
+    - concurrent.futures.Future: A future resolving to the docstring, or to None if it did not fit in the budget.
+    """
+    docstring = None
+    if journal is not None:
+        docstring = journal.get(file, candidate.path, candidate.code_block)
+    if docstring is not None:
+        # The docstring was generated before the run was interrupted
+        future = concurrent.futures.Future()
+        future.set_result(docstring)
+        metrics.increment("resumed_functions")
+        return future
+
+    secho(
+        f"Updating docstrings for {candidate.name} in {file}",
+        fg=YELLOW,
+    )
+    future = scheduler.submit(candidate.code_block, candidate.name)
+    if journal is not None:
+        future.add_done_callback(
+            functools.partial(_journal_docstring, journal, file, candidate)
+        )
+    return future
+
+
+def _write_file(
+    parsed: _ParsedFile,
+    futures: List[concurrent.futures.Future],
+    manifest: Optional[Manifest],
+    metrics: Metrics,
+    report: Optional[RunReport],
+) -> bool:
+    """
+    Wait for the docstrings of the functions of a file and write them into it.
 
-    # Use the OpenAI API to generate a new docstring for the code block
-    model_engine = "code-davinci-002"
+    The docstrings are dropped if the file changed while they were generated, so that
+    the edits saved in the meantime are not overwritten.
 
-    prompt = f"""# Python3
-{stripped_code_block}
+    Parameters:
+    - parsed (_ParsedFile): The file and its functions to document.
+    - futures (List[concurrent.futures.Future]): The futures of the docstrings of the functions, in the same order.
+    - manifest (Optional[Manifest]): The manifest in which the file is recorded, unless some of its functions were left undocumented.
+    - metrics (Metrics): The metrics of the run, to which the timings and counters of the file are added.
+    - report (Optional[RunReport]): The report of the run, in which the file is recorded.
 
-# Write a google-style function docstring for the {block_name} python function
-\"""
-"""
+    Returns:
+    - bool: Whether the file was still as it was read, False if its docstrings were dropped.
+    """
+    # Wait for the docstrings of the file
+    with metrics.timer("wait"):
+        docstrings = [future.result() for future in futures]
 
-    max_retries = 5  # Maximum number of retries
-    retries = 0  # Number of retries so far
+    # Splice the docstrings into the original source in the order the functions were found,
+    # leaving out the functions which did not fit in the budget
+    with metrics.timer("splice"):
+        edits = [
+            candidate.slot.edit(docstring)
+            for candidate, docstring in zip(parsed.candidates, docstrings)
+            if docstring is not None
+        ]
+        updated_contents = apply_edits(parsed.contents, edits)
+    over_budget = len(docstrings) - len(edits)
 
-    while retries < max_retries:
+    # Drop the docstrings if the file was saved while they were generated
+    with metrics.timer("write"):
         try:
-            completions = openai.Completion.create(
-                engine=model_engine,
-                prompt=prompt,
-                temperature=0,
-                max_tokens=150,
-                top_p=1.0,
-                frequency_penalty=0.0,
-                presence_penalty=0.0,
-                stop=["#", '"""'],
-            )
-            return completions.choices[0].text
+            with open(parsed.file, "r", newline="") as f:
+                current_contents = f.read()
+        except (OSError, UnicodeDecodeError):
+            current_contents = None
+    if current_contents != parsed.contents:
+        secho(
+            f"Skipping {parsed.file}: it changed while its docstrings were generated",
+            fg=YELLOW,
+        )
+        metrics.increment("stale_files")
+        _skip_file(parsed.file, metrics, report)
+        return False
 
-        except RateLimitError:
-            # Handle rate limiting error
-            typer.secho(
-                f"####### OpenAI rate limit reached, waiting for 1 minute #######",
-                fg=typer.colors.YELLOW,
-            )
-            time.sleep(60)  # Wait 1 minute before trying again
-            retries += 1  # Increment the number of retries
+    metrics.increment("documented_functions", len(edits))
+    metrics.increment("over_budget_functions", over_budget)
+
+    # Leave the file untouched if nothing changed, keeping its modification time
+    if updated_contents == parsed.contents:
+        metrics.increment("skipped_files")
+        status = "untouched"
+    else:
+        with metrics.timer("write"):
+            with open(parsed.file, "w", newline="") as f:
+                f.write(updated_contents)
+        metrics.increment("modified_files")
+        status = "modified"
+    if report is not None:
+        report.record(parsed.file, status, len(edits), over_budget)
+
+    # Leave the file to the next run if some of its functions did not fit in the budget
+    if manifest is not None and over_budget == 0:
+        with metrics.timer("manifest"):
+            manifest.record(parsed.file)
+    metrics.record_file(
+        parsed.file, time.perf_counter() - parsed.start, len(parsed.candidates)
+    )
+    return True
+
+
+def _update_by_priority(
+    parsed_files: List[_ParsedFile],
+    priority: Sequence[str],
+    scheduler: DocstringScheduler,
+    manifest: Optional[Manifest],
+    metrics: Metrics,
+    journal: Optional[Journal],
+    report: Optional[RunReport],
+) -> bool:
+    """
+    Update the docstrings of the functions of several files, submitting them from the most to the least valuable.
 
-    if retries == max_retries:
-        typer.secho(
-            f"Maximum number of retries exceeded. Giving up.",
-            fg=typer.colors.RED,
+    Parameters:
+    - parsed_files (List[_ParsedFile]): The files and their functions to document. The list is emptied, so that every file is released once written.
+    - priority (Sequence[str]): The priorities used to order the functions, each one of autodocstrings.priority.PRIORITIES.
+    - scheduler (DocstringScheduler): The scheduler used to generate the docstrings.
+    - manifest (Optional[Manifest]): The manifest in which the files are recorded.
+    - metrics (Metrics): The metrics of the run, to which the timings and counters of the files are added.
+    - journal (Optional[Journal]): The journal to which the generated docstrings are appended, and from which those of an interrupted run are replayed.
+    - report (Optional[RunReport]): The report of the run, in which the files are recorded.
+
+    Returns:
+    - bool: Whether every file was still as it was read, False if the docstrings of some were dropped.
+    """
+    functions = [
+        (parsed.file, candidate)
+        for parsed in parsed_files
+        for candidate in parsed.candidates
+    ]
+    sources = {parsed.file: parsed.contents for parsed in parsed_files}
+    futures: Dict[Tuple[str, int], concurrent.futures.Future] = {}
+    last_submitted: Dict[str, int] = {}
+    for index, (file, candidate) in enumerate(prioritize(functions, priority, sources)):
+        futures[file, candidate.slot.start] = _submit_candidate(
+            file, candidate, scheduler, metrics, journal
         )
-        sys.exit(1)
+        last_submitted[file] = index
+    del functions, sources
+
+    # Write the files in the order their last docstring is requested, which is about the
+    # order they complete in, and release each of them once written
+    remaining = {parsed.file: parsed for parsed in parsed_files}
+    parsed_files.clear()
+    unchanged = True
+    for file in sorted(remaining, key=lambda file: last_submitted.get(file, -1)):
+        parsed = remaining.pop(file)
+        unchanged &= _write_file(
+            parsed,
+            [
+                futures.pop((parsed.file, candidate.slot.start))
+                for candidate in parsed.candidates
+            ],
+            manifest=manifest,
+            metrics=metrics,
+            report=report,
+        )
+    return unchanged
 
 
 def update_docstrings_in_file(
-    file: str, replace_existing_docstrings: bool, skip_constructor_docstrings: bool
-) -> None:
+    file: str,
+    replace_existing_docstrings: bool,
+    skip_constructor_docstrings: bool,
+    *,
+    scheduler: Optional[DocstringScheduler] = None,
+    manifest: Optional[Manifest] = None,
+    process_pool: Optional[concurrent.futures.Executor] = None,
+    metrics: Optional[Metrics] = None,
+    changes: Optional[GitChanges] = None,
+    journal: Optional[Journal] = None,
+    priority: Optional[Sequence[str]] = None,
+    report: Optional[RunReport] = None,
+) -> bool:
     """
     Update the docstrings in a Python file.
 
@@ -81,56 +379,67 @@ def update_docstrings_in_file(
     - file (str): The path to the Python file to update the docstrings in.
     - replace_existing_docstrings (bool): Whether to replace existing docstrings.
     - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
+    - scheduler (Optional[DocstringScheduler]): The scheduler used to generate the docstrings concurrently. A sequential one is used if not provided.
+    - manifest (Optional[Manifest]): The manifest of the last successful run. The file is skipped if it did not change since then.
+    - process_pool (Optional[concurrent.futures.Executor]): The pool of processes in which the file is parsed. It is parsed in the current process if not provided.
+    - metrics (Optional[Metrics]): The metrics of the run, to which the timings of the file are added.
+    - changes (Optional[GitChanges]): The lines changed since a git reference. Only the functions overlapping them are documented. Every function is if not provided.
+    - journal (Optional[Journal]): The journal to which the generated docstrings are appended, and from which those of an interrupted run are replayed.
+    - priority (Optional[Sequence[str]]): The priorities used to order the functions, each one of autodocstrings.priority.PRIORITIES. They are documented in the order they are found if not provided.
+    - report (Optional[RunReport]): The report of the run, in which the outcome of the file is recorded.
+
+    Returns:
+    - bool: Whether the file was still as it was read once its docstrings were generated, False if they were dropped because it changed in the meantime.
     """
+    if scheduler is None:
+        with DocstringScheduler(generate_docstrings) as scheduler:
+            return update_docstrings_in_file(
+                file,
+                replace_existing_docstrings,
+                skip_constructor_docstrings,
+                scheduler=scheduler,
+                manifest=manifest,
+                process_pool=process_pool,
+                metrics=metrics,
+                changes=changes,
+                journal=journal,
+                priority=priority,
+                report=report,
+            )
+    if metrics is None:
+        metrics = Metrics()
 
-    # Read the file contents
-    with open(file, "r") as f:
-        file_contents = f.read()
-
-    # Parse the file contents into an AST
-    tree = ast.parse(file_contents)
-
-    # Find all function definitions
-    nodes = [node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)]
-
-    # Iterate through the top-level nodes in the AST
-    for node in nodes:
-        # Skip the constructor definition if necessary
-        if (
-            isinstance(node, ast.FunctionDef)
-            and node.name == "__init__"
-            and skip_constructor_docstrings
-        ):
-            continue
-        # Check if the node has a docstring
-        if (
-            node.body
-            and isinstance(node.body[0], ast.Expr)
-            and isinstance(node.body[0].value, ast.Str)
-        ):
-            if not replace_existing_docstrings:
-                # The node has a docstring, and we don't want to replace it
-                continue
-            # The node has a docstring, so remove it
-            node.body.pop(0)
-
-        typer.secho(
-            f"Updating docstrings for {node.name} in {file}", fg=typer.colors.YELLOW
+    parsed = _parse_file(
+        file,
+        replace_existing_docstrings,
+        skip_constructor_docstrings,
+        manifest=manifest,
+        process_pool=process_pool,
+        metrics=metrics,
+        changes=changes,
+        report=report,
+    )
+    if parsed is None:
+        return True
+    if priority is not None:
+        return _update_by_priority(
+            [parsed],
+            priority,
+            scheduler,
+            manifest=manifest,
+            metrics=metrics,
+            journal=journal,
+            report=report,
         )
 
-        # Generate and update the docstring
-        code_block = astor.to_source(node).strip()
-        block_name = node.name
-        docstring = generate_docstring(code_block, block_name)
-
-        # Insert the docstring into the code
-        node.body.insert(0, ast.Expr(value=ast.Str(s=docstring + "\n")))
-
-    # Write the updated AST back to the file
-    with open(file, "w") as f:
-        source = astor.to_source(tree)
-        formatted_source = black.format_str(source, mode=black.FileMode())
-        f.write(formatted_source)
+    # Schedule a docstring request for every function that needs one
+    futures = [
+        _submit_candidate(file, candidate, scheduler, metrics, journal)
+        for candidate in parsed.candidates
+    ]
+    return _write_file(
+        parsed, futures, manifest=manifest, metrics=metrics, report=report
+    )
 
 
 def update_docstrings_in_directory(
@@ -139,6 +448,17 @@ def update_docstrings_in_directory(
     skip_constructor_docstrings: bool,
     exclude_directories: List[str] = [],
     exclude_files: List[str] = [],
+    *,
+    scheduler: Optional[DocstringScheduler] = None,
+    manifest: Optional[Manifest] = None,
+    jobs: int = 1,
+    respect_gitignore: bool = True,
+    metrics: Optional[Metrics] = None,
+    changes: Optional[GitChanges] = None,
+    journal: Optional[Journal] = None,
+    priority: Optional[Sequence[str]] = None,
+    shard: Optional[Shard] = None,
+    report: Optional[RunReport] = None,
 ) -> None:
     """
     Update the docstrings in all Python files in a directory and its subdirectories.
@@ -147,32 +467,237 @@ def update_docstrings_in_directory(
     - directory (str): The path to the directory to update the docstrings in.
     - replace_existing_docstrings (bool): Whether to replace existing docstrings.
     - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
-    - exclude_directories (List[str]): A list of directories to exclude from the update.
-    - exclude_files (List[str]): A list of files to exclude from the update.
-    """
-    # Iterate through the files and subdirectories in the directory
-    for path in os.listdir(directory):
-        full_path = os.path.join(directory, path)
-        if os.path.isfile(full_path) and full_path.endswith(".py"):
-            if os.path.basename(path) in exclude_files:
-                # Skip the file if it is in the exclude list
-                continue
-            # Update the docstrings in the Python file
-            update_docstrings_in_file(
-                full_path, replace_existing_docstrings, skip_constructor_docstrings
-            )
-        elif os.path.isdir(full_path):
-            if os.path.basename(full_path) in exclude_directories:
-                # Skip the directory if it is in the exclude list
-                continue
-            # Update the docstrings in all Python files in the subdirectory
+    - exclude_directories (List[str]): A list of directories (or glob patterns) to exclude from the update.
+    - exclude_files (List[str]): A list of files (or glob patterns) to exclude from the update.
+    - scheduler (Optional[DocstringScheduler]): The scheduler used to generate the docstrings concurrently. A sequential one is used if not provided.
+    - manifest (Optional[Manifest]): The manifest of the last successful run. The files that did not change since then are skipped.
+    - jobs (int): The number of processes in which the files are parsed. They are parsed in the current process if it is 1.
+    - respect_gitignore (bool): Whether to skip the files and directories ignored by .gitignore files.
+    - metrics (Optional[Metrics]): The metrics of the run, to which the timings of the files are added.
+    - changes (Optional[GitChanges]): The lines changed since a git reference. Only the functions overlapping them are documented. Every function is if not provided.
+    - journal (Optional[Journal]): The journal to which the generated docstrings are appended, and from which those of an interrupted run are replayed.
+    - priority (Optional[Sequence[str]]): The priorities used to order the functions of all the files, each one of autodocstrings.priority.PRIORITIES. Every file is then parsed before the first docstring is requested. The files are processed as soon as they are found if not provided.
+    - shard (Optional[Shard]): The shard of the files to update, the others being left to other runs. Every file is updated if not provided.
+    - report (Optional[RunReport]): The report of the run, in which the outcome of every file is recorded.
+    """
+    if scheduler is None:
+        with DocstringScheduler(generate_docstrings) as scheduler:
             update_docstrings_in_directory(
-                full_path,
+                directory,
                 replace_existing_docstrings,
                 skip_constructor_docstrings,
                 exclude_directories,
                 exclude_files,
+                scheduler=scheduler,
+                manifest=manifest,
+                jobs=jobs,
+                respect_gitignore=respect_gitignore,
+                metrics=metrics,
+                changes=changes,
+                journal=journal,
+                priority=priority,
+                shard=shard,
+                report=report,
+            )
+        return
+    if metrics is None:
+        metrics = Metrics()
+
+    # Find the files lazily, so that they are processed as soon as they are found
+    files = metrics.timed_iter(
+        "walk",
+        iter_python_files(
+            directory, exclude_directories, exclude_files, respect_gitignore, shard
+        ),
+    )
+
+    # Parse the files on several cores, the requests are still all sent by the scheduler
+    process_pool = None
+    if jobs > 1:
+        process_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    # Process the files concurrently, with enough of them in flight to keep both the
+    # processes and the scheduler busy
+    workers = scheduler.concurrency + jobs - 1
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            if priority is not None:
+                # Rank the functions of every file before requesting any docstring
+                parsed_files = executor.map(
+                    lambda file: _parse_file(
+                        file,
+                        replace_existing_docstrings,
+                        skip_constructor_docstrings,
+                        manifest=manifest,
+                        process_pool=process_pool,
+                        metrics=metrics,
+                        changes=changes,
+                        report=report,
+                    ),
+                    files,
+                )
+                _update_by_priority(
+                    [parsed for parsed in parsed_files if parsed is not None],
+                    priority,
+                    scheduler,
+                    manifest=manifest,
+                    metrics=metrics,
+                    journal=journal,
+                    report=report,
+                )
+                return
+            # Only take the next files once some are written, so that the files in memory
+            # stay bounded however many the walk finds and however slow the API is
+            max_files = FILES_IN_FLIGHT_PER_WORKER * workers
+            in_flight: Set[concurrent.futures.Future] = set()
+            for file in files:
+                if len(in_flight) >= max_files:
+                    done, in_flight = concurrent.futures.wait(
+                        in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        future.result()
+                in_flight.add(
+                    executor.submit(
+                        update_docstrings_in_file,
+                        file,
+                        replace_existing_docstrings,
+                        skip_constructor_docstrings,
+                        scheduler=scheduler,
+                        manifest=manifest,
+                        process_pool=process_pool,
+                        metrics=metrics,
+                        changes=changes,
+                        journal=journal,
+                        report=report,
+                    )
+                )
+            for future in concurrent.futures.as_completed(in_flight):
+                future.result()
+    finally:
+        if process_pool is not None:
+            process_pool.shutdown()
+
+
+def watch_docstrings(
+    watcher: Watcher,
+    replace_existing_docstrings: bool,
+    skip_constructor_docstrings: bool,
+    scheduler: DocstringScheduler,
+    *,
+    manifest: Optional[Manifest] = None,
+    metrics: Optional[Metrics] = None,
+    journal: Optional[Journal] = None,
+    report: Optional[RunReport] = None,
+) -> None:
+    """
+    Update the docstrings of the functions changed in the watched files, until the watcher is stopped.
+
+    Parameters:
+    - watcher (Watcher): The watcher of the Python files.
+    - replace_existing_docstrings (bool): Whether to replace existing docstrings.
+    - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
+    - scheduler (DocstringScheduler): The scheduler used to generate the docstrings, kept warm between the changes.
+    - manifest (Optional[Manifest]): The manifest in which the updated files are recorded.
+    - metrics (Optional[Metrics]): The metrics to which the timings and counters are added.
+    - journal (Optional[Journal]): The journal to which the generated docstrings are appended.
+    - report (Optional[RunReport]): The report of the run, in which the outcome of the updated files is recorded.
+    """
+    for files in watcher.changes():
+        changes = GitChanges(files)
+        for file in files:
+            # A file which cannot be parsed is skipped, it may be saved again once fixed
+            unchanged = update_docstrings_in_file(
+                file,
+                replace_existing_docstrings,
+                skip_constructor_docstrings,
+                scheduler=scheduler,
+                manifest=manifest,
+                metrics=metrics,
+                changes=changes,
+                journal=journal,
+                report=report,
             )
+            if unchanged:
+                # The docstrings written are not changes to document
+                watcher.record(file)
+            else:
+                # Document the changes again with those saved during the generation
+                watcher.requeue(file)
+
+
+def _print_summary(metrics: Metrics) -> None:
+    """
+    Print how many functions were documented and how many files were modified by a run.
+
+    Parameters:
+    - metrics (Metrics): The metrics of the run.
+    """
+    secho(
+        f"Documented {metrics.counter('documented_functions'):g} functions,"
+        f" modified {metrics.counter('modified_files'):g} files"
+        f" and left {metrics.counter('skipped_files'):g} untouched",
+        fg=GREEN,
+    )
+    over_budget = metrics.counter("over_budget_functions")
+    if over_budget > 0:
+        secho(
+            f"Budget reached, left {over_budget:g} functions undocumented",
+            fg=YELLOW,
+        )
+
+
+def _check_input(
+    input: str, exclude_directories: List[str], exclude_files: List[str]
+) -> Optional[bool]:
+    """
+    Check that the input is a Python file or a directory, raising ConfigurationError if it is neither.
+
+    Parameters:
+    - input (str): The path to a Python file or directory containing Python files.
+    - exclude_directories (List[str]): A list of directories (or glob patterns) to exclude.
+    - exclude_files (List[str]): A list of files (or glob patterns) to exclude.
+
+    Returns:
+    - Optional[bool]: Whether the input is a file, or None if it is excluded.
+    """
+    # Check if the input is a file or a directory
+    is_file = os.path.isfile(input) and input.endswith(".py")
+    if not is_file and not os.path.isdir(input):
+        # The input is not a valid file or directory
+        raise ConfigurationError(
+            "Invalid input. The input must be either a valid python file or a valid directory"
+        )
+    if is_file and matches_any(input, exclude_files):
+        # The file is in the list of excluded files
+        return None
+    if not is_file and matches_any(input, exclude_directories):
+        # The directory is in the list of excluded directories
+        return None
+    return is_file
+
+
+def _read_changes(since: Optional[str], input: str) -> Optional[GitChanges]:
+    """
+    Read the lines changed since a git reference, raising ConfigurationError if they cannot be read.
+
+    Parameters:
+    - since (Optional[str]): The git reference, if only the changed functions are documented.
+    - input (str): The path to a Python file or directory in the git repository.
+
+    Returns:
+    - Optional[GitChanges]: The changed lines, or None if no git reference is provided.
+    """
+    if since is None:
+        return None
+    try:
+        return git_changes(since, input)
+    except GitDiffError as error:
+        raise ConfigurationError(
+            f"Cannot read the changes since {since}: {error}"
+        ) from error
 
 
 def update_docstrings(
@@ -181,52 +706,341 @@ def update_docstrings(
     skip_constructor_docstrings: bool,
     exclude_directories: List[str] = [],
     exclude_files: List[str] = [],
+    *,
+    concurrency: int = 1,
+    cache_dir: Optional[str] = None,
+    manifest_path: Optional[str] = None,
+    jobs: int = 1,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+    batch_size: int = 1,
+    max_batch_tokens: Optional[int] = None,
+    respect_gitignore: bool = True,
+    since: Optional[str] = None,
+    shard: Optional[Shard] = None,
+    api_base: Optional[str] = None,
+    metrics_path: Optional[str] = None,
+    watch: bool = False,
+    journal_path: Optional[str] = None,
+    resume: bool = False,
+    priority: Optional[Sequence[str]] = None,
+    max_requests: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    report_path: Optional[str] = None,
+    max_pending_requests: Optional[int] = None,
+    deduplication_window: int = DEDUPLICATION_WINDOW,
 ) -> None:
     """
     Update the docstrings in Python files and directories.
 
+    Raises ConfigurationError if the run cannot start, RetriesExceededError if a request
+    stays throttled, and FailedFilesError once the other files are updated if some files
+    cannot be parsed.
+
     Parameters:
     - input (str): The path to a Python file or directory containing Python files to update the docstrings in.
     - replace_existing_docstrings (bool): Whether to replace existing docstrings.
     - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
-    - exclude_directories (List[str]): A list of directories to exclude from the update.
-    - exclude_files (List[str]): A list of files to exclude from the update.
+    - exclude_directories (List[str]): A list of directories (or glob patterns) to exclude from the update.
+    - exclude_files (List[str]): A list of files (or glob patterns) to exclude from the update.
+    - concurrency (int): The maximum number of OpenAI API requests in flight at the same time.
+    - cache_dir (Optional[str]): The directory of the persistent docstring cache. No cache is used if not provided.
+    - manifest_path (Optional[str]): The path to the manifest used to skip the files that did not change since the last successful run. Every file is processed if not provided.
+    - jobs (int): The number of processes in which the files of a directory are parsed.
+    - requests_per_minute (Optional[float]): The maximum number of OpenAI API requests per minute. Unlimited if not provided.
+    - tokens_per_minute (Optional[float]): The maximum number of OpenAI API tokens per minute. Unlimited if not provided.
+    - batch_size (int): The maximum number of functions documented by a single OpenAI API request.
+    - max_batch_tokens (Optional[int]): The maximum estimated number of tokens of the functions documented by a single OpenAI API request. Unlimited if not provided.
+    - respect_gitignore (bool): Whether to skip the files and directories ignored by .gitignore files.
+    - since (Optional[str]): The git reference since which the changed functions are documented. Every function is if not provided.
+    - shard (Optional[Shard]): The shard of the files to update, the others being left to runs on other machines. Every file is updated if not provided.
+    - api_base (Optional[str]): The base URL of an OpenAI-compatible completion API, to which the requests are sent over a pool of keep-alive connections. The OpenAI Python client is used if not provided.
+    - metrics_path (Optional[str]): The path to which the timings and counters of the run are written, in the Prometheus text format if its extension is .prom and in JSON otherwise. No metrics are written if not provided.
+    - watch (bool): Whether to keep watching the files once updated, and update the docstrings of the functions changed in them until interrupted.
+    - journal_path (Optional[str]): The path to the journal to which the generated docstrings are appended as soon as they are generated. It is removed once the run completes. No journal is written if not provided.
+    - resume (bool): Whether to replay the docstrings of the journal of an interrupted run instead of generating them again.
+    - priority (Optional[Sequence[str]]): The priorities used to order the functions, from the most to the least significant, each one of autodocstrings.priority.PRIORITIES. They are documented in the order they are found if not provided.
+    - max_requests (Optional[int]): The maximum number of OpenAI API requests of the run, after which the remaining functions are left undocumented. Unlimited if not provided.
+    - max_tokens (Optional[int]): The maximum estimated number of OpenAI API tokens of the run, after which the remaining functions are left undocumented. Unlimited if not provided.
+    - report_path (Optional[str]): The path to which the report of the files modified, left untouched, skipped and failed by the run is written, in JSON. No report is written if not provided.
+    - max_pending_requests (Optional[int]): The maximum number of functions waiting for an OpenAI API request, beyond which the files wait before submitting more. PENDING_REQUESTS_PER_BATCH times the number of functions of the batches in flight if not provided.
+    - deduplication_window (int): The number of distinct functions remembered to document identical ones only once.
     """
-    # Set the OpenAI API key
+    # Get the OpenAI API key, which a self-hosted API may not need
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if api_key is None and api_base is None:
+        raise ConfigurationError("OPENAI_API_KEY environment variable not set!")
+
+    is_file = _check_input(input, exclude_directories, exclude_files)
+    if is_file is None:
+        return
+    changes = _read_changes(since, input)
+
+    settings = run_settings(
+        replace_existing_docstrings, skip_constructor_docstrings, since
+    )
+    manifest = None
+    if manifest_path is not None:
+        manifest = Manifest(manifest_path, settings)
+    journal = None
+    if journal_path is not None:
+        try:
+            journal = Journal(journal_path, settings, resume)
+        except FileExistsError as error:
+            raise ConfigurationError(
+                f"The journal {journal_path} already exists, either used by another run"
+                " or left by an interrupted one: resume it with --resume, or remove it"
+            ) from error
+        if len(journal) > 0:
+            secho(
+                f"Resuming with {len(journal)} docstrings from {journal_path}",
+                fg=GREEN,
+            )
+
+    cache = DocstringCache(cache_dir) if cache_dir is not None else None
+    rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute, concurrency)
+    backend = make_backend(api_key, api_base, pool_size=concurrency)
+    metrics = Metrics()
+    report = RunReport(shard) if report_path is not None else None
+    failed_files = 0
+    budget = None
+    if max_requests is not None or max_tokens is not None:
+        budget = Budget(max_requests, max_tokens)
+    generate = functools.partial(
+        generate_docstrings,
+        cache=cache,
+        rate_limiter=rate_limiter,
+        backend=backend,
+        metrics=metrics,
+        budget=budget,
+    )
     try:
-        openai.api_key = os.environ["OPENAI_API_KEY"]
-    except:
-        typer.secho("OPENAI_API_KEY environment variable not set!", fg=typer.colors.RED)
-        sys.exit(1)
+        if max_pending_requests is None:
+            max_pending_requests = PENDING_REQUESTS_PER_BATCH * concurrency * batch_size
+        with DocstringScheduler(
+            generate,
+            concurrency,
+            batch_size,
+            max_batch_tokens,
+            max_pending=max_pending_requests,
+            deduplication_window=deduplication_window,
+        ) as scheduler:
+            if is_file:
+                # Update the docstrings in the file, unless it belongs to another shard
+                if shard is None or shard.contains(input, os.path.dirname(input)):
+                    update_docstrings_in_file(
+                        input,
+                        replace_existing_docstrings,
+                        skip_constructor_docstrings,
+                        scheduler=scheduler,
+                        manifest=manifest,
+                        metrics=metrics,
+                        changes=changes,
+                        journal=journal,
+                        priority=priority,
+                        report=report,
+                    )
+            else:
+                # Update the docstrings in all Python files in the directory and its subdirectories
+                update_docstrings_in_directory(
+                    input,
+                    replace_existing_docstrings,
+                    skip_constructor_docstrings,
+                    exclude_directories,
+                    exclude_files,
+                    scheduler=scheduler,
+                    manifest=manifest,
+                    jobs=jobs,
+                    respect_gitignore=respect_gitignore,
+                    metrics=metrics,
+                    changes=changes,
+                    journal=journal,
+                    priority=priority,
+                    shard=shard,
+                    report=report,
+                )
+            _print_summary(metrics)
+            failed_files = metrics.counter("failed_files")
+            if watch:
+                if is_file:
+                    watcher = Watcher(lambda: [input])
+                else:
+                    watcher = Watcher(
+                        lambda: iter_python_files(
+                            input,
+                            exclude_directories,
+                            exclude_files,
+                            respect_gitignore,
+                            shard,
+                        )
+                    )
+                secho(
+                    f"Watching {input} for changes, press Ctrl+C to stop",
+                    fg=GREEN,
+                )
+                try:
+                    watch_docstrings(
+                        watcher,
+                        replace_existing_docstrings,
+                        skip_constructor_docstrings,
+                        scheduler,
+                        manifest=manifest,
+                        metrics=metrics,
+                        journal=journal,
+                        report=report,
+                    )
+                except KeyboardInterrupt:
+                    pass
+        metrics.increment("deduplicated_functions", scheduler.deduplicated)
+        if manifest is not None:
+            manifest.save()
+        # The run completed, there is nothing left to resume
+        if journal is not None:
+            journal.discard()
+    finally:
+        if journal is not None:
+            journal.close()
+        backend.close()
+        if cache is not None:
+            cache.close()
+        if metrics_path is not None:
+            metrics.write(metrics_path)
+        if report is not None:
+            report.write(report_path, metrics)
 
-    # Check if the input is a file or a directory
-    if os.path.isfile(input) and input.endswith(".py"):
-        # Check if the directory is in the list of excluded files
-        if os.path.basename(input) in exclude_files:
-            return
-        # Update the docstrings in the file
-        update_docstrings_in_file(
-            input, replace_existing_docstrings, skip_constructor_docstrings
+    # Fail the run if some files could not be parsed, once the others were updated
+    if failed_files > 0:
+        raise FailedFilesError(failed_files)
+
+
+def plan_update(
+    input: str,
+    replace_existing_docstrings: bool,
+    skip_constructor_docstrings: bool,
+    exclude_directories: List[str] = [],
+    exclude_files: List[str] = [],
+    *,
+    concurrency: int = 1,
+    cache_dir: Optional[str] = None,
+    manifest_path: Optional[str] = None,
+    jobs: int = 1,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+    batch_size: int = 1,
+    max_batch_tokens: Optional[int] = None,
+    respect_gitignore: bool = True,
+    since: Optional[str] = None,
+    shard: Optional[Shard] = None,
+) -> Plan:
+    """
+    Report the work an update of the docstrings would do, without calling the OpenAI API.
+
+    The parameters are the same as those of update_docstrings. The cache and the manifest
+    are only read.
+
+    Parameters:
+    - input (str): The path to a Python file or directory containing Python files to update the docstrings in.
+    - replace_existing_docstrings (bool): Whether to replace existing docstrings.
+    - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
+    - exclude_directories (List[str]): A list of directories (or glob patterns) to exclude from the update.
+    - exclude_files (List[str]): A list of files (or glob patterns) to exclude from the update.
+    - concurrency (int): The maximum number of OpenAI API requests in flight at the same time.
+    - cache_dir (Optional[str]): The directory of the persistent docstring cache. No cache is used if not provided.
+    - manifest_path (Optional[str]): The path to the manifest used to skip the files that did not change since the last successful run. Every file is processed if not provided.
+    - jobs (int): The number of processes in which the files of a directory are parsed.
+    - requests_per_minute (Optional[float]): The maximum number of OpenAI API requests per minute. Unlimited if not provided.
+    - tokens_per_minute (Optional[float]): The maximum number of OpenAI API tokens per minute. Unlimited if not provided.
+    - batch_size (int): The maximum number of functions documented by a single OpenAI API request.
+    - max_batch_tokens (Optional[int]): The maximum estimated number of tokens of the functions documented by a single OpenAI API request. Unlimited if not provided.
+    - respect_gitignore (bool): Whether to skip the files and directories ignored by .gitignore files.
+    - since (Optional[str]): The git reference since which the changed functions are documented. Every function is if not provided.
+    - shard (Optional[Shard]): The shard of the files to update. Every file is updated if not provided.
+
+    Returns:
+    - Plan: The estimated work of the update.
+    """
+    is_file = _check_input(input, exclude_directories, exclude_files)
+    changes = _read_changes(since, input) if is_file is not None else None
+    if is_file is None:
+        files = []
+    elif is_file:
+        in_shard = shard is None or shard.contains(input, os.path.dirname(input))
+        files = [input] if in_shard else []
+    else:
+        files = iter_python_files(
+            input, exclude_directories, exclude_files, respect_gitignore, shard
+        )
+
+    manifest = None
+    if manifest_path is not None:
+        settings = run_settings(
+            replace_existing_docstrings, skip_constructor_docstrings, since
         )
-    elif os.path.isdir(input):
-        # Check if the directory is in the list of excluded directories
-        if os.path.basename(input) in exclude_directories:
-            return
-        # Update the docstrings in all Python files in the directory and its subdirectories
-        update_docstrings_in_directory(
-            input,
+        manifest = Manifest(manifest_path, settings)
+
+    # A cache that does not exist yet has no docstrings to reuse
+    cache = None
+    if cache_dir is not None and os.path.isdir(cache_dir):
+        cache = DocstringCache(cache_dir)
+    try:
+        plan = make_plan(
+            files,
             replace_existing_docstrings,
             skip_constructor_docstrings,
-            exclude_directories,
-            exclude_files,
-        )
-    else:
-        # The input is not a valid file or directory
-        typer.secho(
-            "Invalid input. The input must be either a valid python file or a valid directory",
-            fg=typer.colors.RED,
+            cache=cache,
+            manifest=manifest,
+            batch_size=batch_size,
+            max_batch_tokens=max_batch_tokens,
+            jobs=jobs,
+            changes=changes,
         )
-        sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close(evict=False)
+
+    duration = estimate_duration(
+        plan, concurrency, requests_per_minute, tokens_per_minute
+    )
+    print_plan(plan, duration)
+    return plan
+
+
+def merge_run_reports(
+    paths: List[str], output_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Merge the reports of the runs which processed the shards of the same files.
+
+    Raises ConfigurationError if a report cannot be read, and FailedFilesError once the
+    merged report is written if one of the files failed.
+
+    Parameters:
+    - paths (List[str]): The paths to the reports of the runs.
+    - output_path (Optional[str]): The path to which the merged report is written, in JSON. It is only printed if not provided.
+
+    Returns:
+    - Dict[str, Any]: The merged report.
+    """
+    reports = []
+    for path in paths:
+        try:
+            with open(path, "r") as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError) as error:
+            raise ConfigurationError(
+                f"Cannot read the report {path}: {error}"
+            ) from error
+    report = merge_reports(reports)
+    if output_path is not None:
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=1)
+    print_report(report)
+
+    # Fail if one of the shards failed to process some of its files
+    statuses = [entry["status"] for entry in report["files"].values()]
+    if "failed" in statuses:
+        raise FailedFilesError(statuses.count("failed"))
+    return report
 
 
 def _extract_exclude_list(exclude: str) -> List[str]:
@@ -242,7 +1056,102 @@ def _extract_exclude_list(exclude: str) -> List[str]:
     return [x.strip() for x in exclude.split(",") if x.strip() != ""]
 
 
+def _positive_int(value: str) -> int:
+    """
+    Parse a strictly positive integer command-line argument.
+
+    Parameters:
+    - value (str): The raw value of the argument.
+
+    Returns:
+    - int: The parsed integer.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a positive integer")
+    return number
+
+
+def _priority_list(value: str) -> List[str]:
+    """
+    Parse a comma-separated list of priorities command-line argument.
+
+    Parameters:
+    - value (str): The raw value of the argument.
+
+    Returns:
+    - List[str]: The priorities, from the most to the least significant.
+    """
+    priorities = _extract_exclude_list(value)
+    for priority in priorities:
+        if priority not in PRIORITIES:
+            raise argparse.ArgumentTypeError(
+                f"{priority!r} is not one of {', '.join(PRIORITIES)}"
+            )
+    if not priorities:
+        raise argparse.ArgumentTypeError("no priority given")
+    return priorities
+
+
+def _shard(value: str) -> Shard:
+    """
+    Parse a shard command-line argument.
+
+    Parameters:
+    - value (str): The raw value of the argument, such as 2/4.
+
+    Returns:
+    - Shard: The parsed shard.
+    """
+    try:
+        return Shard.parse(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"{value!r} is not a shard i/n with 1 <= i <= n"
+        )
+
+
+def _merge_reports_main(argv: List[str]) -> None:
+    """
+    Run the merge-reports subcommand.
+
+    Parameters:
+    - argv (List[str]): The command-line arguments following the subcommand.
+    """
+    parser = argparse.ArgumentParser(prog="autodocstrings merge-reports")
+    parser.add_argument(
+        "reports",
+        nargs="+",
+        help="The paths to the reports written with --report by the runs of every shard.",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Path to which the merged report is written. It is only printed if not set.",
+    )
+    args = parser.parse_args(argv)
+    merge_run_reports(args.reports, args.output)
+
+
 def main() -> None:
+    try:
+        _main()
+    except AutodocstringsError as error:
+        secho(str(error), fg=RED)
+        sys.exit(1)
+
+
+def _main() -> None:
+    """
+    Run the command line, letting the errors ending the run propagate.
+    """
+    if sys.argv[1:2] == ["merge-reports"]:
+        _merge_reports_main(sys.argv[2:])
+        return
+
     # Parse the command-line arguments
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -262,23 +1171,200 @@ def main() -> None:
     parser.add_argument(
         "--exclude-directories",
         default="",
-        help="Comma-seperated list of directories to exclude.",
+        help="Comma-seperated list of directories (or glob patterns) to exclude.",
     )
     parser.add_argument(
         "--exclude-files",
         default="",
-        help="Comma-seperated list of files to exclude.",
+        help="Comma-seperated list of files (or glob patterns) to exclude.",
+    )
+    parser.add_argument(
+        "--no-gitignore",
+        action="store_true",
+        help="Do not skip the files and directories ignored by .gitignore files.",
+    )
+    parser.add_argument(
+        "--since",
+        default=None,
+        help="Only document the functions changed since this git reference, including those of untracked files.",
+    )
+    parser.add_argument(
+        "--shard",
+        type=_shard,
+        default=None,
+        help="Only update the files of this shard, written i/n, so that n runs on different machines each update one of them. The files are partitioned by a hash of their path.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep watching the files once updated, and update the docstrings of the functions changed in them until interrupted.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=_positive_int,
+        default=4,
+        help="Maximum number of OpenAI API requests in flight at the same time.",
+    )
+    parser.add_argument(
+        "--requests-per-minute",
+        type=_positive_int,
+        default=None,
+        help="Maximum number of OpenAI API requests per minute. Unlimited if not set.",
+    )
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=_positive_int,
+        default=None,
+        help="Maximum number of OpenAI API tokens per minute. Unlimited if not set.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=_positive_int,
+        default=1,
+        help="Maximum number of functions documented by a single OpenAI API request.",
+    )
+    parser.add_argument(
+        "--max-batch-tokens",
+        type=_positive_int,
+        default=None,
+        help="Maximum estimated number of tokens of the functions documented by a single OpenAI API request. Unlimited if not set.",
+    )
+    parser.add_argument(
+        "--priority",
+        type=_priority_list,
+        default=None,
+        help=f"Comma-separated list of the priorities in which the functions are documented, from the most to the least significant, among {', '.join(PRIORITIES)}. The functions are documented in the order they are found if not set.",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=_positive_int,
+        default=None,
+        help="Maximum number of OpenAI API requests of the run, after which the remaining functions are left undocumented. Unlimited if not set.",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=_positive_int,
+        default=None,
+        help="Maximum estimated number of OpenAI API tokens of the run, after which the remaining functions are left undocumented. Unlimited if not set.",
+    )
+    parser.add_argument(
+        "--max-pending-requests",
+        type=_positive_int,
+        default=None,
+        help=f"Maximum number of functions waiting for an OpenAI API request, beyond which the files wait before submitting more. {PENDING_REQUESTS_PER_BATCH} times the concurrency and the batch size if not set.",
+    )
+    parser.add_argument(
+        "--deduplication-window",
+        type=_positive_int,
+        default=DEDUPLICATION_WINDOW,
+        help="Number of distinct functions remembered to document identical ones only once.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=_positive_int,
+        default=1,
+        help="Number of processes in which the Python files are parsed.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory of the persistent cache of generated docstrings. No cache is used if not set.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip the files that did not change since the last successful run.",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=".autodocstrings-manifest.json",
+        help="Path to the manifest of the files processed by the last successful run, used by --incremental.",
+    )
+    parser.add_argument(
+        "--journal",
+        default=None,
+        help="Path to the journal to which the generated docstrings are appended until the run completes, so that it can be resumed if interrupted. No journal is written if not set.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Replay the docstrings of the journal of an interrupted run instead of generating them again. Requires --journal.",
+    )
+    parser.add_argument(
+        "--api-base",
+        default=None,
+        help="Base URL of an OpenAI-compatible completion API, such as a self-hosted endpoint or the stub server. The OpenAI Python client is used if not set.",
+    )
+    parser.add_argument(
+        "--metrics-out",
+        default=None,
+        help="Path to which the timings and counters of the run are written, in the Prometheus text format if it ends with .prom and in JSON otherwise.",
+    )
+    parser.add_argument(
+        "--report",
+        default=None,
+        help="Path to which the report of the files modified, left untouched, skipped and failed by the run is written, in JSON. The reports of the shards of a run can be combined with the merge-reports subcommand.",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="Path to which a cProfile dump of the run is written, to be read with the pstats module.",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Report the functions, requests, tokens and time an update would take, without calling the OpenAI API.",
     )
     args = parser.parse_args()
+    if args.resume and args.journal is None:
+        parser.error("--resume requires --journal")
 
     exclude_directories = _extract_exclude_list(args.exclude_directories)
     exclude_files = _extract_exclude_list(args.exclude_files)
 
-    # Update the docstrings
-    update_docstrings(
-        args.input,
-        args.replace_existing_docstrings,
-        args.skip_constructor_docstrings,
-        exclude_directories,
-        exclude_files,
+    # The settings shared by the update and its plan
+    settings = dict(
+        concurrency=args.concurrency,
+        cache_dir=args.cache_dir,
+        manifest_path=args.manifest if args.incremental else None,
+        jobs=args.jobs,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        batch_size=args.batch_size,
+        max_batch_tokens=args.max_batch_tokens,
+        respect_gitignore=not args.no_gitignore,
+        since=args.since,
+        shard=args.shard,
     )
+    with profile(args.profile) if args.profile else contextlib.nullcontext():
+        if args.plan:
+            # Only report what the update would do
+            plan_update(
+                args.input,
+                args.replace_existing_docstrings,
+                args.skip_constructor_docstrings,
+                exclude_directories,
+                exclude_files,
+                **settings,
+            )
+        else:
+            # Update the docstrings
+            update_docstrings(
+                args.input,
+                args.replace_existing_docstrings,
+                args.skip_constructor_docstrings,
+                exclude_directories,
+                exclude_files,
+                **settings,
+                api_base=args.api_base,
+                metrics_path=args.metrics_out,
+                watch=args.watch,
+                journal_path=args.journal,
+                resume=args.resume,
+                priority=args.priority,
+                max_requests=args.max_requests,
+                max_tokens=args.max_tokens,
+                report_path=args.report,
+                max_pending_requests=args.max_pending_requests,
+                deduplication_window=args.deduplication_window,
+            )
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import threading
+
+from typing import Any, Dict
+
+
+def _hash_file(file: str) -> str:
+    """
+    Compute the SHA-256 digest of the contents of a file.
+
+    Parameters:
+    - file (str): The path to the file.
+
+    Returns:
+    - str: The hexadecimal digest of the file contents.
+    """
+    with open(file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class Manifest:
+    """
+    Record of the files processed by the last successful run, used to skip the unchanged ones.
+
+    Each file is recorded with its size, modification time and content hash. A file whose
+    size and modification time did not change is considered unchanged without being read.
+    The manifest is discarded when the settings of the run differ from the recorded ones.
+
+    Parameters:
+    - path (str): The path to the manifest file.
+    - settings (Dict[str, Any]): The JSON-serializable settings that influence how files are processed.
+    """
+
+    def __init__(self, path: str, settings: Dict[str, Any]) -> None:
+        self.path = path
+        self.settings = settings
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("settings") == settings:
+                self._files = manifest["files"]
+
+    def is_unchanged(self, file: str) -> bool:
+        """
+        Check whether a file is unchanged since it was last recorded.
+
+        Parameters:
+        - file (str): The path to the file.
+
+        Returns:
+        - bool: Whether the file is unchanged.
+        """
+        with self._lock:
+            entry = self._files.get(os.path.abspath(file))
+        if entry is None:
+            return False
+        stat = os.stat(file)
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns == entry["mtime"]:
+            return True
+        # The file was touched, only its contents tell whether it changed
+        if _hash_file(file) != entry["sha256"]:
+            return False
+        with self._lock:
+            entry["mtime"] = stat.st_mtime_ns
+        return True
+
+    def record(self, file: str) -> None:
+        """
+        Record the current state of a processed file.
+
+        Parameters:
+        - file (str): The path to the file.
+        """
+        stat = os.stat(file)
+        entry = {
+            "sha256": _hash_file(file),
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+        }
+        with self._lock:
+            self._files[os.path.abspath(file)] = entry
+
+    def save(self) -> None:
+        """
+        Write the manifest to disk, replacing the previous one atomically.
+        """
+        with self._lock:
+            manifest = {"settings": self.settings, "files": self._files}
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w") as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+            os.replace(temporary_path, self.path)
@@ -0,0 +1,335 @@
+import contextlib
+import cProfile
+import json
+import math
+import pstats
+import threading
+import time
+
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, TypeVar
+
+# The upper bounds in seconds of the buckets of the latency histograms
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+T = TypeVar("T")
+
+
+class _Histogram:
+    """
+    Distribution of observed values over fixed buckets.
+
+    Parameters:
+    - buckets (Tuple[float, ...]): The increasing upper bounds of the buckets, the last one being infinite.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Add a value to the distribution.
+
+        Parameters:
+        - value (float): The observed value.
+        """
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> List[int]:
+        """
+        Count the values below every bucket bound.
+
+        Returns:
+        - List[int]: The number of values lower or equal to each bound.
+        """
+        counts = []
+        total = 0
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+def _bound(bound: float) -> str:
+    """
+    Format a bucket bound like Prometheus does.
+
+    Parameters:
+    - bound (float): The bucket bound.
+
+    Returns:
+    - str: The formatted bound.
+    """
+    return "+Inf" if bound == math.inf else f"{bound:g}"
+
+
+def _label(value: str) -> str:
+    """
+    Escape a Prometheus label value.
+
+    Parameters:
+    - value (str): The value of the label.
+
+    Returns:
+    - str: The escaped value.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    Thread-safe collector of the timings and counters of a run.
+
+    Phase timers add up the time spent in every phase by all the threads, so their total
+    can exceed the duration of the run.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self._phases: Dict[str, List[float]] = {}
+        self._counters: Dict[str, float] = {}
+        self._histograms: Dict[str, _Histogram] = {}
+        self._files: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        """
+        Record time spent in a phase.
+
+        Parameters:
+        - phase (str): The name of the phase.
+        - seconds (float): The time spent.
+        """
+        with self._lock:
+            entry = self._phases.setdefault(phase, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    @contextlib.contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        """
+        Time the code run in the context as a phase.
+
+        Parameters:
+        - phase (str): The name of the phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def timed_iter(self, phase: str, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        Time the production of every item of a lazy iterable as a phase.
+
+        Parameters:
+        - phase (str): The name of the phase.
+        - iterable (Iterable[T]): The iterable.
+
+        Returns:
+        - Iterator[T]: The items of the iterable.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.timer(phase):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def increment(self, counter: str, amount: float = 1) -> None:
+        """
+        Increase a counter.
+
+        Parameters:
+        - counter (str): The name of the counter.
+        - amount (float): The amount added to the counter.
+        """
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def counter(self, counter: str) -> float:
+        """
+        Get the value of a counter.
+
+        Parameters:
+        - counter (str): The name of the counter.
+
+        Returns:
+        - float: The value of the counter, 0 if it was never increased.
+        """
+        with self._lock:
+            return self._counters.get(counter, 0)
+
+    def observe(
+        self, histogram: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        """
+        Add a value to a histogram.
+
+        Parameters:
+        - histogram (str): The name of the histogram.
+        - value (float): The observed value.
+        - buckets (Tuple[float, ...]): The bucket bounds used if the histogram does not exist yet.
+        """
+        with self._lock:
+            self._histograms.setdefault(histogram, _Histogram(buckets)).observe(value)
+
+    def record_file(self, file: str, seconds: float, functions: int) -> None:
+        """
+        Record the processing of a file.
+
+        Parameters:
+        - file (str): The path to the file.
+        - seconds (float): The time from the start of its processing to the write of its docstrings.
+        - functions (int): The number of functions documented in the file.
+        """
+        with self._lock:
+            self._files[file] = {"seconds": seconds, "functions": functions}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Export the metrics as JSON-serializable data.
+
+        Returns:
+        - Dict[str, Any]: The metrics.
+        """
+        with self._lock:
+            metrics: Dict[str, Any] = {
+                "run_seconds": time.perf_counter() - self.started_at,
+                "phases": {
+                    phase: {"seconds": seconds, "count": count}
+                    for phase, (seconds, count) in sorted(self._phases.items())
+                },
+                "counters": dict(sorted(self._counters.items())),
+                "histograms": {
+                    name: {
+                        "buckets": {
+                            _bound(bound): count
+                            for bound, count in zip(
+                                histogram.buckets, histogram.cumulative_counts()
+                            )
+                        },
+                        "sum": histogram.sum,
+                        "count": histogram.count,
+                    }
+                    for name, histogram in sorted(self._histograms.items())
+                },
+                "files": dict(sorted(self._files.items())),
+            }
+        hits = metrics["counters"].get("cache_hits", 0)
+        misses = metrics["counters"].get("cache_misses", 0)
+        if hits + misses:
+            metrics["cache_hit_rate"] = hits / (hits + misses)
+        return metrics
+
+    def to_prometheus(self) -> str:
+        """
+        Export the metrics in the Prometheus text format.
+
+        Returns:
+        - str: The metrics.
+        """
+        metrics = self.to_dict()
+        lines = [
+            "# TYPE autodocstrings_run_seconds gauge",
+            f"autodocstrings_run_seconds {metrics['run_seconds']}",
+            "# TYPE autodocstrings_phase_seconds_total counter",
+        ]
+        for phase, entry in metrics["phases"].items():
+            lines.append(
+                f'autodocstrings_phase_seconds_total{{phase="{phase}"}} {entry["seconds"]}'
+            )
+        lines.append("# TYPE autodocstrings_phase_calls_total counter")
+        for phase, entry in metrics["phases"].items():
+            lines.append(
+                f'autodocstrings_phase_calls_total{{phase="{phase}"}} {entry["count"]}'
+            )
+        for counter, value in metrics["counters"].items():
+            lines.append(f"# TYPE autodocstrings_{counter}_total counter")
+            lines.append(f"autodocstrings_{counter}_total {value}")
+        if "cache_hit_rate" in metrics:
+            lines.append("# TYPE autodocstrings_cache_hit_rate gauge")
+            lines.append(f"autodocstrings_cache_hit_rate {metrics['cache_hit_rate']}")
+        for name, histogram in metrics["histograms"].items():
+            lines.append(f"# TYPE autodocstrings_{name} histogram")
+            for bound, count in histogram["buckets"].items():
+                lines.append(f'autodocstrings_{name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f"autodocstrings_{name}_sum {histogram['sum']}")
+            lines.append(f"autodocstrings_{name}_count {histogram['count']}")
+        lines.append("# TYPE autodocstrings_file_seconds gauge")
+        for file, entry in metrics["files"].items():
+            lines.append(
+                f'autodocstrings_file_seconds{{file="{_label(file)}"}} {entry["seconds"]}'
+            )
+        lines.append("# TYPE autodocstrings_file_functions gauge")
+        for file, entry in metrics["files"].items():
+            lines.append(
+                f'autodocstrings_file_functions{{file="{_label(file)}"}} {entry["functions"]}'
+            )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """
+        Write the metrics to a file, in the Prometheus text format if its extension is .prom and in JSON otherwise.
+
+        Parameters:
+        - path (str): The path to the file.
+        """
+        with open(path, "w") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=1)
+
+
+@contextlib.contextmanager
+def profile(path: str) -> Iterator[None]:
+    """
+    Profile the code run in the context, including the threads it starts, and dump the statistics to a file.
+
+    Parameters:
+    - path (str): The path to the file, which can be read with the pstats module.
+    """
+    profiler = cProfile.Profile()
+    thread_profilers = []
+    lock = threading.Lock()
+    run = threading.Thread.run
+
+    def profiled_run(thread: threading.Thread) -> None:
+        thread_profiler = cProfile.Profile()
+        try:
+            thread_profiler.enable()
+        except ValueError:
+            # Since Python 3.12, the profiler of the main thread sees every thread
+            run(thread)
+            return
+        try:
+            run(thread)
+        finally:
+            thread_profiler.disable()
+            with lock:
+                thread_profilers.append(thread_profiler)
+
+    # Profile the threads started in the context, each with its own profiler
+    threading.Thread.run = profiled_run
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        threading.Thread.run = run
+        stats = pstats.Stats(profiler)
+        with lock:
+            for thread_profiler in thread_profilers:
+                stats.add(thread_profiler)
+        stats.dump_stats(path)
@@ -0,0 +1,247 @@
+import ast
+import inspect
+import re
+
+from typing import Iterable, List, NamedTuple, Optional, Union
+
+# The line breaks recognized by the Python tokenizer
+LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+FunctionNode = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+
+class Edit(NamedTuple):
+    """
+    A replacement of the source text between two character offsets.
+    """
+
+    start: int
+    end: int
+    text: str
+
+
+class DocstringSlot(NamedTuple):
+    """
+    The place in the source where the docstring of a function is written.
+    """
+
+    start: int
+    end: int
+    indent: str
+    prefix: str
+    suffix: str
+    newline: str
+
+    def edit(self, docstring: str) -> Edit:
+        """
+        Build the edit writing a docstring into the slot.
+
+        Parameters:
+        - docstring (str): The docstring to write.
+
+        Returns:
+        - Edit: The edit writing the docstring.
+        """
+        literal = render_docstring(docstring, self.indent, self.newline)
+        return Edit(self.start, self.end, self.prefix + literal + self.suffix)
+
+
+def line_offsets(source: str) -> List[int]:
+    """
+    Compute the character offset at which each line of the source starts.
+
+    Parameters:
+    - source (str): The source code.
+
+    Returns:
+    - List[int]: The offset of every line, the first line being at index 0.
+    """
+    return [0] + [match.end() for match in LINE_BREAK.finditer(source)]
+
+
+def _offset(source: str, offsets: List[int], lineno: int, col_offset: int) -> int:
+    """
+    Convert an AST position into a character offset in the source.
+
+    Parameters:
+    - source (str): The source code.
+    - offsets (List[int]): The line offsets of the source.
+    - lineno (int): The line number of the position, starting at 1.
+    - col_offset (int): The column of the position, in UTF-8 bytes.
+
+    Returns:
+    - int: The character offset of the position.
+    """
+    line_start = offsets[lineno - 1]
+    # AST columns count UTF-8 bytes, which are never fewer than characters
+    prefix = source[line_start : line_start + col_offset].encode("utf-8")
+    return line_start + len(prefix[:col_offset].decode("utf-8", errors="ignore"))
+
+
+def _indentation(source: str, offset: int) -> str:
+    """
+    Get the leading whitespace of the source starting at an offset.
+
+    Parameters:
+    - source (str): The source code.
+    - offset (int): The offset at which the whitespace starts.
+
+    Returns:
+    - str: The leading whitespace.
+    """
+    end = offset
+    while end < len(source) and source[end] in " \t":
+        end += 1
+    return source[offset:end]
+
+
+def has_docstring(node: FunctionNode) -> bool:
+    """
+    Check whether a function starts with a docstring.
+
+    Parameters:
+    - node (FunctionNode): The function definition.
+
+    Returns:
+    - bool: Whether the first statement of the function is a string literal.
+    """
+    return (
+        isinstance(node.body[0], ast.Expr)
+        and isinstance(node.body[0].value, ast.Constant)
+        and isinstance(node.body[0].value.value, str)
+    )
+
+
+def locate_docstring(
+    source: str, offsets: List[int], node: FunctionNode
+) -> DocstringSlot:
+    """
+    Find where the docstring of a function is written, replacing its current docstring if any.
+
+    Parameters:
+    - source (str): The source code containing the function.
+    - offsets (List[int]): The line offsets of the source.
+    - node (FunctionNode): The function definition, parsed from the source.
+
+    Returns:
+    - DocstringSlot: The place of the docstring in the source.
+    """
+    match = LINE_BREAK.search(source)
+    newline = match.group() if match else "\n"
+    first = node.body[0]
+    decorators = getattr(first, "decorator_list", [])
+
+    if decorators:
+        # Decorated definitions always start on their own line, at their first decorator
+        line_start = offsets[min(d.lineno for d in decorators) - 1]
+        start = line_start + len(_indentation(source, line_start))
+    else:
+        line_start = offsets[first.lineno - 1]
+        start = _offset(source, offsets, first.lineno, first.col_offset)
+    end = start
+    if has_docstring(node):
+        end = _offset(source, offsets, first.end_lineno, first.end_col_offset)
+
+    if source[line_start:start].strip() == "":
+        # The body starts on its own line, the docstring goes right before it
+        indent = source[line_start:start]
+        if end == start:
+            return DocstringSlot(
+                line_start, line_start, indent, indent, newline, newline
+            )
+        return DocstringSlot(start, end, indent, "", "", newline)
+
+    # The body is on the same line as the signature, so it is moved to its own lines
+    header_indent = _indentation(source, offsets[node.lineno - 1])
+    indent = header_indent + ("\t" if "\t" in header_indent else "    ")
+    # Without a docstring to replace, the first statement follows on its own line
+    suffix = newline + indent if end == start else ""
+    while source[start - 1] in " \t":
+        start -= 1
+    return DocstringSlot(start, end, indent, newline + indent, suffix, newline)
+
+
+def function_source(
+    source: str, offsets: List[int], node: FunctionNode
+) -> Optional[str]:
+    """
+    Slice the code of a function out of the source, leaving its docstring out.
+
+    Parameters:
+    - source (str): The source code containing the function.
+    - offsets (List[int]): The line offsets of the source.
+    - node (FunctionNode): The function definition, parsed from the source.
+
+    Returns:
+    - Optional[str]: The dedented code of the function and its decorators, or None if it cannot be sliced cleanly.
+    """
+    # Compound statements always start their own line
+    start = offsets[min([node.lineno] + [d.lineno for d in node.decorator_list]) - 1]
+    end = _offset(source, offsets, node.end_lineno, node.end_col_offset)
+    code = source[start:end]
+
+    if has_docstring(node):
+        docstring = node.body[0]
+        line_start = offsets[docstring.lineno - 1]
+        literal_start = _offset(source, offsets, docstring.lineno, docstring.col_offset)
+        literal_end = _offset(
+            source, offsets, docstring.end_lineno, docstring.end_col_offset
+        )
+        line_end = (
+            offsets[docstring.end_lineno]
+            if docstring.end_lineno < len(offsets)
+            else len(source)
+        )
+        if (
+            source[line_start:literal_start].strip()
+            or source[literal_end:line_end].strip()
+        ):
+            # The docstring shares its lines with other code
+            return None
+        code = source[start:line_start] + source[line_end:end]
+
+    indent = _indentation(source, start)
+    lines = LINE_BREAK.split(code)
+    if any(line.strip() and not line.startswith(indent) for line in lines):
+        # A line is less indented than the definition, like in a multi-line string
+        return None
+    return "\n".join(line[len(indent) :] for line in lines)
+
+
+def render_docstring(docstring: str, indent: str, newline: str = "\n") -> str:
+    """
+    Render a docstring as a triple-quoted string literal.
+
+    Parameters:
+    - docstring (str): The text of the docstring.
+    - indent (str): The indentation of the docstring lines.
+    - newline (str): The line break used in the source.
+
+    Returns:
+    - str: The string literal, whose first line is not indented.
+    """
+    text = inspect.cleandoc(docstring)
+    text = text.replace("\\", "\\\\").replace('"""', '\\"\\"\\"')
+    lines = [indent + line if line.strip() else "" for line in text.splitlines()]
+    return '"""' + newline + newline.join(lines) + newline + indent + '"""'
+
+
+def apply_edits(source: str, edits: Iterable[Edit]) -> str:
+    """
+    Apply non-overlapping edits to the source in a single pass.
+
+    Parameters:
+    - source (str): The source code.
+    - edits (Iterable[Edit]): The edits to apply.
+
+    Returns:
+    - str: The edited source code.
+    """
+    parts = []
+    position = 0
+    for edit in sorted(edits, key=lambda edit: (edit.start, edit.end)):
+        parts.append(source[position : edit.start])
+        parts.append(edit.text)
+        position = edit.end
+    parts.append(source[position:])
+    return "".join(parts)
@@ -0,0 +1,287 @@
+import concurrent.futures
+import functools
+import math
+import multiprocessing
+
+from autodocstrings.cache import DocstringCache
+from autodocstrings.console import secho
+from autodocstrings.extract import read_candidates
+from autodocstrings.gitdiff import GitChanges, LineRange
+from autodocstrings.manifest import Manifest
+from autodocstrings.prompts import build_prompt, cache_key
+from autodocstrings.ratelimit import estimate_tokens
+from autodocstrings.routing import route
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# The assumed time in seconds the OpenAI API takes to answer a request
+REQUEST_LATENCY = 5.0
+
+
+class Plan(NamedTuple):
+    """
+    The work a run would do, estimated without calling the OpenAI API.
+    """
+
+    files: int
+    unchanged_files: int
+    functions: int
+    cached_functions: int
+    duplicate_functions: int
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    templated_functions: int = 0
+    failed_files: int = 0
+
+
+def _scan_file(
+    file: str,
+    changed_lines: Optional[List[LineRange]],
+    replace_existing_docstrings: bool,
+    skip_constructor_docstrings: bool,
+) -> Optional[List[Tuple[str, str]]]:
+    """
+    Find the functions of a Python file whose docstrings would be generated.
+
+    Parameters:
+    - file (str): The path to the Python file.
+    - changed_lines (Optional[List[LineRange]]): The changed line ranges of the file, if only the functions overlapping them are documented.
+    - replace_existing_docstrings (bool): Whether to replace existing docstrings.
+    - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
+
+    Returns:
+    - Optional[List[Tuple[str, str]]]: The code block and name of every function to document, or None if the file cannot be parsed.
+    """
+    try:
+        _, candidates = read_candidates(
+            file,
+            replace_existing_docstrings,
+            skip_constructor_docstrings,
+            changed_lines=changed_lines,
+        )
+    except (SyntaxError, UnicodeDecodeError, ValueError):
+        # The run skips the file too, and fails once the others are updated
+        return None
+    return [(candidate.code_block, candidate.name) for candidate in candidates]
+
+
+def _completion_tokens(batch_models: Dict[str, Tuple[int, int]]) -> int:
+    """
+    Compute the maximum number of completion tokens of the requests of a batch.
+
+    Parameters:
+    - batch_models (Dict[str, Tuple[int, int]]): The number of functions and the longest completion of every model of the batch.
+
+    Returns:
+    - int: The number of tokens, every completion of a request being at most as long as its longest one.
+    """
+    return sum(count * longest for count, longest in batch_models.values())
+
+
+def make_plan(
+    files: Iterable[str],
+    replace_existing_docstrings: bool,
+    skip_constructor_docstrings: bool,
+    cache: Optional[DocstringCache] = None,
+    manifest: Optional[Manifest] = None,
+    batch_size: int = 1,
+    max_batch_tokens: Optional[int] = None,
+    jobs: int = 1,
+    changes: Optional[GitChanges] = None,
+) -> Plan:
+    """
+    Estimate the requests and tokens needed to update the docstrings of Python files.
+
+    The files are parsed and the prompts built exactly as in a real run, and the
+    requests are batched the same way, but nothing is sent to the OpenAI API.
+
+    Parameters:
+    - files (Iterable[str]): The paths to the Python files.
+    - replace_existing_docstrings (bool): Whether to replace existing docstrings.
+    - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
+    - cache (Optional[DocstringCache]): The cache of previously generated docstrings, whose entries need no request.
+    - manifest (Optional[Manifest]): The manifest of the last successful run. The files that did not change since then are skipped.
+    - batch_size (int): The maximum number of functions documented by a single request.
+    - max_batch_tokens (Optional[int]): The maximum estimated number of tokens of the functions documented by a single request. Unlimited if not provided.
+    - jobs (int): The number of processes in which the files are parsed.
+    - changes (Optional[GitChanges]): The lines changed since a git reference. Only the functions overlapping them are counted. Every function is if not provided.
+
+    Returns:
+    - Plan: The estimated work.
+    """
+    pending = []
+    changed_lines = []
+    unchanged_files = 0
+    for file in files:
+        if changes is not None and not changes.is_changed(file):
+            unchanged_files += 1
+        elif manifest is not None and manifest.is_unchanged(file):
+            unchanged_files += 1
+        else:
+            pending.append(file)
+            changed_lines.append(
+                None if changes is None else changes.changed_lines(file)
+            )
+
+    scan = functools.partial(
+        _scan_file,
+        replace_existing_docstrings=replace_existing_docstrings,
+        skip_constructor_docstrings=skip_constructor_docstrings,
+    )
+    process_pool = None
+    if jobs > 1:
+        process_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+        )
+    try:
+        if process_pool is None:
+            scanned = map(scan, pending, changed_lines)
+        else:
+            chunksize = max(1, len(pending) // (jobs * 4))
+            scanned = process_pool.map(
+                scan, pending, changed_lines, chunksize=chunksize
+            )
+
+        failed_files = 0
+        functions = cached_functions = duplicate_functions = templated_functions = 0
+        requests = prompt_tokens = completion_tokens = 0
+        batch_length = batch_tokens = 0
+        # The number of functions and the longest completion of every model of the batch
+        batch_models: Dict[str, Tuple[int, int]] = {}
+        seen = set()
+        for file_requests in scanned:
+            if file_requests is None:
+                failed_files += 1
+                continue
+            for code_block, block_name in file_requests:
+                functions += 1
+                code_route = route(code_block)
+                if code_route.docstring is not None:
+                    templated_functions += 1
+                    continue
+                key = cache_key(code_block, block_name, code_route)
+                if cache is not None and cache.contains(key):
+                    cached_functions += 1
+                    continue
+                # Identical functions share the request of the first one
+                if key in seen:
+                    duplicate_functions += 1
+                    continue
+                seen.add(key)
+                # Batch the requests like the scheduler does, in the order they are found
+                tokens = estimate_tokens(code_block)
+                if (
+                    batch_length == 0
+                    or batch_length == batch_size
+                    or (
+                        max_batch_tokens is not None
+                        and batch_tokens + tokens > max_batch_tokens
+                    )
+                ):
+                    completion_tokens += _completion_tokens(batch_models)
+                    batch_length = batch_tokens = 0
+                    batch_models = {}
+                # Every model of a batch is sent its own request
+                if code_route.model not in batch_models:
+                    requests += 1
+                count, longest = batch_models.get(code_route.model, (0, 0))
+                batch_models[code_route.model] = (
+                    count + 1,
+                    max(longest, code_route.max_tokens),
+                )
+                batch_length += 1
+                batch_tokens += tokens
+                prompt_tokens += estimate_tokens(build_prompt(code_block, block_name))
+        completion_tokens += _completion_tokens(batch_models)
+    finally:
+        if process_pool is not None:
+            process_pool.shutdown()
+
+    return Plan(
+        len(pending),
+        unchanged_files,
+        functions,
+        cached_functions,
+        duplicate_functions,
+        requests,
+        prompt_tokens,
+        completion_tokens,
+        templated_functions,
+        failed_files,
+    )
+
+
+def estimate_duration(
+    plan: Plan,
+    concurrency: int = 1,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+    latency: float = REQUEST_LATENCY,
+) -> float:
+    """
+    Estimate the time a run would take, bounded by the latency of the requests and the rate limits.
+
+    Parameters:
+    - plan (Plan): The estimated work of the run.
+    - concurrency (int): The maximum number of requests in flight at the same time.
+    - requests_per_minute (Optional[float]): The maximum number of requests per minute. Unlimited if not provided.
+    - tokens_per_minute (Optional[float]): The maximum number of tokens per minute. Unlimited if not provided.
+    - latency (float): The time in seconds the OpenAI API takes to answer a request.
+
+    Returns:
+    - float: The estimated duration in seconds.
+    """
+    duration = math.ceil(plan.requests / concurrency) * latency
+    # The rate limiter starts with a full minute of budget
+    if requests_per_minute:
+        excess = plan.requests - requests_per_minute
+        duration = max(duration, excess / requests_per_minute * 60)
+    if tokens_per_minute:
+        excess = plan.prompt_tokens + plan.completion_tokens - tokens_per_minute
+        duration = max(duration, excess / tokens_per_minute * 60)
+    return duration
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Format a duration for humans.
+
+    Parameters:
+    - seconds (float): The duration in seconds.
+
+    Returns:
+    - str: The duration in hours, minutes and seconds.
+    """
+    minutes, seconds = divmod(math.ceil(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m {seconds:02d}s"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+def print_plan(plan: Plan, duration: float) -> None:
+    """
+    Print the estimated work and duration of a run.
+
+    Parameters:
+    - plan (Plan): The estimated work of the run.
+    - duration (float): The estimated duration of the run in seconds.
+    """
+    secho(
+        f"Files: {plan.files} to parse, {plan.unchanged_files} unchanged since the last run,"
+        f" {plan.failed_files} failing to parse"
+    )
+    secho(
+        f"Functions: {plan.functions} to document, {plan.cached_functions} already cached,"
+        f" {plan.duplicate_functions} duplicates,"
+        f" {plan.templated_functions} from templates"
+    )
+    secho(f"Requests: {plan.requests}")
+    secho(f"Prompt tokens: ~{plan.prompt_tokens}")
+    secho(f"Completion tokens: at most {plan.completion_tokens}")
+    secho(
+        f"Expected wall time: ~{format_duration(duration)}"
+        f" (assuming {REQUEST_LATENCY:g}s per request)"
+    )
@@ -0,0 +1,86 @@
+import collections
+import os
+import re
+
+from autodocstrings.extract import Candidate
+from typing import Counter, Dict, List, Sequence, Tuple
+
+# The orders in which the functions can be documented, combined from the most to the least significant
+PRIORITIES = ("public", "calls", "size", "recent")
+
+# A name followed by an opening parenthesis, which is not the name of a function definition
+CALL = re.compile(r"(?<!def )\b(\w+)\s*\(")
+
+
+def count_calls(source: str) -> Counter[str]:
+    """
+    Count the call sites of every name in a Python source, without parsing it.
+
+    The count is approximate: the calls in strings and comments are counted too.
+
+    Parameters:
+    - source (str): The source code.
+
+    Returns:
+    - Counter[str]: The number of calls by function, method or class name.
+    """
+    return collections.Counter(CALL.findall(source))
+
+
+def is_public(path: str) -> bool:
+    """
+    Check whether a function is part of the public interface of its module.
+
+    Parameters:
+    - path (str): The path of the function in its module, such as Foo.bar or foo.<locals>.inner.
+
+    Returns:
+    - bool: False if the function is nested in another one, or if it or one of its classes has a private name.
+    """
+    for name in path.split("."):
+        if name == "<locals>":
+            return False
+        if name.startswith("_") and not (name.startswith("__") and name.endswith("__")):
+            return False
+    return True
+
+
+def prioritize(
+    functions: List[Tuple[str, Candidate]],
+    priorities: Sequence[str],
+    sources: Dict[str, str],
+) -> List[Tuple[str, Candidate]]:
+    """
+    Order the functions to document from the most to the least valuable.
+
+    The priorities are public functions first, the most called first, the largest first
+    and those of the most recently modified files first. The functions that tie are kept
+    in the order they were found.
+
+    Parameters:
+    - functions (List[Tuple[str, Candidate]]): The functions to document, with the path to their file.
+    - priorities (Sequence[str]): The priorities, from the most to the least significant, each one of PRIORITIES.
+    - sources (Dict[str, str]): The contents of the files of the run by path, in which the call sites are counted.
+
+    Returns:
+    - List[Tuple[str, Candidate]]: The functions, in the order they should be documented.
+    """
+    calls: Counter[str] = collections.Counter()
+    if "calls" in priorities:
+        for source in sources.values():
+            calls.update(count_calls(source))
+    modified_at: Dict[str, float] = {}
+    if "recent" in priorities:
+        modified_at = {file: os.stat(file).st_mtime for file, _ in functions}
+
+    def key(function: Tuple[str, Candidate]) -> Tuple[float, ...]:
+        file, candidate = function
+        values = {
+            "public": 0 if is_public(candidate.path) else 1,
+            "calls": -calls[candidate.name],
+            "size": -len(candidate.code_block.splitlines()),
+            "recent": -modified_at.get(file, 0.0),
+        }
+        return tuple(values[priority] for priority in priorities)
+
+    return sorted(functions, key=key)
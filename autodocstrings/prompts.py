@@ -0,0 +1,132 @@
+import textwrap
+
+from autodocstrings.cache import DocstringCache
+from autodocstrings.compaction import compact_code
+from autodocstrings.ratelimit import estimate_tokens
+from autodocstrings.routing import (
+    COMPLETION_TOKENS_PER_COMPLEXITY,
+    MAX_COMPLETION_TOKENS,
+    MIN_COMPLETION_TOKENS,
+    MODEL_ENGINE,
+    SMALL_MODEL_COMPLEXITY,
+    SMALL_MODEL_ENGINE,
+    TEMPLATE_COMPLEXITY,
+    Route,
+    route,
+)
+from typing import Any, Dict, Optional
+
+# The prompt sent to the OpenAI API, the generated docstring is its completion
+PROMPT_TEMPLATE = """# Python3
+{code_block}
+
+# Write a google-style function docstring for the {block_name} python function
+\"""
+"""
+
+# The sampling parameters of the OpenAI API requests, whose maximum number of tokens
+# depends on the functions they document
+COMPLETION_PARAMETERS = {
+    "temperature": 0,
+    "top_p": 1.0,
+    "frequency_penalty": 0.0,
+    "presence_penalty": 0.0,
+    "stop": ["#", '"""'],
+}
+
+# The estimated number of tokens above which the code blocks are compacted to fit in the prompt
+MAX_PROMPT_TOKENS = 2000
+
+
+def prompt_code(code_block: str, block_name: str) -> str:
+    """
+    Prepare a code block for the prompt, compacting it if the prompt would exceed MAX_PROMPT_TOKENS.
+
+    Parameters:
+    - code_block (str): The code block to generate a docstring for.
+    - block_name (str): The name of the code block.
+
+    Returns:
+    - str: The dedented code block, compacted if it is too large.
+    """
+    # Remove leading indentation from the code block
+    code_block = textwrap.dedent(code_block)
+    overhead = estimate_tokens(
+        PROMPT_TEMPLATE.format(code_block="", block_name=block_name)
+    )
+    return compact_code(code_block, MAX_PROMPT_TOKENS - overhead)
+
+
+def build_prompt(code_block: str, block_name: str) -> str:
+    """
+    Build the prompt completed by the OpenAI API into the docstring of a code block.
+
+    Parameters:
+    - code_block (str): The code block to generate a docstring for.
+    - block_name (str): The name of the code block.
+
+    Returns:
+    - str: The prompt.
+    """
+    return PROMPT_TEMPLATE.format(
+        code_block=prompt_code(code_block, block_name), block_name=block_name
+    )
+
+
+def cache_key(
+    code_block: str, block_name: str, code_route: Optional[Route] = None
+) -> str:
+    """
+    Build the key under which the docstring of a code block is cached.
+
+    Parameters:
+    - code_block (str): The code block to generate a docstring for.
+    - block_name (str): The name of the code block.
+    - code_route (Optional[Route]): The route of the code block, which is computed if not provided.
+
+    Returns:
+    - str: The cache key, which changes with the model, the prompt and the sampling parameters.
+    """
+    if code_route is None:
+        code_route = route(code_block)
+    return DocstringCache.make_key(
+        engine=code_route.model,
+        template=PROMPT_TEMPLATE,
+        parameters=dict(COMPLETION_PARAMETERS, max_tokens=code_route.max_tokens),
+        code_block=prompt_code(code_block, block_name),
+        block_name=block_name,
+    )
+
+
+def run_settings(
+    replace_existing_docstrings: bool,
+    skip_constructor_docstrings: bool,
+    since: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Get the settings that influence how files are processed, as recorded in the manifest.
+
+    Parameters:
+    - replace_existing_docstrings (bool): Whether to replace existing docstrings.
+    - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
+    - since (Optional[str]): The git reference since which the changed functions are documented, if only they are.
+
+    Returns:
+    - Dict[str, Any]: The JSON-serializable settings.
+    """
+    return {
+        "replace_existing_docstrings": replace_existing_docstrings,
+        "skip_constructor_docstrings": skip_constructor_docstrings,
+        "since": since,
+        "engine": MODEL_ENGINE,
+        "small_engine": SMALL_MODEL_ENGINE,
+        "template": PROMPT_TEMPLATE,
+        "parameters": COMPLETION_PARAMETERS,
+        "routing": [
+            SMALL_MODEL_COMPLEXITY,
+            TEMPLATE_COMPLEXITY,
+            MIN_COMPLETION_TOKENS,
+            COMPLETION_TOKENS_PER_COMPLEXITY,
+            MAX_COMPLETION_TOKENS,
+        ],
+    }
@@ -0,0 +1,202 @@
+import math
+import random
+import threading
+import time
+
+from typing import List, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text, assuming about four characters per token.
+
+    Parameters:
+    - text (str): The text to estimate the number of tokens of.
+
+    Returns:
+    - int: The estimated number of tokens.
+    """
+    return math.ceil(len(text) / 4)
+
+
+class _TokenBucket:
+    """
+    Budget replenished continuously up to a per-minute limit.
+
+    Parameters:
+    - per_minute (float): The size of the budget, replenished every minute.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated_at = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Take an amount from the budget, going into debt if it is not available yet.
+
+        Parameters:
+        - amount (float): The amount taken from the budget.
+        - now (float): The current monotonic time.
+
+        Returns:
+        - float: The number of seconds to wait until the amount is available.
+        """
+        self.level = min(
+            self.capacity, self.level + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+
+class RateLimiter:
+    """
+    Rate limiter shared by all the requests made to the OpenAI API.
+
+    Requests wait until the requests-per-minute and tokens-per-minute budgets allow them.
+    When the API throttles a request, every request waits for the delay given by the
+    server, or for an exponential backoff with jitter, and the number of requests in
+    flight is halved. It then grows back by one after each round of successful requests.
+
+    Parameters:
+    - requests_per_minute (Optional[float]): The maximum number of requests per minute. Unlimited if not provided.
+    - tokens_per_minute (Optional[float]): The maximum number of tokens per minute. Unlimited if not provided.
+    - max_concurrency (int): The maximum number of requests in flight at the same time.
+    - base_delay (float): The delay in seconds before retrying after a first throttled request.
+    - max_delay (float): The maximum delay in seconds before retrying a throttled request.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = 1,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._requests = (
+            _TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._in_flight = 0
+        self._resume_at = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, tokens: int) -> None:
+        """
+        Wait until a request can be sent.
+
+        Parameters:
+        - tokens (int): The estimated number of tokens of the request.
+        """
+        with self._condition:
+            while self._in_flight >= int(self.concurrency):
+                self._condition.wait()
+            self._in_flight += 1
+            now = time.monotonic()
+            delay = self._resume_at - now
+            if self._requests is not None:
+                delay = max(delay, self._requests.reserve(1, now))
+            if self._tokens is not None:
+                delay = max(delay, self._tokens.reserve(tokens, now))
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self, succeeded: bool) -> None:
+        """
+        Signal that a request completed.
+
+        Parameters:
+        - succeeded (bool): Whether the request succeeded, which lets the concurrency grow back.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if succeeded:
+                self.concurrency = min(
+                    self.max_concurrency, self.concurrency + 1 / self.concurrency
+                )
+            self._condition.notify_all()
+
+    def throttle(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Slow down every request after the API throttled one of them.
+
+        Parameters:
+        - attempt (int): The number of times the throttled request was already retried.
+        - retry_after (Optional[float]): The delay in seconds requested by the server, if any.
+
+        Returns:
+        - float: The delay in seconds before the next request is sent.
+        """
+        if retry_after is None:
+            # Exponential backoff with equal jitter
+            backoff = min(self.max_delay, self.base_delay * 2**attempt)
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+        else:
+            delay = retry_after
+        with self._condition:
+            now = time.monotonic()
+            if now >= self._resume_at:
+                # Only the first throttled request of a burst reduces the concurrency
+                self.concurrency = max(1.0, self.concurrency / 2)
+            self._resume_at = max(self._resume_at, now + delay)
+        return delay
+
+
+class Budget:
+    """
+    Budget of OpenAI API requests and tokens for a whole run.
+
+    The requests take from the budget in the order they are sent. Once the functions of
+    a request do not all fit in it, the budget is exhausted and every later request is
+    refused, so that the functions are documented in the order they were submitted.
+
+    Parameters:
+    - max_requests (Optional[int]): The maximum number of requests. Unlimited if not provided.
+    - max_tokens (Optional[int]): The maximum estimated number of tokens of the prompts and completions. Unlimited if not provided.
+    """
+
+    def __init__(
+        self, max_requests: Optional[int] = None, max_tokens: Optional[int] = None
+    ) -> None:
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self.requests = 0
+        self.tokens = 0
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    def reserve(self, costs: List[int]) -> int:
+        """
+        Take a request from the budget, for as many of its prompts as fit in it.
+
+        Parameters:
+        - costs (List[int]): The estimated number of tokens of every prompt and its completion, in order.
+
+        Returns:
+        - int: The number of prompts, from the first one, that can be sent. None can if it is 0.
+        """
+        with self._lock:
+            if self.max_requests is not None and self.requests >= self.max_requests:
+                self.exhausted = True
+            if self.exhausted:
+                return 0
+            count = 0
+            tokens = self.tokens
+            for cost in costs:
+                if self.max_tokens is not None and tokens + cost > self.max_tokens:
+                    self.exhausted = True
+                    break
+                tokens += cost
+                count += 1
+            if count > 0:
+                self.requests += 1
+                self.tokens = tokens
+            return count
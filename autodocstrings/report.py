@@ -0,0 +1,155 @@
+import json
+import threading
+
+from autodocstrings.console import GREEN, RED, YELLOW, secho
+from autodocstrings.metrics import Metrics
+from autodocstrings.walker import Shard
+from typing import Any, Dict, List, Optional
+
+# The outcomes of a file, in the order they are summarized
+STATUSES = ("modified", "untouched", "skipped", "failed")
+
+
+class RunReport:
+    """
+    Thread-safe record of what a run did to every file.
+
+    It is written as JSON, so that the reports of the runs processing the shards of the
+    same files on different machines can be merged into the report of the whole run.
+
+    Parameters:
+    - shard (Optional[Shard]): The shard of the files processed by the run. None if it processed all of them.
+    """
+
+    def __init__(self, shard: Optional[Shard] = None) -> None:
+        self.shard = shard
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        file: str,
+        status: str,
+        documented: int = 0,
+        undocumented: int = 0,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        Record the outcome of a file.
+
+        Parameters:
+        - file (str): The path to the file.
+        - status (str): The outcome of the file, one of STATUSES.
+        - documented (int): The number of functions documented in the file.
+        - undocumented (int): The number of functions of the file left undocumented because they did not fit in the budget.
+        - error (Optional[str]): The reason why the file failed.
+        """
+        entry: Dict[str, Any] = {"status": status}
+        if documented:
+            entry["documented"] = documented
+        if undocumented:
+            entry["undocumented"] = undocumented
+        if error is not None:
+            entry["error"] = error
+        with self._lock:
+            self._files[file] = entry
+
+    def to_dict(self, metrics: Metrics) -> Dict[str, Any]:
+        """
+        Export the report as JSON-serializable data.
+
+        Parameters:
+        - metrics (Metrics): The metrics of the run, whose duration and counters are reported.
+
+        Returns:
+        - Dict[str, Any]: The report.
+        """
+        summary = metrics.to_dict()
+        with self._lock:
+            files = dict(sorted(self._files.items()))
+        return {
+            "shards": [str(self.shard)] if self.shard is not None else [],
+            "run_seconds": summary["run_seconds"],
+            "counters": summary["counters"],
+            "files": files,
+        }
+
+    def write(self, path: str, metrics: Metrics) -> None:
+        """
+        Write the report to a JSON file.
+
+        Parameters:
+        - path (str): The path to the file.
+        - metrics (Metrics): The metrics of the run, whose duration and counters are reported.
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(metrics), f, indent=1)
+
+
+def merge_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge the reports of the runs processing the shards of the same files.
+
+    The merged report has the same format, so that it can be merged again.
+
+    Parameters:
+    - reports (List[Dict[str, Any]]): The reports, as written by RunReport.write.
+
+    Returns:
+    - Dict[str, Any]: The report of the whole run, whose duration is that of the longest shard and whose counters are the sums of theirs. The outcome of a file reported twice is that of its last report.
+    """
+    merged: Dict[str, Any] = {
+        "shards": [],
+        "run_seconds": 0.0,
+        "counters": {},
+        "files": {},
+    }
+    for report in reports:
+        merged["shards"].extend(report["shards"])
+        merged["run_seconds"] = max(merged["run_seconds"], report["run_seconds"])
+        for counter, value in report["counters"].items():
+            merged["counters"][counter] = merged["counters"].get(counter, 0) + value
+        merged["files"].update(report["files"])
+    merged["counters"] = dict(sorted(merged["counters"].items()))
+    merged["files"] = dict(sorted(merged["files"].items()))
+    return merged
+
+
+def missing_shards(report: Dict[str, Any]) -> List[str]:
+    """
+    Find the shards missing from a merged report.
+
+    Parameters:
+    - report (Dict[str, Any]): The merged report.
+
+    Returns:
+    - List[str]: The missing shards, as i/n, of every shard count found in the report.
+    """
+    shards = {Shard.parse(shard) for shard in report["shards"]}
+    return [
+        str(Shard(index, count))
+        for count in sorted({shard.count for shard in shards})
+        for index in range(1, count + 1)
+        if Shard(index, count) not in shards
+    ]
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """
+    Print the outcomes of the files of a report, and the shards missing from it.
+
+    Parameters:
+    - report (Dict[str, Any]): The report.
+    """
+    statuses = [entry["status"] for entry in report["files"].values()]
+    counts = ", ".join(f"{statuses.count(status)} {status}" for status in STATUSES)
+    secho(
+        f"Files: {counts}, in {report['run_seconds']:.1f} seconds",
+        fg=GREEN,
+    )
+    for file, entry in report["files"].items():
+        if entry["status"] == "failed":
+            secho(f"Failed {file}: {entry['error']}", fg=RED)
+    missing = missing_shards(report)
+    if missing:
+        secho(f"Missing shards: {', '.join(missing)}", fg=YELLOW)
@@ -0,0 +1,241 @@
+import ast
+import textwrap
+
+from typing import List, NamedTuple, Optional, Union
+
+# The OpenAI model used to document the complex functions
+MODEL_ENGINE = "code-davinci-002"
+
+# The faster and cheaper OpenAI model used to document the simple functions
+SMALL_MODEL_ENGINE = "code-cushman-001"
+
+# The complexity up to which a function is documented by SMALL_MODEL_ENGINE
+SMALL_MODEL_COMPLEXITY = 8
+
+# The complexity up to which a special method is documented from a template
+TEMPLATE_COMPLEXITY = 4
+
+# The maximum number of tokens of a docstring, growing with the complexity of its function,
+# starting high enough for a summary with an argument and a return value section
+MIN_COMPLETION_TOKENS = 128
+COMPLETION_TOKENS_PER_COMPLEXITY = 8
+MAX_COMPLETION_TOKENS = 256
+
+# The nodes which add a branch to the control flow of a function
+BRANCHES = tuple(
+    getattr(ast, name)
+    for name in (
+        "If",
+        "IfExp",
+        "For",
+        "AsyncFor",
+        "While",
+        "Try",
+        "ExceptHandler",
+        "BoolOp",
+        "comprehension",
+        "match_case",
+    )
+    # Pattern matching is only parsed from Python 3.10 on
+    if hasattr(ast, name)
+)
+
+# The docstrings of the special methods whose meaning does not depend on their class
+SPECIAL_METHOD_DOCSTRINGS = {
+    "__repr__": "Return the developer representation of the object.",
+    "__str__": "Return the string representation of the object.",
+    "__hash__": "Return the hash of the object.",
+    "__len__": "Return the number of items in the object.",
+    "__iter__": "Return an iterator over the items of the object.",
+    "__bool__": "Return whether the object is considered true.",
+    "__contains__": "Return whether the object contains an item.",
+    "__eq__": "Return whether the object is equal to another one.",
+    "__ne__": "Return whether the object is not equal to another one.",
+    "__lt__": "Return whether the object is lower than another one.",
+    "__le__": "Return whether the object is lower than or equal to another one.",
+    "__gt__": "Return whether the object is greater than another one.",
+    "__ge__": "Return whether the object is greater than or equal to another one.",
+    "__enter__": "Enter the runtime context of the object.",
+    "__exit__": "Exit the runtime context of the object.",
+}
+
+FunctionNode = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+
+class Route(NamedTuple):
+    """
+    How the docstring of a function is generated.
+
+    The docstring is set for the trivial functions documented from a template, which are
+    not sent to any model.
+    """
+
+    model: Optional[str]
+    max_tokens: int
+    docstring: Optional[str] = None
+
+
+def _parse_function(code_block: str) -> Optional[FunctionNode]:
+    """
+    Parse the code block of a function.
+
+    Parameters:
+    - code_block (str): The code block of the function.
+
+    Returns:
+    - Optional[FunctionNode]: The function, or None if the code block is not a single parsable function.
+    """
+    try:
+        tree = ast.parse(textwrap.dedent(code_block))
+    except (SyntaxError, ValueError):
+        return None
+    if len(tree.body) != 1 or not isinstance(
+        tree.body[0], (ast.FunctionDef, ast.AsyncFunctionDef)
+    ):
+        return None
+    return tree.body[0]
+
+
+def _arguments(node: FunctionNode) -> List[str]:
+    """
+    List the names of the arguments of a function, leaving out its instance or class.
+
+    Parameters:
+    - node (FunctionNode): The function.
+
+    Returns:
+    - List[str]: The names of the arguments, in the order they are declared.
+    """
+    arguments = node.args.posonlyargs + node.args.args + node.args.kwonlyargs
+    names = [argument.arg for argument in arguments]
+    for argument in (node.args.vararg, node.args.kwarg):
+        if argument is not None:
+            names.append(argument.arg)
+    if names[:1] in (["self"], ["cls"]):
+        names = names[1:]
+    return names
+
+
+def complexity(node: FunctionNode) -> int:
+    """
+    Score the complexity of a function, from the size, arguments and branches of its AST.
+
+    Parameters:
+    - node (FunctionNode): The function.
+
+    Returns:
+    - int: The number of statements and arguments of the function, plus twice its number of branches.
+    """
+    statements = branches = 0
+    for child in ast.walk(node):
+        if isinstance(child, ast.stmt) and child is not node:
+            statements += 1
+        if isinstance(child, BRANCHES):
+            branches += 1
+    return statements + len(_arguments(node)) + 2 * branches
+
+
+def _is_attribute_of_self(node: ast.AST) -> bool:
+    """
+    Check whether an expression is an attribute of the instance or class of a method.
+
+    Parameters:
+    - node (ast.AST): The expression.
+
+    Returns:
+    - bool: Whether the expression is self.name or cls.name.
+    """
+    return (
+        isinstance(node, ast.Attribute)
+        and isinstance(node.value, ast.Name)
+        and node.value.id in ("self", "cls")
+    )
+
+
+def _describe(attribute: str) -> str:
+    """
+    Turn the name of an attribute into words.
+
+    Parameters:
+    - attribute (str): The name of the attribute.
+
+    Returns:
+    - str: The name without its leading underscores, with spaces between its words.
+    """
+    return attribute.lstrip("_").replace("_", " ")
+
+
+def template_docstring(node: FunctionNode) -> Optional[str]:
+    """
+    Write the docstring of a trivial getter, setter or special method without calling a model.
+
+    Parameters:
+    - node (FunctionNode): The function.
+
+    Returns:
+    - Optional[str]: The docstring, or None if the function is not trivial enough to be documented from a template.
+    """
+    arguments = _arguments(node)
+    body = node.body
+    # Special methods such as constructors are only documented from their own templates
+    accessor = not (node.name.startswith("__") and node.name.endswith("__"))
+    if accessor and len(body) == 1 and not arguments:
+        # A getter returns an attribute of its instance
+        statement = body[0]
+        if isinstance(statement, ast.Return) and _is_attribute_of_self(statement.value):
+            description = _describe(statement.value.attr)
+            return f"Get the {description}.\n\nReturns:\n    The {description}."
+    if accessor and len(body) == 1 and len(arguments) == 1:
+        # A setter assigns its argument to an attribute of its instance
+        statement = body[0]
+        if (
+            isinstance(statement, ast.Assign)
+            and len(statement.targets) == 1
+            and _is_attribute_of_self(statement.targets[0])
+            and isinstance(statement.value, ast.Name)
+            and statement.value.id == arguments[0]
+        ):
+            description = _describe(statement.targets[0].attr)
+            return (
+                f"Set the {description}.\n\n"
+                f"Args:\n    {arguments[0]}: The new {description}."
+            )
+    if (
+        node.name in SPECIAL_METHOD_DOCSTRINGS
+        and complexity(node) <= TEMPLATE_COMPLEXITY
+    ):
+        return SPECIAL_METHOD_DOCSTRINGS[node.name]
+    return None
+
+
+def route(code_block: str) -> Route:
+    """
+    Choose how the docstring of a function is generated, from its complexity.
+
+    Trivial getters, setters and special methods are documented from a template, simple
+    functions by SMALL_MODEL_ENGINE and the others by MODEL_ENGINE. The completions are
+    allowed more tokens as the functions get more complex.
+
+    Parameters:
+    - code_block (str): The code block of the function.
+
+    Returns:
+    - Route: The model and maximum number of tokens of the docstring, or its template docstring.
+    """
+    node = _parse_function(code_block)
+    if node is None:
+        # Leave the code blocks which cannot be analyzed to the largest model
+        return Route(MODEL_ENGINE, MAX_COMPLETION_TOKENS)
+
+    docstring = template_docstring(node)
+    if docstring is not None:
+        return Route(None, 0, docstring)
+
+    score = complexity(node)
+    max_tokens = min(
+        MIN_COMPLETION_TOKENS + COMPLETION_TOKENS_PER_COMPLEXITY * score,
+        MAX_COMPLETION_TOKENS,
+    )
+    if score <= SMALL_MODEL_COMPLEXITY:
+        return Route(SMALL_MODEL_ENGINE, max_tokens)
+    return Route(MODEL_ENGINE, max_tokens)
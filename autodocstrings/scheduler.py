@@ -0,0 +1,216 @@
+import collections
+import concurrent.futures
+import textwrap
+import threading
+import time
+
+from autodocstrings.ratelimit import estimate_tokens
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+# The number of distinct code blocks whose futures are kept to deduplicate the next requests
+DEDUPLICATION_WINDOW = 10000
+
+# The number of requests waiting for a worker per request of the batches in flight,
+# beyond which the submissions wait
+PENDING_REQUESTS_PER_BATCH = 4
+
+
+class _Request(NamedTuple):
+    """
+    A pending docstring request.
+    """
+
+    key: Tuple[str, str]
+    code_block: str
+    block_name: str
+    tokens: int
+    future: concurrent.futures.Future
+
+
+class DocstringScheduler:
+    """
+    Run docstring generation requests concurrently on a bounded pool of worker threads.
+
+    Each worker takes the pending requests in the order they were submitted and groups
+    them into batches, which are generated with a single call.
+
+    Identical code blocks with the same name are only generated once per run: their
+    requests share the future of the first one, whether it is still pending, in flight or
+    already done. Only the futures of the most recently submitted code blocks are kept,
+    so that the memory used does not grow with the number of requests.
+
+    Once the maximum number of pending requests is reached, the submissions wait for the
+    workers to take some of them, slowing down the producers to the pace of the API.
+
+    Parameters:
+    - generate (Callable[[List[Tuple[str, str]]], List[str]]): The function used to generate the docstrings of a batch of code blocks and their names.
+    - concurrency (int): The maximum number of batches in flight at the same time.
+    - batch_size (int): The maximum number of requests in a batch.
+    - max_batch_tokens (Optional[int]): The maximum estimated number of tokens of the code blocks in a batch. Unlimited if not provided.
+    - linger (float): The time in seconds a worker waits for more requests to fill a batch.
+    - max_pending (Optional[int]): The maximum number of requests waiting for a worker. Unlimited if not provided.
+    - deduplication_window (int): The number of distinct code blocks remembered to deduplicate the requests.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[List[Tuple[str, str]]], List[str]],
+        concurrency: int = 1,
+        batch_size: int = 1,
+        max_batch_tokens: Optional[int] = None,
+        linger: float = 0.05,
+        max_pending: Optional[int] = None,
+        deduplication_window: int = DEDUPLICATION_WINDOW,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.linger = linger
+        self.max_pending = max_pending
+        self.deduplication_window = deduplication_window
+        self._generate = generate
+        self._pending = collections.deque()
+        self._requests: collections.OrderedDict[
+            Tuple[str, str], concurrent.futures.Future
+        ] = collections.OrderedDict()
+        self.deduplicated = 0
+        lock = threading.RLock()
+        self._condition = threading.Condition(lock)
+        self._not_full = threading.Condition(lock)
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(concurrency)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, code_block: str, block_name: str) -> concurrent.futures.Future:
+        """
+        Schedule the generation of a docstring for a code block.
+
+        Parameters:
+        - code_block (str): The code block to generate a docstring for.
+        - block_name (str): The name of the code block.
+
+        Returns:
+        - concurrent.futures.Future: A future resolving to the generated docstring.
+        """
+        # Code blocks found at different nesting levels are identical once dedented
+        key = (textwrap.dedent(code_block), block_name)
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("cannot submit requests after shutdown")
+                future = self._requests.get(key)
+                if future is not None:
+                    self._requests.move_to_end(key)
+                    self.deduplicated += 1
+                    return future
+                if self.max_pending is None or len(self._pending) < self.max_pending:
+                    break
+                # Wait for the workers to catch up
+                self._not_full.wait()
+            future = concurrent.futures.Future()
+            self._requests[key] = future
+            if len(self._requests) > self.deduplication_window:
+                self._requests.popitem(last=False)
+            self._pending.append(
+                _Request(
+                    key, code_block, block_name, estimate_tokens(code_block), future
+                )
+            )
+            self._condition.notify()
+        return future
+
+    def _fits(self, batch: List[_Request], tokens: int) -> bool:
+        """
+        Check whether the next pending request fits in a batch.
+
+        Parameters:
+        - batch (List[_Request]): The requests already in the batch.
+        - tokens (int): The estimated number of tokens of the batch.
+
+        Returns:
+        - bool: Whether the next pending request can be added to the batch.
+        """
+        return (
+            len(batch) < self.batch_size
+            and len(self._pending) > 0
+            and (
+                self.max_batch_tokens is None
+                or tokens + self._pending[0].tokens <= self.max_batch_tokens
+            )
+        )
+
+    def _next_batch(self) -> List[_Request]:
+        """
+        Wait for the next batch of pending requests.
+
+        Returns:
+        - List[_Request]: The requests of the batch, empty once the scheduler is shut down.
+        """
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if not self._pending:
+                return []
+            batch = [self._pending.popleft()]
+            tokens = batch[0].tokens
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size:
+                if self._fits(batch, tokens):
+                    batch.append(self._pending.popleft())
+                    tokens += batch[-1].tokens
+                    continue
+                remaining = deadline - time.monotonic()
+                if self._pending or self._closed or remaining <= 0:
+                    # The batch is full or nothing else is coming in time
+                    break
+                self._condition.wait(remaining)
+            self._not_full.notify(len(batch))
+            return batch
+
+    def _work(self) -> None:
+        """
+        Generate the docstrings of batches of pending requests until the scheduler is shut down.
+        """
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            try:
+                docstrings = self._generate(
+                    [(request.code_block, request.block_name) for request in batch]
+                )
+            except BaseException as error:
+                with self._condition:
+                    # Let the next identical code blocks be generated again
+                    for request in batch:
+                        if self._requests.get(request.key) is request.future:
+                            del self._requests[request.key]
+                for request in batch:
+                    request.future.set_exception(error)
+                continue
+            for request, docstring in zip(batch, docstrings):
+                request.future.set_result(docstring)
+
+    def shutdown(self) -> None:
+        """
+        Wait for the pending requests to complete and release the worker threads.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            self._not_full.notify_all()
+        for worker in self._workers:
+            worker.join()
+
+    def __enter__(self) -> "DocstringScheduler":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
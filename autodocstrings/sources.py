@@ -0,0 +1,175 @@
+import functools
+
+from autodocstrings.backends import CompletionBackend, make_backend
+from autodocstrings.extract import find_candidates
+from autodocstrings.generation import generate_docstrings
+from autodocstrings.metrics import Metrics
+from autodocstrings.patching import apply_edits
+from autodocstrings.ratelimit import RateLimiter
+from autodocstrings.scheduler import PENDING_REQUESTS_PER_BATCH, DocstringScheduler
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+
+class FunctionResult(NamedTuple):
+    """
+    The docstring generated for a function of a source.
+    """
+
+    path: str
+    name: str
+    docstring: str
+
+
+class SourceResult(NamedTuple):
+    """
+    A source whose functions were documented.
+
+    The error is the reason why the source could not be parsed, in which case it is
+    returned unchanged.
+    """
+
+    name: str
+    source: str
+    functions: List[FunctionResult]
+    error: Optional[str] = None
+
+
+class SourceDocumenter:
+    """
+    Document Python sources held in memory, without reading or writing any file.
+
+    The client of the completion API and the scheduler of the requests are shared by all
+    the batches documented until the documenter is closed, so that a long-running service
+    keeps its connections open and documents identical functions only once.
+
+    Parameters:
+    - replace_existing_docstrings (bool): Whether to replace existing docstrings.
+    - skip_constructor_docstrings (bool): Whether to skip updating docstrings for class constructors (__init__ methods).
+    - backend (Optional[CompletionBackend]): The client of the completion API, which is left open when the documenter is closed. One is created from the API key and base URL if not provided.
+    - api_key (Optional[str]): The OpenAI API key. The key configured in the openai module is used if not provided.
+    - api_base (Optional[str]): The base URL of an OpenAI-compatible completion API. The OpenAI Python client is used if not provided.
+    - concurrency (int): The maximum number of completion requests in flight at the same time.
+    - batch_size (int): The maximum number of functions documented by a single completion request.
+    - max_batch_tokens (Optional[int]): The maximum estimated number of tokens of the functions documented by a single completion request. Unlimited if not provided.
+    - requests_per_minute (Optional[float]): The maximum number of completion requests per minute. Unlimited if not provided.
+    - tokens_per_minute (Optional[float]): The maximum number of completion tokens per minute. Unlimited if not provided.
+    """
+
+    def __init__(
+        self,
+        replace_existing_docstrings: bool = False,
+        skip_constructor_docstrings: bool = False,
+        backend: Optional[CompletionBackend] = None,
+        api_key: Optional[str] = None,
+        api_base: Optional[str] = None,
+        concurrency: int = 1,
+        batch_size: int = 1,
+        max_batch_tokens: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> None:
+        self.replace_existing_docstrings = replace_existing_docstrings
+        self.skip_constructor_docstrings = skip_constructor_docstrings
+        self.metrics = Metrics()
+        self._owns_backend = backend is None
+        if backend is None:
+            backend = make_backend(api_key, api_base, pool_size=concurrency)
+        self._backend = backend
+        generate = functools.partial(
+            generate_docstrings,
+            rate_limiter=RateLimiter(
+                requests_per_minute, tokens_per_minute, concurrency
+            ),
+            backend=backend,
+            metrics=self.metrics,
+        )
+        self._scheduler = DocstringScheduler(
+            generate,
+            concurrency,
+            batch_size,
+            max_batch_tokens,
+            max_pending=PENDING_REQUESTS_PER_BATCH * concurrency * batch_size,
+        )
+
+    def document(self, sources: Sequence[Tuple[str, str]]) -> List[SourceResult]:
+        """
+        Generate the docstrings of the functions of a batch of sources.
+
+        The requests of all the sources are scheduled together, so that they share the
+        batches and the connections of the API. A source which cannot be parsed is
+        returned unchanged with its error, while an error of the API, such as
+        autodocstrings.errors.RetriesExceededError, is raised.
+
+        Parameters:
+        - sources (Sequence[Tuple[str, str]]): The sources to document, with names identifying them, such as their paths.
+
+        Returns:
+        - List[SourceResult]: The updated sources and their documented functions, in the same order.
+        """
+        # Schedule the functions of every source before waiting for any of them
+        pending = []
+        for name, source in sources:
+            try:
+                candidates = find_candidates(
+                    source,
+                    self.replace_existing_docstrings,
+                    self.skip_constructor_docstrings,
+                )
+            except (SyntaxError, ValueError) as error:
+                self.metrics.increment("failed_files")
+                pending.append((name, source, [], [], str(error)))
+                continue
+            futures = [
+                self._scheduler.submit(candidate.code_block, candidate.name)
+                for candidate in candidates
+            ]
+            pending.append((name, source, candidates, futures, None))
+
+        results = []
+        for name, source, candidates, futures, error in pending:
+            with self.metrics.timer("wait"):
+                docstrings = [future.result() for future in futures]
+            edits = [
+                candidate.slot.edit(docstring)
+                for candidate, docstring in zip(candidates, docstrings)
+            ]
+            functions = [
+                FunctionResult(candidate.path, candidate.name, docstring)
+                for candidate, docstring in zip(candidates, docstrings)
+            ]
+            self.metrics.increment("documented_functions", len(functions))
+            results.append(
+                SourceResult(name, apply_edits(source, edits), functions, error)
+            )
+        return results
+
+    def close(self) -> None:
+        """
+        Wait for the requests in flight, then release the scheduler and the client it created.
+        """
+        self._scheduler.shutdown()
+        if self._owns_backend:
+            self._backend.close()
+
+    def __enter__(self) -> "SourceDocumenter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def document_sources(
+    sources: Sequence[Tuple[str, str]], **settings
+) -> List[SourceResult]:
+    """
+    Generate the docstrings of the functions of a batch of Python sources held in memory.
+
+    Parameters:
+    - sources (Sequence[Tuple[str, str]]): The sources to document, with names identifying them, such as their paths.
+    - settings: The settings of the SourceDocumenter documenting them.
+
+    Returns:
+    - List[SourceResult]: The updated sources and their documented functions, in the same order.
+    """
+    with SourceDocumenter(**settings) as documenter:
+        return documenter.document(sources)
@@ -0,0 +1,225 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import typer
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+# The name of the documented function, as written at the end of the prompt
+BLOCK_NAME = re.compile(r"for the (\S+) python function")
+
+
+def _stub_docstring(prompt: str) -> str:
+    """
+    Build the docstring answered by the stub server for a prompt.
+
+    Parameters:
+    - prompt (str): The prompt to complete.
+
+    Returns:
+    - str: A docstring naming the documented function.
+    """
+    match = BLOCK_NAME.search(prompt)
+    block_name = match.group(1) if match else "function"
+    return f"\n    Stub docstring for {block_name}.\n    "
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    Handler of the requests sent to the stub completion server.
+    """
+
+    # Keep the connections alive between requests
+    protocol_version = "HTTP/1.1"
+
+    server: "StubCompletionServer"
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != "/v1/completions":
+            self._respond(404, {"error": {"message": "Not found"}})
+            return
+
+        status = self.server.next_status()
+        if status == 429:
+            self._respond(
+                429,
+                {"error": {"message": "Rate limit reached"}},
+                {"Retry-After": f"{self.server.retry_after:g}"},
+            )
+            return
+        if status == 500:
+            self._respond(500, {"error": {"message": "Internal server error"}})
+            return
+
+        prompts = body.get("prompt", [])
+        if isinstance(prompts, str):
+            prompts = [prompts]
+        choices = [
+            {"index": index, "text": _stub_docstring(prompt), "finish_reason": "stop"}
+            for index, prompt in enumerate(prompts)
+        ]
+        self._respond(
+            200,
+            {
+                "object": "text_completion",
+                "model": body.get("model"),
+                "choices": choices,
+            },
+        )
+
+    def _respond(self, status: int, payload: dict, headers: dict = {}) -> None:
+        """
+        Send a JSON response.
+
+        Parameters:
+        - status (int): The HTTP status code.
+        - payload (dict): The JSON body of the response.
+        - headers (dict): The additional headers of the response.
+        """
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Stay quiet under load
+        pass
+
+
+class StubCompletionServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the completion API, used to test and benchmark runs offline.
+
+    Every request waits for the configured latency, then fails with the configured
+    probabilities or answers a stub docstring for each of its prompts.
+
+    Parameters:
+    - address (Tuple[str, int]): The host and port to listen on. A free port is picked if the port is 0.
+    - latency (float): The time in seconds taken to answer a request.
+    - throttle_rate (float): The probability that a request is throttled with a 429 response.
+    - error_rate (float): The probability that a request fails with a 500 response.
+    - retry_after (float): The delay in seconds requested by the throttled responses.
+    - seed (Optional[int]): The seed of the random failures.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        super().__init__(address, _StubHandler)
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self.connections = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """
+        The base URL of the completion API served.
+        """
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def process_request(self, request, client_address) -> None:
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def next_status(self) -> int:
+        """
+        Wait for the latency of a request, then draw its status.
+
+        Returns:
+        - int: The HTTP status code of the response.
+        """
+        with self._lock:
+            self.requests += 1
+            draw = self._random.random()
+        time.sleep(self.latency)
+        if draw < self.throttle_rate:
+            return 429
+        if draw < self.throttle_rate + self.error_rate:
+            return 500
+        return 200
+
+    def __enter__(self) -> "StubCompletionServer":
+        # Poll often, so that shutting the server down is quick
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve a local stand-in for the completion API."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Host to listen on.")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on.")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Time in seconds taken to answer a request.",
+    )
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.0,
+        help="Probability that a request is throttled with a 429 response.",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Probability that a request fails with a 500 response.",
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=float,
+        default=1.0,
+        help="Delay in seconds requested by the throttled responses.",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="Seed of the random failures."
+    )
+    args = parser.parse_args()
+
+    server = StubCompletionServer(
+        (args.host, args.port),
+        args.latency,
+        args.throttle_rate,
+        args.error_rate,
+        args.retry_after,
+        args.seed,
+    )
+    typer.echo(f"Serving a stub completion API at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,273 @@
+import fnmatch
+import hashlib
+import os
+import re
+
+from typing import Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+
+class _GitIgnoreRule(NamedTuple):
+    """
+    A pattern of a .gitignore file.
+    """
+
+    regex: Pattern
+    negated: bool
+    directory_only: bool
+
+
+def _translate(pattern: str) -> str:
+    """
+    Translate a .gitignore glob pattern into a regular expression.
+
+    Parameters:
+    - pattern (str): The glob pattern, without its leading and trailing slashes.
+
+    Returns:
+    - str: The regular expression matching the same paths.
+    """
+    regex = ""
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            regex += "(?:.*/)?"
+            index += 3
+        elif pattern.startswith("/**", index) and index + 3 == len(pattern):
+            regex += "/.*"
+            index += 3
+        elif pattern.startswith("**", index):
+            regex += ".*"
+            index += 2
+        elif pattern[index] == "*":
+            regex += "[^/]*"
+            index += 1
+        elif pattern[index] == "?":
+            regex += "[^/]"
+            index += 1
+        elif pattern[index] == "[" and "]" in pattern[index + 2 :]:
+            end = pattern.index("]", index + 2)
+            characters = pattern[index + 1 : end]
+            if characters.startswith("!"):
+                characters = "^" + characters[1:]
+            regex += "[" + characters.replace("\\", "\\\\") + "]"
+            index = end + 1
+        elif pattern[index] == "\\" and index + 1 < len(pattern):
+            regex += re.escape(pattern[index + 1])
+            index += 2
+        else:
+            regex += re.escape(pattern[index])
+            index += 1
+    return regex
+
+
+def parse_gitignore(lines: List[str]) -> List[_GitIgnoreRule]:
+    """
+    Parse the patterns of a .gitignore file.
+
+    Parameters:
+    - lines (List[str]): The lines of the .gitignore file.
+
+    Returns:
+    - List[_GitIgnoreRule]: The rules of the file, in order.
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip("\n").rstrip("\r")
+        if not line.endswith("\\ "):
+            line = line.rstrip(" ")
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # Patterns with a slash are relative to the directory of the .gitignore file
+        anchored = "/" in line
+        regex = _translate(line.lstrip("/"))
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        rules.append(_GitIgnoreRule(re.compile(regex + r"\Z"), negated, directory_only))
+    return rules
+
+
+class GitIgnore:
+    """
+    The .gitignore files that apply to a directory tree.
+
+    Parameters:
+    - root (str): The root directory of the tree. The .gitignore files of its parent directories are loaded up to the root of the git repository.
+    """
+
+    def __init__(self, root: str) -> None:
+        self._rules: List[Tuple[str, List[_GitIgnoreRule]]] = []
+        parents = []
+        directory = os.path.abspath(root)
+        while not os.path.exists(os.path.join(directory, ".git")):
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                # The tree is not in a git repository
+                return
+            directory = parent
+            parents.append(directory)
+        for directory in reversed(parents):
+            self.load(directory)
+
+    def load(self, directory: str) -> None:
+        """
+        Load the .gitignore file of a directory, if any.
+
+        Parameters:
+        - directory (str): The directory.
+        """
+        try:
+            with open(os.path.join(directory, ".gitignore"), "r") as f:
+                rules = parse_gitignore(f.readlines())
+        except OSError:
+            return
+        if rules:
+            self._rules.append((os.path.abspath(directory), rules))
+
+    def is_ignored(self, path: str, is_directory: bool) -> bool:
+        """
+        Check whether a path is ignored by the loaded .gitignore files.
+
+        Parameters:
+        - path (str): The path to check.
+        - is_directory (bool): Whether the path is a directory.
+
+        Returns:
+        - bool: Whether the path is ignored.
+        """
+        path = os.path.abspath(path)
+        ignored = False
+        for directory, rules in self._rules:
+            if not path.startswith(directory + os.sep):
+                continue
+            relative_path = os.path.relpath(path, directory).replace(os.sep, "/")
+            for rule in rules:
+                if rule.directory_only and not is_directory:
+                    continue
+                if rule.regex.match(relative_path):
+                    ignored = not rule.negated
+        return ignored
+
+
+def matches_any(path: str, patterns: List[str]) -> bool:
+    """
+    Check whether a path matches any of a list of glob patterns.
+
+    The patterns are matched against the name of the path and against the whole path.
+
+    Parameters:
+    - path (str): The path to check.
+    - patterns (List[str]): The glob patterns.
+
+    Returns:
+    - bool: Whether the path matches one of the patterns.
+    """
+    name = os.path.basename(os.path.normpath(path))
+    return any(
+        fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(path, pattern)
+        for pattern in patterns
+    )
+
+
+class Shard(NamedTuple):
+    """
+    One of the partitions of the Python files, processed by its own run.
+    """
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Shard":
+        """
+        Parse a shard written as i/n, where i is between 1 and n.
+
+        Parameters:
+        - value (str): The shard.
+
+        Returns:
+        - Shard: The shard.
+        """
+        index, _, count = value.partition("/")
+        shard = cls(int(index), int(count))
+        if not 1 <= shard.index <= shard.count:
+            raise ValueError(f"{value!r} is not a shard i/n with 1 <= i <= n")
+        return shard
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def contains(self, file: str, root: str) -> bool:
+        """
+        Check whether a file belongs to the shard.
+
+        The partition only depends on the path of the file relative to the root, so that
+        runs on different machines agree on it without coordinating.
+
+        Parameters:
+        - file (str): The path to the file.
+        - root (str): The path to the directory whose files are partitioned.
+
+        Returns:
+        - bool: Whether the file belongs to the shard.
+        """
+        key = os.path.relpath(file, root).replace(os.sep, "/")
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % self.count == self.index - 1
+
+
+def iter_python_files(
+    directory: str,
+    exclude_directories: List[str] = [],
+    exclude_files: List[str] = [],
+    respect_gitignore: bool = True,
+    shard: Optional[Shard] = None,
+) -> Iterator[str]:
+    """
+    Lazily find the Python files in a directory and its subdirectories.
+
+    Excluded directories are pruned before being descended into, and every directory is
+    listed with a single os.scandir call.
+
+    Parameters:
+    - directory (str): The path to the directory to search.
+    - exclude_directories (List[str]): Glob patterns of the directories to exclude from the search.
+    - exclude_files (List[str]): Glob patterns of the files to exclude from the search.
+    - respect_gitignore (bool): Whether to exclude the files and directories ignored by .gitignore files.
+    - shard (Optional[Shard]): The shard of the files to find. Every file is found if not provided.
+
+    Returns:
+    - Iterator[str]: The paths to the Python files found, in alphabetical order within each directory.
+    """
+    gitignore: Optional[GitIgnore] = GitIgnore(directory) if respect_gitignore else None
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        if gitignore is not None:
+            gitignore.load(current)
+        with os.scandir(current) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        subdirectories = []
+        for entry in entries:
+            if entry.is_dir():
+                if entry.name == ".git" or matches_any(entry.path, exclude_directories):
+                    continue
+                if gitignore is not None and gitignore.is_ignored(entry.path, True):
+                    continue
+                subdirectories.append(entry.path)
+            elif entry.name.endswith(".py") and entry.is_file():
+                if matches_any(entry.path, exclude_files):
+                    continue
+                if gitignore is not None and gitignore.is_ignored(entry.path, False):
+                    continue
+                if shard is not None and not shard.contains(entry.path, directory):
+                    continue
+                yield entry.path
+        # Visit the subdirectories in alphabetical order
+        stack.extend(reversed(subdirectories))
@@ -0,0 +1,174 @@
+import difflib
+import os
+import threading
+import time
+
+from autodocstrings.gitdiff import LineRange
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# The time in seconds between two polls of the watched files
+WATCH_INTERVAL = 0.5
+
+# The time in seconds without new changes after which a burst of saves is processed
+WATCH_DEBOUNCE = 1.0
+
+
+def diff_lines(old: str, new: str) -> List[LineRange]:
+    """
+    Find the lines of the new version of a text that changed.
+
+    Parameters:
+    - old (str): The old version of the text.
+    - new (str): The new version of the text.
+
+    Returns:
+    - List[LineRange]: The first and last line of every changed range of the new version, starting at 1.
+    """
+    matcher = difflib.SequenceMatcher(
+        None, old.splitlines(), new.splitlines(), autojunk=False
+    )
+    ranges = []
+    for tag, _, _, start, end in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if start == end:
+            # Lines were removed after the start line, which touches both of its neighbors
+            ranges.append((max(start, 1), start + 1))
+        else:
+            ranges.append((start + 1, end))
+    return ranges
+
+
+def _read(file: str) -> Optional[str]:
+    """
+    Read a file, keeping its line breaks untouched.
+
+    Parameters:
+    - file (str): The path to the file.
+
+    Returns:
+    - Optional[str]: The contents of the file, or None if it cannot be read.
+    """
+    try:
+        with open(file, "r", newline="") as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+class Watcher:
+    """
+    Poll Python files for changes, waiting for bursts of saves to settle.
+
+    The contents of the files are kept in memory, so that only the lines changed by
+    every burst are reported.
+
+    Parameters:
+    - list_files (Callable[[], Iterable[str]]): The function listing the watched files, called on every poll.
+    - interval (float): The time in seconds between two polls.
+    - debounce (float): The time in seconds without new changes after which the changed files are reported.
+    """
+
+    def __init__(
+        self,
+        list_files: Callable[[], Iterable[str]],
+        interval: float = WATCH_INTERVAL,
+        debounce: float = WATCH_DEBOUNCE,
+    ) -> None:
+        self.interval = interval
+        self.debounce = debounce
+        self._list_files = list_files
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self._contents: Dict[str, str] = {}
+        # The contents of the files before their last reported changes, until recorded
+        self._reported: Dict[str, str] = {}
+        self._stopped = threading.Event()
+        for file in self._poll():
+            self.record(file)
+
+    def _poll(self) -> Set[str]:
+        """
+        Find the files created, modified or deleted since the last poll.
+
+        Returns:
+        - Set[str]: The paths to the files.
+        """
+        stats = {}
+        for file in self._list_files():
+            try:
+                stat = os.stat(file)
+            except OSError:
+                continue
+            stats[file] = (stat.st_mtime_ns, stat.st_size)
+        changed = {
+            file for file, stat in stats.items() if self._stats.get(file) != stat
+        }
+        changed.update(set(self._stats) - set(stats))
+        self._stats = stats
+        return changed
+
+    def record(self, file: str) -> None:
+        """
+        Remember the current contents of a file, such as after writing its docstrings.
+
+        Parameters:
+        - file (str): The path to the file.
+        """
+        self._reported.pop(file, None)
+        contents = _read(file)
+        if contents is None:
+            self._contents.pop(file, None)
+            self._stats.pop(file, None)
+            return
+        self._contents[file] = contents
+        stat = os.stat(file)
+        self._stats[file] = (stat.st_mtime_ns, stat.st_size)
+
+    def requeue(self, file: str) -> None:
+        """
+        Report the last changes of a file again with its next ones, such as when its docstrings were dropped because it was saved while they were generated.
+
+        Parameters:
+        - file (str): The path to the file.
+        """
+        if file in self._reported:
+            self._contents[file] = self._reported.pop(file)
+        # Report the file on the next poll, even if its size and time did not change
+        self._stats.pop(file, None)
+
+    def changes(self) -> Iterator[Dict[str, List[LineRange]]]:
+        """
+        Wait for the files to change, until the watcher is stopped.
+
+        Returns:
+        - Iterator[Dict[str, List[LineRange]]]: The changed line ranges of every changed file, by path, once per burst of saves.
+        """
+        while not self._stopped.wait(self.interval):
+            changed = self._poll()
+            if not changed:
+                continue
+            # Wait until no file changed for the debounce delay
+            settled_at = time.monotonic() + self.debounce
+            while time.monotonic() < settled_at:
+                if self._stopped.wait(self.interval):
+                    return
+                more = self._poll()
+                if more:
+                    changed.update(more)
+                    settled_at = time.monotonic() + self.debounce
+            files = {}
+            for file in sorted(changed):
+                old = self._contents.get(file, "")
+                self.record(file)
+                new = self._contents.get(file)
+                if new is not None and new != old:
+                    files[file] = diff_lines(old, new)
+                    self._reported[file] = old
+            if files:
+                yield files
+
+    def stop(self) -> None:
+        """
+        Stop waiting for changes.
+        """
+        self._stopped.set()
@@ -0,0 +1,317 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import autodocstrings
+
+from autodocstrings.extract import read_candidates
+from autodocstrings.main import update_docstrings
+from autodocstrings.patching import apply_edits
+from autodocstrings.stub_server import StubCompletionServer
+from autodocstrings.walker import iter_python_files
+from synthetic import TreeShape, generate_tree
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# The fraction by which a phase may be slower than its baseline before it is reported
+DEFAULT_TOLERANCE = 0.2
+
+# The number of times the command line is started, of which the fastest is reported
+STARTUP_RUNS = 5
+
+
+def _measure(
+    function: Callable[[], Any], trace_memory: bool
+) -> Tuple[float, Optional[int]]:
+    """
+    Time a phase of the benchmark.
+
+    Parameters:
+    - function (Callable[[], Any]): The phase.
+    - trace_memory (bool): Whether to trace the memory allocated by the phase, which slows it down.
+
+    Returns:
+    - Tuple[float, Optional[int]]: The duration of the phase in seconds, and its peak traced memory in bytes.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    # Keep the progress messages of the run out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()
+    duration = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return duration, peak
+
+
+def _measure_startup(runs: int) -> Tuple[float, Optional[int]]:
+    """
+    Time the start of the command line in a fresh interpreter, which imports its modules.
+
+    Parameters:
+    - runs (int): The number of times the command line is started.
+
+    Returns:
+    - Tuple[float, Optional[int]]: The duration of the fastest start in seconds, and no peak memory.
+    """
+    # The interpreter must find the package being benchmarked even if it is not installed
+    root = os.path.dirname(os.path.dirname(os.path.abspath(autodocstrings.__file__)))
+    env = {**os.environ, "PYTHONPATH": root}
+    command = [
+        sys.executable,
+        "-c",
+        "from autodocstrings.main import main; main()",
+        "--help",
+    ]
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)
+        durations.append(time.perf_counter() - start)
+    return min(durations), None
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run every phase of the benchmark on freshly generated trees.
+
+    Parameters:
+    - args (argparse.Namespace): The command-line arguments.
+
+    Returns:
+    - Dict[str, Any]: The settings of the benchmark and the results of every phase.
+    """
+    shape = TreeShape(args.files, args.functions, args.depth, args.function_length)
+    settings = {
+        "shape": shape._asdict(),
+        "latency": args.latency,
+        "throttle_rate": args.throttle_rate,
+        "concurrency": args.concurrency,
+        "batch_size": args.batch_size,
+        "jobs": args.jobs,
+        "memory": args.memory,
+    }
+    phases: Dict[str, Dict[str, Optional[float]]] = {}
+
+    def record(
+        name: str, functions: int, measurement: Tuple[float, Optional[int]]
+    ) -> None:
+        duration, peak = measurement
+        phases[name] = {
+            "seconds": duration,
+            "functions_per_second": (
+                functions / duration if functions and duration else None
+            ),
+            "peak_memory": peak,
+        }
+
+    record("startup", 0, _measure_startup(STARTUP_RUNS))
+
+    with tempfile.TemporaryDirectory() as root:
+        tree = os.path.join(root, "walked")
+        functions = generate_tree(tree, shape)
+
+        files: List[str] = []
+        record(
+            "walk",
+            functions,
+            _measure(lambda: files.extend(iter_python_files(tree)), args.memory),
+        )
+
+        parsed = []
+        record(
+            "parse",
+            functions,
+            _measure(
+                lambda: parsed.extend(
+                    read_candidates(file, False, False) for file in files
+                ),
+                args.memory,
+            ),
+        )
+
+        def rewrite() -> None:
+            for file, (source, candidates) in zip(files, parsed):
+                edits = [candidate.slot.edit("Docstring.") for candidate in candidates]
+                with open(file, "w", newline="") as f:
+                    f.write(apply_edits(source, edits))
+
+        record("rewrite", functions, _measure(rewrite, args.memory))
+
+        # The end-to-end run documents a fresh tree through the stub server
+        tree = os.path.join(root, "documented")
+        generate_tree(tree, shape)
+        with StubCompletionServer(
+            latency=args.latency,
+            throttle_rate=args.throttle_rate,
+            retry_after=0.1,
+            seed=0,
+        ) as server:
+            record(
+                "end_to_end",
+                functions,
+                _measure(
+                    lambda: update_docstrings(
+                        tree,
+                        False,
+                        False,
+                        concurrency=args.concurrency,
+                        jobs=args.jobs,
+                        batch_size=args.batch_size,
+                        api_base=server.url,
+                    ),
+                    args.memory,
+                ),
+            )
+            requests = server.requests
+
+    return {
+        "settings": settings,
+        "functions": functions,
+        "requests": requests,
+        "phases": phases,
+        "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """
+    Find the phases that got slower than their baseline.
+
+    Parameters:
+    - results (Dict[str, Any]): The results of the benchmark.
+    - baseline (Dict[str, Any]): The results of a previous run with the same settings.
+    - tolerance (float): The fraction by which a phase may be slower than its baseline.
+
+    Returns:
+    - List[str]: A description of every regression.
+    """
+    regressions = []
+    for name, phase in results["phases"].items():
+        reference = baseline["phases"].get(name)
+        if reference is None:
+            continue
+        if phase["seconds"] > reference["seconds"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: {phase['seconds']:.3f}s against {reference['seconds']:.3f}s"
+            )
+    return regressions
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    """
+    Print the results of the benchmark.
+
+    Parameters:
+    - results (Dict[str, Any]): The results of the benchmark.
+    """
+    print(f"{results['functions']} functions, {results['requests']} requests")
+    for name, phase in results["phases"].items():
+        line = f"{name:>12}: {phase['seconds']:8.3f}s"
+        if phase["functions_per_second"] is not None:
+            line += f" {phase['functions_per_second']:12.1f} functions/s"
+        if phase["peak_memory"] is not None:
+            line += f" {phase['peak_memory'] / 2**20:10.1f} MiB peak"
+        print(line)
+    # The maximum resident set size is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    print(f"Maximum resident set size: {results['max_rss'] * unit / 2**20:.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark autodocstrings on a synthetic package tree and a stub completion API."
+    )
+    parser.add_argument(
+        "--files", type=int, default=100, help="Number of Python files."
+    )
+    parser.add_argument(
+        "--functions", type=int, default=20, help="Number of functions per file."
+    )
+    parser.add_argument(
+        "--depth", type=int, default=3, help="Number of nested packages."
+    )
+    parser.add_argument(
+        "--function-length",
+        type=int,
+        default=10,
+        help="Number of statements per function.",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Time in seconds taken by the stub API to answer a request.",
+    )
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.0,
+        help="Probability that a request is throttled by the stub API.",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="Number of requests in flight."
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=1, help="Number of functions per request."
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Number of processes parsing the files."
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="Trace the peak memory allocated by every phase, which slows them down.",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="Results of a previous run to compare against. The run fails if a phase regressed.",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        default=None,
+        help="Path to which the results are written, to be used as a baseline.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Fraction by which a phase may be slower than its baseline.",
+    )
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    print_results(results)
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline["settings"] != results["settings"]:
+            print("The baseline was measured with other settings, not comparing.")
+            return
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression in {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import os
+import random
+
+from typing import List, NamedTuple
+
+
+class TreeShape(NamedTuple):
+    """
+    The size of a synthetic package tree.
+    """
+
+    files: int
+    functions_per_file: int
+    depth: int
+    function_length: int
+
+
+def _function(name: str, length: int, indent: str, rng: random.Random) -> List[str]:
+    """
+    Generate the source lines of a function with type hints and a body of a given length.
+
+    Parameters:
+    - name (str): The name of the function.
+    - length (int): The number of statements of its body.
+    - indent (str): The indentation of the definition.
+    - rng (random.Random): The random generator.
+
+    Returns:
+    - List[str]: The lines of the function.
+    """
+    self = "self, " if indent else ""
+    lines = [f"{indent}def {name}({self}count: int, values: List[float]) -> float:"]
+    lines.append(f"{indent}    total = 0.0")
+    for index in range(max(0, length - 2)):
+        if rng.random() < 0.2:
+            lines.append(
+                f"{indent}    # Accumulate the weighted values of step {index}"
+            )
+        lines.append(
+            f"{indent}    total += sum(value * {rng.randint(1, 9)} for value in values[:count])"
+        )
+    lines.append(f"{indent}    return total")
+    return lines
+
+
+def generate_tree(root: str, shape: TreeShape, seed: int = 0) -> int:
+    """
+    Write a synthetic package tree of Python files without docstrings.
+
+    The files are spread over nested packages, and half of the functions of every file are
+    methods of a class.
+
+    Parameters:
+    - root (str): The directory in which the tree is written.
+    - shape (TreeShape): The size of the tree.
+    - seed (int): The seed of the random generator.
+
+    Returns:
+    - int: The number of functions written.
+    """
+    rng = random.Random(seed)
+    directories = [root]
+    for level in range(shape.depth):
+        directories.append(os.path.join(directories[-1], f"package_{level}"))
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, "__init__.py"), "w").close()
+
+    functions = 0
+    for file_index in range(shape.files):
+        directory = directories[file_index % len(directories)]
+        lines = ["from typing import List", ""]
+        methods = shape.functions_per_file // 2
+        for index in range(shape.functions_per_file - methods):
+            lines += [
+                "",
+                *_function(f"function_{index}", shape.function_length, "", rng),
+            ]
+        if methods:
+            lines += ["", "", f"class Model{file_index}:"]
+            for index in range(methods):
+                lines += _function(
+                    f"method_{index}", shape.function_length, "    ", rng
+                )
+                lines.append("")
+        with open(os.path.join(directory, f"module_{file_index}.py"), "w") as f:
+            f.write("\n".join(lines).rstrip() + "\n")
+        functions += shape.functions_per_file
+    return functions
@@ -23,13 +23,14 @@ setuptools.setup(
     url="https://github.com/cdesarmeaux/autodocstrings",
     packages=setuptools.find_packages(exclude=["tests*"]),
     classifiers=[
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3.8",
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.8",
     entry_points="""
         [console_scripts]
         autodocstrings=autodocstrings.main:main
+        autodocstrings-stub-server=autodocstrings.stub_server:main
     """,
 )
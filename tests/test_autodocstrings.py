@@ -1,18 +1,44 @@
+import argparse
+import json
 import openai
 import pytest
 import os
 import tempfile
+import subprocess
 import sys
+import threading
+import time
 import autodocstrings
 import autodocstrings.main
 
 from openai.error import RateLimitError
+from autodocstrings.cache import DocstringCache
+from autodocstrings.errors import (
+    ConfigurationError,
+    FailedFilesError,
+    RetriesExceededError,
+)
+from autodocstrings.generation import generate_docstrings
+from autodocstrings.metrics import Metrics
+from autodocstrings.prompts import COMPLETION_PARAMETERS, PROMPT_TEMPLATE
+from autodocstrings.ratelimit import Budget, RateLimiter
+from autodocstrings.routing import MODEL_ENGINE, SMALL_MODEL_ENGINE, route
+from autodocstrings.scheduler import DocstringScheduler
+from autodocstrings.stub_server import StubCompletionServer
+from autodocstrings.walker import Shard
+from autodocstrings.watch import Watcher
 from autodocstrings.main import (
     generate_docstring,
     update_docstrings_in_directory,
     update_docstrings_in_file,
     update_docstrings,
+    plan_update,
+    merge_run_reports,
+    watch_docstrings,
     _extract_exclude_list,
+    _positive_int,
+    _priority_list,
+    _shard,
 )
 
 
@@ -30,6 +56,74 @@ def test_generate_docstring(mocker):
     assert docstring == "Test docstring"
 
 
+def test_generate_docstring_uses_cache(mocker):
+    mock_completions = mocker.MagicMock()
+    mock_completions.choices = [mocker.MagicMock()]
+    mock_completions.choices[0].text = "Test docstring"
+    create = mocker.patch.object(
+        openai.Completion, "create", return_value=mock_completions
+    )
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with DocstringCache(cache_dir) as cache:
+            # The first request is sent to the API and stored in the cache
+            assert generate_docstring("def foo():\n    pass", "foo", cache) == (
+                "Test docstring"
+            )
+            # The same dedented code is answered from the cache
+            assert generate_docstring("    def foo():\n        pass", "foo", cache) == (
+                "Test docstring"
+            )
+            # Another function is sent to the API
+            generate_docstring("def bar():\n    pass", "bar", cache)
+
+    assert create.call_count == 2
+
+
+def test_generate_docstrings_sends_batches(mocker):
+    # The choices are not necessarily returned in the order of the prompts
+    mock_completions = mocker.MagicMock()
+    mock_completions.choices = [mocker.MagicMock(), mocker.MagicMock()]
+    mock_completions.choices[0].index = 1
+    mock_completions.choices[0].text = "Docstring for baz"
+    mock_completions.choices[1].index = 0
+    mock_completions.choices[1].text = "Docstring for foo"
+    create = mocker.patch.object(
+        openai.Completion, "create", return_value=mock_completions
+    )
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with DocstringCache(cache_dir) as cache:
+            code_route = route("def bar():\n    pass")
+            cache_key = DocstringCache.make_key(
+                engine=code_route.model,
+                template=PROMPT_TEMPLATE,
+                parameters=dict(
+                    COMPLETION_PARAMETERS,
+                    max_tokens=code_route.max_tokens,
+                ),
+                code_block="def bar():\n    pass",
+                block_name="bar",
+            )
+            cache.set(cache_key, "Docstring for bar")
+
+            docstrings = generate_docstrings(
+                [
+                    ("def foo():\n    pass", "foo"),
+                    ("def bar():\n    pass", "bar"),
+                    ("def baz():\n    pass", "baz"),
+                ],
+                cache,
+            )
+
+    # Check that the functions missing from the cache were sent in one request
+    assert docstrings == ["Docstring for foo", "Docstring for bar", "Docstring for baz"]
+    create.assert_called_once()
+    prompts = create.call_args.kwargs["prompt"]
+    assert len(prompts) == 2
+    assert "def foo" in prompts[0] and "def baz" in prompts[1]
+
+
 def test_generate_docstring_retries_exceeded(mocker):
     # Set up the mock for the openai.Completion.create function
     mocker.patch.object(openai.Completion, "create", side_effect=RateLimitError)
@@ -37,12 +131,38 @@ def test_generate_docstring_retries_exceeded(mocker):
     # Set up the mock for the time.sleep function
     mocker.patch("time.sleep", lambda x: None)
 
-    # Call the generate_docstring function and capture the exit code
-    with pytest.raises(SystemExit) as exit_code:
+    # Call the generate_docstring function, which gives up
+    with pytest.raises(RetriesExceededError):
         generate_docstring("code_block", "block_name")
 
-    # Assert that the exit code is 1
-    assert exit_code.value.code == 1
+
+def test_generate_docstring_retries_throttled_requests(mocker):
+    mock_completions = mocker.MagicMock()
+    mock_completions.choices = [mocker.MagicMock()]
+    mock_completions.choices[0].text = "Test docstring"
+    error = RateLimitError(headers={"Retry-After": "7"})
+    mocker.patch.object(
+        openai.Completion, "create", side_effect=[error, mock_completions]
+    )
+    sleep = mocker.patch("time.sleep")
+
+    rate_limiter = RateLimiter(max_concurrency=4)
+    assert generate_docstring("pass", "foo", rate_limiter=rate_limiter) == (
+        "Test docstring"
+    )
+
+    # Check that the request waited for the delay requested by the server
+    assert sleep.call_args.args[0] > 6
+    assert rate_limiter.concurrency < 4
+
+
+def mock_generate_docstrings(mocker, docstring: str):
+    # Answer every request of a batch with the same docstring
+    return mocker.patch.object(
+        autodocstrings.main,
+        "generate_docstrings",
+        side_effect=lambda requests, **kwargs: [docstring] * len(requests),
+    )
 
 
 def create_test_file_with_docstring(docstring: str) -> tempfile.NamedTemporaryFile:
@@ -72,9 +192,7 @@ def test_update_docstrings_in_file_replaces_existing_docstrings(mocker):
     # Create a test file with an existing docstring
     test_file = create_test_file_with_docstring('"""This is a docstring."""')
 
-    mocker.patch.object(
-        autodocstrings.main, "generate_docstring", return_value="Updated docstring"
-    )
+    mock_generate_docstrings(mocker, "Updated docstring")
 
     # Replace the existing docstring
     update_docstrings_in_file(
@@ -97,9 +215,7 @@ def test_update_docstrings_in_file_does_not_replace_existing_docstrings(mocker):
     # Create a test file with an existing docstring
     test_file = create_test_file_with_docstring('"""This is a docstring."""')
 
-    mocker.patch.object(
-        autodocstrings.main, "generate_docstring", return_value="Updated docstring"
-    )
+    mock_generate_docstrings(mocker, "Updated docstring")
 
     # Replace the existing docstring
     update_docstrings_in_file(
@@ -122,9 +238,7 @@ def test_update_docstrings_in_file_skips_constructor_docstrings(mocker):
     # Create a test file with an existing docstring
     test_file = create_test_file_with_constructor()
 
-    mocker.patch.object(
-        autodocstrings.main, "generate_docstring", return_value="Updated docstring"
-    )
+    mock_generate_docstrings(mocker, "Updated docstring")
 
     # Replace the existing docstring
     update_docstrings_in_file(
@@ -146,9 +260,7 @@ def test_update_docstrings_in_file_does_not_skip_constructor_docstrings(mocker):
     # Create a test file with an existing docstring
     test_file = create_test_file_with_constructor()
 
-    mocker.patch.object(
-        autodocstrings.main, "generate_docstring", return_value="Updated docstring"
-    )
+    mock_generate_docstrings(mocker, "Updated docstring")
 
     # Replace the existing docstring
     update_docstrings_in_file(
@@ -166,6 +278,65 @@ def test_update_docstrings_in_file_does_not_skip_constructor_docstrings(mocker):
     os.unlink(test_file.name)
 
 
+def test_update_docstrings_in_file_keeps_function_order(mocker):
+    # Create a test file with several functions
+    test_file = tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False)
+    test_file.write("def foo():\n    pass\n\n\ndef bar():\n    pass\n")
+    test_file.close()
+
+    # Answer the requests out of order
+    def slow_first(requests):
+        ((code_block, block_name),) = requests
+        if block_name == "foo":
+            time.sleep(0.1)
+        return [f"Docstring for {block_name}"]
+
+    with DocstringScheduler(slow_first, 2) as scheduler:
+        update_docstrings_in_file(test_file.name, False, False, scheduler=scheduler)
+
+    # Check that each docstring was inserted into its own function
+    with open(test_file.name, "r") as f:
+        updated_file_contents = f.read()
+    assert updated_file_contents.index("def foo") < updated_file_contents.index(
+        "Docstring for foo"
+    )
+    assert updated_file_contents.index(
+        "Docstring for foo"
+    ) < updated_file_contents.index("def bar")
+    assert updated_file_contents.index("def bar") < updated_file_contents.index(
+        "Docstring for bar"
+    )
+
+    # Clean up the test file
+    os.unlink(test_file.name)
+
+
+def test_update_docstrings_in_file_sends_code_blocks(mocker):
+    test_file = tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False)
+    test_file.write(
+        "class Foo:\n"
+        "    def bar(self):  # Kept comment\n"
+        "        'Existing docstring'\n"
+        "        return 1\n"
+        "\n"
+        "    def baz(self): 'Existing docstring'; return 2\n"
+    )
+    test_file.close()
+
+    generate = mock_generate_docstrings(mocker, "Test docstring")
+
+    update_docstrings_in_file(test_file.name, True, False)
+
+    # The code is sliced out of the file, or regenerated if it cannot be
+    requests = [call[0][0][0] for call in generate.call_args_list]
+    assert requests == [
+        ("def bar(self):  # Kept comment\n    return 1", "bar"),
+        ("def baz(self):\n    return 2", "baz"),
+    ]
+
+    os.unlink(test_file.name)
+
+
 def test_update_docstrings_in_directory(mocker):
     # Create a test directory structure with Python files
     test_dir = tempfile.TemporaryDirectory()
@@ -184,13 +355,61 @@ def test_update_docstrings_in_directory(mocker):
     update_docstrings_in_directory(test_dir.name, True, False, [], [])
 
     # Check that update_docstrings_in_file was called for all Python files in the directory and its subdirectories
-    autodocstrings.main.update_docstrings_in_file.assert_any_call(file_1, True, False)
-    autodocstrings.main.update_docstrings_in_file.assert_any_call(file_2, True, False)
+    autodocstrings.main.update_docstrings_in_file.assert_any_call(
+        file_1,
+        True,
+        False,
+        scheduler=mocker.ANY,
+        manifest=None,
+        process_pool=None,
+        metrics=mocker.ANY,
+        changes=None,
+        journal=None,
+        report=None,
+    )
+    autodocstrings.main.update_docstrings_in_file.assert_any_call(
+        file_2,
+        True,
+        False,
+        scheduler=mocker.ANY,
+        manifest=None,
+        process_pool=None,
+        metrics=mocker.ANY,
+        changes=None,
+        journal=None,
+        report=None,
+    )
 
     # Clean up the test directory
     test_dir.cleanup()
 
 
+def test_update_docstrings_in_directory_with_jobs(mocker):
+    # Create a test directory with several Python files
+    test_dir = tempfile.TemporaryDirectory()
+    files = [os.path.join(test_dir.name, f"file_{i}.py") for i in range(3)]
+    for i, file in enumerate(files):
+        with open(file, "w") as f:
+            f.write(f"def foo_{i}():\n    pass\n")
+
+    generate = mock_generate_docstrings(mocker, "Updated docstring")
+
+    # Parse the files in other processes
+    update_docstrings_in_directory(test_dir.name, True, False, jobs=2)
+
+    # Check that the requests were still made by this process
+    assert sorted(call.args[0][0][1] for call in generate.call_args_list) == [
+        "foo_0",
+        "foo_1",
+        "foo_2",
+    ]
+    for file in files:
+        with open(file, "r") as f:
+            assert "Updated docstring" in f.read()
+
+    test_dir.cleanup()
+
+
 def test_update_docstrings_in_directory_with_exclude_files(mocker):
     # Create a test directory structure with Python files
     test_dir = tempfile.TemporaryDirectory()
@@ -233,6 +452,39 @@ def test_update_docstrings_in_directory_with_exclude_dirs(mocker):
     test_dir.cleanup()
 
 
+def test_update_docstrings_in_directory_bounds_the_files_in_flight(mocker):
+    release = threading.Event()
+    walked = []
+
+    def walk(*args):
+        for i in range(20):
+            walked.append(i)
+            yield f"file_{i}.py"
+
+    mocker.patch.object(autodocstrings.main, "iter_python_files", side_effect=walk)
+    update = mocker.patch.object(
+        autodocstrings.main,
+        "update_docstrings_in_file",
+        side_effect=lambda *args, **kwargs: release.wait(5),
+    )
+
+    with DocstringScheduler(generate_docstrings) as scheduler:
+        thread = threading.Thread(
+            target=update_docstrings_in_directory,
+            args=("code", False, False),
+            kwargs={"scheduler": scheduler},
+        )
+        thread.start()
+        # The walk waits while the files taken from it are not written
+        time.sleep(0.2)
+        in_flight = autodocstrings.main.FILES_IN_FLIGHT_PER_WORKER
+        assert len(walked) == in_flight + 1
+        release.set()
+        thread.join(5)
+
+    assert len(walked) == 20 and update.call_count == 20
+
+
 def test_update_docstrings_input_is_valid_file(mocker):
     os.environ["OPENAI_API_KEY"] = "test_key"
     # Create a test file with an existing docstring
@@ -258,7 +510,16 @@ def test_update_docstrings_input_is_valid_file(mocker):
         skip_constructor_docstrings=False,
     )
     autodocstrings.main.update_docstrings_in_file.assert_called_once_with(
-        "test_file.py", True, False
+        "test_file.py",
+        True,
+        False,
+        scheduler=mocker.ANY,
+        manifest=None,
+        metrics=mocker.ANY,
+        changes=None,
+        journal=None,
+        priority=None,
+        report=None,
     )
 
     # Clean up the test file
@@ -290,30 +551,663 @@ def test_update_docstrings_input_is_valid_directory(mocker):
         skip_constructor_docstrings=False,
     )
     autodocstrings.main.update_docstrings_in_directory.assert_called_once_with(
-        test_dir.name, True, False, [], []
+        test_dir.name,
+        True,
+        False,
+        [],
+        [],
+        scheduler=mocker.ANY,
+        manifest=None,
+        jobs=1,
+        respect_gitignore=True,
+        metrics=mocker.ANY,
+        changes=None,
+        journal=None,
+        priority=None,
+        shard=None,
+        report=None,
     )
 
     # Clean up the dir
     test_dir.cleanup()
 
 
+def test_update_docstrings_with_cache_dir(mocker):
+    os.environ["OPENAI_API_KEY"] = "test_key"
+    test_dir = tempfile.TemporaryDirectory()
+    cache_dir = os.path.join(test_dir.name, "cache")
+    test_file = os.path.join(test_dir.name, "test_file.py")
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n")
+
+    generate = mock_generate_docstrings(mocker, "Test docstring")
+
+    update_docstrings(test_file, True, False, cache_dir=cache_dir)
+
+    # Check that the requests were made with the cache
+    assert isinstance(generate.call_args.kwargs["cache"], DocstringCache)
+    assert os.path.exists(os.path.join(cache_dir, "docstrings.sqlite3"))
+
+    test_dir.cleanup()
+
+
+def test_update_docstrings_incremental_skips_unchanged_files(mocker):
+    os.environ["OPENAI_API_KEY"] = "test_key"
+    test_dir = tempfile.TemporaryDirectory()
+    manifest_path = os.path.join(test_dir.name, "manifest.json")
+    test_file = os.path.join(test_dir.name, "test_file.py")
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n")
+
+    generate = mock_generate_docstrings(mocker, "Test docstring")
+
+    # The first run processes the file
+    update_docstrings(test_dir.name, True, False, manifest_path=manifest_path)
+    assert generate.call_count == 1
+
+    # The second run skips it because it did not change
+    report_path = os.path.join(test_dir.name, "report.json")
+    update_docstrings(
+        test_dir.name,
+        True,
+        False,
+        manifest_path=manifest_path,
+        report_path=report_path,
+    )
+    assert generate.call_count == 1
+    with open(report_path) as f:
+        assert json.load(f)["files"] == {test_file: {"status": "skipped"}}
+
+    # A run with different settings processes it again
+    update_docstrings(test_dir.name, True, True, manifest_path=manifest_path)
+    assert generate.call_count == 2
+
+    # The file is processed again once it changes
+    with open(test_file, "a") as f:
+        f.write("\n\ndef bar():\n    pass\n")
+    update_docstrings(test_file, False, True, manifest_path=manifest_path)
+    assert generate.call_count == 3
+
+    test_dir.cleanup()
+
+
+def test_update_docstrings_since_documents_changed_functions(mocker):
+    os.environ["OPENAI_API_KEY"] = "test_key"
+    test_dir = tempfile.TemporaryDirectory()
+    test_file = os.path.join(test_dir.name, "test_file.py")
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n\n\ndef bar():\n    pass\n")
+    with open(os.path.join(test_dir.name, "unchanged_file.py"), "w") as f:
+        f.write("def baz():\n    pass\n")
+    for command in (["init", "-q"], ["add", "."], ["commit", "-q", "-m", "initial"]):
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+            + command,
+            cwd=test_dir.name,
+            check=True,
+        )
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n\n\ndef bar():\n    return 1\n")
+
+    generate = mock_generate_docstrings(mocker, "Test docstring")
+
+    update_docstrings(test_dir.name, False, False, since="HEAD")
+
+    # Only the changed function is documented
+    requests = generate.call_args[0][0]
+    assert [block_name for _, block_name in requests] == ["bar"]
+    with open(test_file) as f:
+        assert f.read().count("Test docstring") == 1
+
+    # An unknown reference is an error
+    with pytest.raises(ConfigurationError, match="no-such-ref"):
+        update_docstrings(test_dir.name, False, False, since="no-such-ref")
+
+    test_dir.cleanup()
+
+
+def test_update_docstrings_deduplicates_identical_functions(mocker):
+    os.environ["OPENAI_API_KEY"] = "test_key"
+    test_dir = tempfile.TemporaryDirectory()
+    for name in ("file_1.py", "file_2.py"):
+        with open(os.path.join(test_dir.name, name), "w") as f:
+            f.write("def foo():\n    pass\n")
+    metrics_path = os.path.join(test_dir.name, "metrics.json")
+
+    generate = mock_generate_docstrings(mocker, "Test docstring")
+
+    update_docstrings(test_dir.name, False, False, metrics_path=metrics_path)
+
+    # Both files are documented with a single request
+    assert generate.call_count == 1
+    for name in ("file_1.py", "file_2.py"):
+        with open(os.path.join(test_dir.name, name)) as f:
+            assert "Test docstring" in f.read()
+    with open(metrics_path) as f:
+        assert json.load(f)["counters"]["deduplicated_functions"] == 1
+
+    test_dir.cleanup()
+
+
+def test_watch_docstrings(mocker):
+    test_dir = tempfile.TemporaryDirectory()
+    test_file = os.path.join(test_dir.name, "test_file.py")
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n\n\ndef bar():\n    pass\n")
+    broken_file = os.path.join(test_dir.name, "broken_file.py")
+
+    generate = mock_generate_docstrings(mocker, "Test docstring")
+    watcher = Watcher(lambda: [test_file, broken_file], interval=0.01, debounce=0.02)
+    scheduler = DocstringScheduler(autodocstrings.main.generate_docstrings)
+    thread = threading.Thread(
+        target=watch_docstrings, args=(watcher, True, False, scheduler)
+    )
+    thread.start()
+
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n\n\ndef bar():\n    return 1\n")
+    with open(broken_file, "w") as f:
+        f.write("def foo(:\n")
+    deadline = time.monotonic() + 5
+    while generate.call_count == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # The docstring written is not mistaken for a change
+    time.sleep(0.2)
+    watcher.stop()
+    thread.join()
+    scheduler.shutdown()
+
+    # Only the changed function is documented
+    assert generate.call_count == 1
+    assert generate.call_args[0][0] == [("def bar():\n    return 1", "bar")]
+    with open(test_file) as f:
+        assert f.read().count("Test docstring") == 1
+
+    test_dir.cleanup()
+
+
+def test_watch_docstrings_keeps_edits_saved_during_generation(mocker):
+    test_dir = tempfile.TemporaryDirectory()
+    test_file = os.path.join(test_dir.name, "test_file.py")
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n\n\ndef bar():\n    pass\n")
+
+    # Block the first request until the file is saved again
+    saved = threading.Event()
+    requests = []
+
+    def generate(batch, **kwargs):
+        requests.extend(batch)
+        if len(requests) == 1:
+            with open(test_file, "w") as f:
+                f.write("def foo():\n    return 2\n\n\ndef bar():\n    return 1\n")
+            saved.set()
+        return ["Test docstring"] * len(batch)
+
+    mocker.patch.object(
+        autodocstrings.main, "generate_docstrings", side_effect=generate
+    )
+    watcher = Watcher(lambda: [test_file], interval=0.01, debounce=0.02)
+    scheduler = DocstringScheduler(autodocstrings.main.generate_docstrings)
+    thread = threading.Thread(
+        target=watch_docstrings, args=(watcher, True, False, scheduler)
+    )
+    thread.start()
+
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n\n\ndef bar():\n    return 1\n")
+    deadline = time.monotonic() + 5
+    while len(requests) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    watcher.stop()
+    thread.join()
+    scheduler.shutdown()
+
+    # The docstring of the first change is dropped, then written with that of the edit
+    # saved in the meantime, the docstring of bar being reused by the scheduler
+    assert saved.is_set()
+    assert requests == [
+        ("def bar():\n    return 1", "bar"),
+        ("def foo():\n    return 2", "foo"),
+    ]
+    with open(test_file) as f:
+        contents = f.read()
+    assert "return 2" in contents and contents.count("Test docstring") == 2
+
+    test_dir.cleanup()
+
+
+def test_update_docstrings_in_file_leaves_deleted_file(mocker):
+    test_dir = tempfile.TemporaryDirectory()
+    test_file = os.path.join(test_dir.name, "test_file.py")
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n")
+
+    def generate(batch, **kwargs):
+        os.remove(test_file)
+        return ["Test docstring"] * len(batch)
+
+    mocker.patch.object(
+        autodocstrings.main, "generate_docstrings", side_effect=generate
+    )
+
+    # The file deleted while its docstrings were generated is not written again
+    assert not update_docstrings_in_file(test_file, False, False)
+    assert not os.path.exists(test_file)
+
+    test_dir.cleanup()
+
+
+def test_update_docstrings_watch(mocker):
+    os.environ["OPENAI_API_KEY"] = "test_key"
+    test_dir = tempfile.TemporaryDirectory()
+    test_file = os.path.join(test_dir.name, "test_file.py")
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n")
+
+    generate = mock_generate_docstrings(mocker, "Test docstring")
+    changes = mocker.patch.object(Watcher, "changes", side_effect=KeyboardInterrupt)
+
+    # The files are updated once before being watched, until interrupted
+    update_docstrings(test_dir.name, False, False, watch=True)
+    update_docstrings(test_file, False, False, watch=True)
+
+    assert generate.call_count == 1
+    assert changes.call_count == 2
+
+    test_dir.cleanup()
+
+
+def test_update_docstrings_resumes_from_journal(mocker):
+    os.environ["OPENAI_API_KEY"] = "test_key"
+    test_dir = tempfile.TemporaryDirectory()
+    test_file = os.path.join(test_dir.name, "test_file.py")
+    with open(test_file, "w") as f:
+        f.write(
+            "class Foo:\n"
+            "    def bar(self):\n"
+            "        def inner():\n"
+            "            pass\n"
+            "\n"
+            "\n"
+            "def baz():\n"
+            "    pass\n"
+        )
+    journal_path = os.path.join(test_dir.name, "journal.jsonl")
+
+    # The run dies before documenting baz
+    def fail_on_baz(requests, **kwargs):
+        if requests[0][1] == "baz":
+            sys.exit(1)
+        return ["Test docstring"] * len(requests)
+
+    generate = mocker.patch.object(
+        autodocstrings.main, "generate_docstrings", side_effect=fail_on_baz
+    )
+    with pytest.raises(SystemExit):
+        update_docstrings(test_file, False, False, journal_path=journal_path)
+    with open(test_file) as f:
+        assert "Test docstring" not in f.read()
+    with open(journal_path) as f:
+        functions = [json.loads(line).get("function") for line in f]
+    assert sorted(functions[1:]) == ["Foo.bar", "Foo.bar.<locals>.inner"]
+
+    # The resumed run only generates the missing docstring
+    generate = mock_generate_docstrings(mocker, "Test docstring")
+    metrics_path = os.path.join(test_dir.name, "metrics.json")
+    update_docstrings(
+        test_file,
+        False,
+        False,
+        metrics_path=metrics_path,
+        journal_path=journal_path,
+        resume=True,
+    )
+    assert generate.call_count == 1
+    with open(test_file) as f:
+        assert f.read().count("Test docstring") == 3
+    with open(metrics_path) as f:
+        assert json.load(f)["counters"]["resumed_functions"] == 2
+    # The journal is removed once the run completes
+    assert not os.path.exists(journal_path)
+
+    # A run does not truncate the journal of another one
+    open(journal_path, "w").close()
+    with pytest.raises(ConfigurationError, match="already exists"):
+        update_docstrings(test_file, False, False, journal_path=journal_path)
+
+    test_dir.cleanup()
+
+
+def test_update_docstrings_leaves_untouched_files(mocker, capsys):
+    os.environ["OPENAI_API_KEY"] = "test_key"
+    test_dir = tempfile.TemporaryDirectory()
+    sources = {
+        "documented.py": "def foo():\n    'Docstring'\n",
+        "constant.py": "x = 1\n",
+        "constructor.py": "class Foo:\n    def __init__(self):\n        pass\n",
+        "undocumented.py": "def foo():\n    pass\n",
+    }
+    for name, source in sources.items():
+        file = os.path.join(test_dir.name, name)
+        with open(file, "w") as f:
+            f.write(source)
+        os.utime(file, ns=(0, 0))
+
+    mock_generate_docstrings(mocker, "Test docstring")
+    update_docstrings(test_dir.name, False, True)
+
+    # Only the file with a function to document is written
+    modified = [
+        name
+        for name in sources
+        if os.stat(os.path.join(test_dir.name, name)).st_mtime_ns != 0
+    ]
+    assert modified == ["undocumented.py"]
+    assert (
+        "Documented 1 functions, modified 1 files and left 3 untouched"
+        in capsys.readouterr().out
+    )
+
+    test_dir.cleanup()
+
+
+def mock_completions(mocker):
+    def create(prompt, **kwargs):
+        completions = mocker.MagicMock()
+        completions.choices = []
+        for index, text in enumerate(prompt):
+            choice = mocker.MagicMock()
+            choice.index = index
+            choice.text = "Docstring"
+            completions.choices.append(choice)
+        return completions
+
+    return mocker.patch.object(openai.Completion, "create", side_effect=create)
+
+
+def test_generate_docstrings_routes_by_complexity(mocker):
+    create = mock_completions(mocker)
+    metrics = Metrics()
+    complex_function = "def qux(a, b):\n" + "    if a:\n        b += 1\n" * 5
+
+    docstrings = generate_docstrings(
+        [
+            ("def foo():\n    pass", "foo"),
+            ("def get(self):\n    return self.value", "get"),
+            (complex_function, "qux"),
+            ("def bar(a):\n    return a", "bar"),
+        ],
+        metrics=metrics,
+    )
+
+    # The getter is documented from a template, the others by the model of their complexity
+    assert docstrings == [
+        "Docstring",
+        "Get the value.\n\nReturns:\n    The value.",
+        "Docstring",
+        "Docstring",
+    ]
+    requests = {call.kwargs["engine"]: call.kwargs for call in create.call_args_list}
+    assert len(requests) == 2
+    assert len(requests[SMALL_MODEL_ENGINE]["prompt"]) == 2
+    assert (
+        requests[SMALL_MODEL_ENGINE]["max_tokens"]
+        == route("def bar(a):\n    return a").max_tokens
+    )
+    assert len(requests[MODEL_ENGINE]["prompt"]) == 1
+    assert requests[MODEL_ENGINE]["max_tokens"] == route(complex_function).max_tokens
+    assert metrics.counter("templated_functions") == 1
+    assert metrics.counter("small_model_functions") == 2
+
+
+def test_generate_docstrings_within_budget(mocker):
+    create = mock_completions(mocker)
+    budget = Budget(max_requests=1)
+    requests = [("def foo():\n    pass", "foo"), ("def bar():\n    pass", "bar")]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with DocstringCache(cache_dir) as cache:
+            assert generate_docstrings(requests[:1], cache, budget=budget) == [
+                "Docstring"
+            ]
+            # The docstrings which do not fit in the budget are neither generated nor cached
+            assert generate_docstrings(requests, cache, budget=budget) == [
+                "Docstring",
+                None,
+            ]
+            assert generate_docstrings(requests[1:], cache) == ["Docstring"]
+    assert create.call_count == 2
+
+
+def test_update_docstrings_by_priority_within_budget(mocker, capsys):
+    os.environ["OPENAI_API_KEY"] = "test_key"
+    mock_completions(mocker)
+    test_dir = tempfile.TemporaryDirectory()
+    sources = {
+        "a.py": "def _helper():\n    pass\n",
+        "b.py": "def api():\n    return _helper()\n",
+    }
+    for name, source in sources.items():
+        with open(os.path.join(test_dir.name, name), "w") as f:
+            f.write(source)
+    journal = os.path.join(test_dir.name, "journal.jsonl")
+
+    # Only the public function, submitted first, fits in the budget
+    update_docstrings(
+        test_dir.name,
+        False,
+        False,
+        journal_path=journal,
+        priority=["public"],
+        max_requests=1,
+    )
+    with open(os.path.join(test_dir.name, "a.py")) as f:
+        assert f.read() == sources["a.py"]
+    with open(os.path.join(test_dir.name, "b.py")) as f:
+        assert '"""' in f.read()
+    assert "Budget reached, left 1 functions undocumented" in capsys.readouterr().out
+
+    # The functions of a single file are ordered too
+    file = os.path.join(test_dir.name, "c.py")
+    with open(file, "w") as f:
+        f.write(sources["a.py"] + "\n" + sources["b.py"])
+    update_docstrings(file, False, False, priority=["public"], max_requests=1)
+    with open(file) as f:
+        contents = f.read()
+    assert contents.startswith(sources["a.py"]) and '"""' in contents
+
+    test_dir.cleanup()
+
+
+def test_update_docstrings_incrementally_within_budget(mocker):
+    os.environ["OPENAI_API_KEY"] = "test_key"
+    create = mock_completions(mocker)
+    test_dir = tempfile.TemporaryDirectory()
+    test_file = os.path.join(test_dir.name, "test_file.py")
+    with open(test_file, "w") as f:
+        f.write(
+            "def foo():\n    pass\n\n\ndef bar():\n    return 1\n\n\ndef baz(a):\n    return a\n"
+        )
+    manifest_path = os.path.join(test_dir.name, "manifest.json")
+
+    # The budget only covers one of the functions
+    update_docstrings(
+        test_file, False, False, manifest_path=manifest_path, max_requests=1
+    )
+    with open(test_file) as f:
+        assert f.read().count('"""') == 2
+
+    # The file is not recorded as done, so the next run documents the others
+    update_docstrings(test_file, False, False, manifest_path=manifest_path)
+    with open(test_file) as f:
+        assert f.read().count('"""') == 6
+    assert create.call_count == 3
+
+    # Once every function is documented, the file is skipped
+    update_docstrings(test_file, False, False, manifest_path=manifest_path)
+    assert create.call_count == 3
+
+    test_dir.cleanup()
+
+
+def test_update_docstrings_by_shard(mocker, capsys):
+    os.environ["OPENAI_API_KEY"] = "test_key"
+    mock_generate_docstrings(mocker, "Test docstring")
+    test_dir = tempfile.TemporaryDirectory()
+    code_dir = os.path.join(test_dir.name, "code")
+    os.makedirs(code_dir)
+    for i in range(6):
+        with open(os.path.join(code_dir, f"module_{i}.py"), "w") as f:
+            f.write(f"def foo_{i}():\n    pass\n")
+    broken = os.path.join(code_dir, "broken.py")
+    with open(broken, "w") as f:
+        f.write("def broken(:\n    pass\n")
+
+    # Every shard updates its own files, and the one with the broken file fails once done
+    reports = []
+    exit_codes = []
+    for i in (1, 2):
+        reports.append(os.path.join(test_dir.name, f"report_{i}.json"))
+        try:
+            update_docstrings(
+                code_dir, False, False, shard=Shard(i, 2), report_path=reports[-1]
+            )
+            exit_codes.append(0)
+        except FailedFilesError as error:
+            assert str(error) == "Failed to parse 1 files"
+            exit_codes.append(1)
+    assert sorted(exit_codes) == [0, 1]
+
+    merged_path = os.path.join(test_dir.name, "merged.json")
+    with pytest.raises(FailedFilesError) as pytest_wrapped_e:
+        merge_run_reports(reports, merged_path)
+    assert pytest_wrapped_e.value.failed == 1
+    with open(merged_path) as f:
+        merged = json.load(f)
+    assert sorted(merged["shards"]) == ["1/2", "2/2"]
+    assert merged["counters"]["documented_functions"] == 6
+    assert merged["files"][broken]["status"] == "failed"
+    statuses = {
+        file: entry["status"]
+        for file, entry in merged["files"].items()
+        if file != broken
+    }
+    assert len(statuses) == 6 and set(statuses.values()) == {"modified"}
+
+    # The reports of shards without failures merge cleanly
+    succeeded = reports[exit_codes.index(0)]
+    assert merge_run_reports([succeeded])["shards"] == [
+        merged["shards"][exit_codes.index(0)]
+    ]
+
+    # A file input is left untouched by the other shards
+    test_file = os.path.join(code_dir, "module_0.py")
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n")
+    for i in (1, 2):
+        update_docstrings(test_file, False, False, shard=Shard(i, 2))
+    with open(test_file) as f:
+        assert f.read().count('"""') == 2
+
+    test_dir.cleanup()
+
+
+def test_merge_run_reports_invalid_report():
+    with pytest.raises(ConfigurationError, match="missing_report.json"):
+        merge_run_reports(["missing_report.json"])
+
+
 def test_update_docstrings_invalid_input(mocker):
     os.environ["OPENAI_API_KEY"] = "test_key"
 
-    with pytest.raises(SystemExit) as pytest_wrapped_e:
+    with pytest.raises(ConfigurationError, match="Invalid input"):
         update_docstrings("invalid_input", True, False)
-    assert pytest_wrapped_e.type == SystemExit
-    assert pytest_wrapped_e.value.code == 1
 
 
 def test_update_docstrings_invalid_api_key(mocker):
     os.environ.pop("OPENAI_API_KEY")
     open("test_file.py", "w").close()
 
-    with pytest.raises(SystemExit) as pytest_wrapped_e:
+    with pytest.raises(ConfigurationError, match="OPENAI_API_KEY"):
         update_docstrings("test_file.py", True, False)
-    assert pytest_wrapped_e.type == SystemExit
-    assert pytest_wrapped_e.value.code == 1
+
+
+def test_update_docstrings_with_api_base(mocker):
+    # A self-hosted API does not need an OpenAI API key
+    os.environ.pop("OPENAI_API_KEY", None)
+    mocker.patch("time.sleep")
+    test_dir = tempfile.TemporaryDirectory()
+    test_file = os.path.join(test_dir.name, "test_file.py")
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n")
+
+    metrics_path = os.path.join(test_dir.name, "metrics.json")
+
+    # The first request is throttled, and retried
+    with StubCompletionServer(throttle_rate=0.5, seed=1) as server:
+        update_docstrings(
+            test_file,
+            True,
+            False,
+            concurrency=4,
+            api_base=server.url,
+            metrics_path=metrics_path,
+        )
+
+    with open(test_file, "r") as f:
+        assert "Stub docstring for foo." in f.read()
+
+    # Check that the run was measured
+    with open(metrics_path, "r") as f:
+        metrics = json.load(f)
+    assert metrics["counters"]["api_requests"] == server.requests == 2
+    assert metrics["counters"]["retries"] == 1
+    assert metrics["histograms"]["api_latency_seconds"]["count"] == 2
+    for phase in ["read", "parse", "render", "api", "wait", "splice", "write"]:
+        assert metrics["phases"][phase]["count"] >= 1
+    assert metrics["files"][test_file]["functions"] == 1
+
+    test_dir.cleanup()
+
+
+def test_plan_update(mocker):
+    # The plan needs neither an API key nor the API
+    os.environ.pop("OPENAI_API_KEY", None)
+    create = mocker.patch.object(openai.Completion, "create")
+    test_dir = tempfile.TemporaryDirectory()
+    cache_dir = os.path.join(test_dir.name, "cache")
+    manifest_path = os.path.join(test_dir.name, "manifest.json")
+    test_file = os.path.join(test_dir.name, "test_file.py")
+    with open(test_file, "w") as f:
+        f.write("def foo():\n    pass\n\n\ndef bar():\n    pass\n")
+
+    plan = plan_update(test_dir.name, True, False, cache_dir=cache_dir)
+    assert (plan.files, plan.functions, plan.requests) == (1, 2, 2)
+    assert plan_update(test_file, True, False, batch_size=2).requests == 1
+    assert plan_update(test_file, True, False, exclude_files=["*.py"]).files == 0
+    # Only the files of the shard are planned
+    shards = [
+        plan_update(test_file, True, False, shard=Shard(i, 2)).files for i in (1, 2)
+    ]
+    assert sorted(shards) == [0, 1]
+    shards = [
+        plan_update(test_dir.name, True, False, shard=Shard(i, 2)).files for i in (1, 2)
+    ]
+    assert sorted(shards) == [0, 1]
+
+    # The cache and the manifest are only read
+    assert not os.path.exists(cache_dir)
+    os.makedirs(cache_dir)
+    plan = plan_update(
+        test_dir.name, True, False, cache_dir=cache_dir, manifest_path=manifest_path
+    )
+    assert plan.functions == 2
+    assert not os.path.exists(manifest_path)
+    create.assert_not_called()
+
+    test_dir.cleanup()
 
 
 def test_extract_exclude_list(mocker):
@@ -338,6 +1232,75 @@ def test_extract_exclude_list(mocker):
     ]
 
 
+def test_positive_int():
+    assert _positive_int("3") == 3
+
+    with pytest.raises(argparse.ArgumentTypeError):
+        _positive_int("0")
+
+    with pytest.raises(argparse.ArgumentTypeError):
+        _positive_int("many")
+
+
+def test_priority_list():
+    assert _priority_list("size, recent") == ["size", "recent"]
+
+    with pytest.raises(argparse.ArgumentTypeError):
+        _priority_list("public,alphabetical")
+
+    with pytest.raises(argparse.ArgumentTypeError):
+        _priority_list(" , ")
+
+
+def test_shard():
+    assert _shard("1/3") == Shard(1, 3)
+
+    with pytest.raises(argparse.ArgumentTypeError):
+        _shard("4/3")
+
+
+def test_main_merge_reports(mocker):
+    mocker.patch.object(autodocstrings.main, "merge_run_reports", return_value={})
+    mocker.patch.object(autodocstrings.main, "update_docstrings", return_value=None)
+
+    sys.argv = [
+        "autodocstrings",
+        "merge-reports",
+        "report_1.json",
+        "report_2.json",
+        "--output",
+        "report.json",
+    ]
+    autodocstrings.main.main()
+
+    autodocstrings.main.update_docstrings.assert_not_called()
+    autodocstrings.main.merge_run_reports.assert_called_once_with(
+        ["report_1.json", "report_2.json"], "report.json"
+    )
+
+
+def test_main_reports_errors(mocker, capsys):
+    os.environ["OPENAI_API_KEY"] = "test_key"
+
+    # The errors ending a run are printed and exit with status 1
+    sys.argv = ["autodocstrings", "invalid_input"]
+    with pytest.raises(SystemExit) as pytest_wrapped_e:
+        autodocstrings.main.main()
+    assert pytest_wrapped_e.value.code == 1
+    assert "Invalid input" in capsys.readouterr().out
+
+
+def test_main_resume_requires_journal(mocker, capsys):
+    update = mocker.patch.object(autodocstrings.main, "update_docstrings")
+
+    sys.argv = ["autodocstrings", "input_path", "--resume"]
+    with pytest.raises(SystemExit) as pytest_wrapped_e:
+        autodocstrings.main.main()
+    assert pytest_wrapped_e.value.code == 2
+    assert "--resume requires --journal" in capsys.readouterr().err
+    update.assert_not_called()
+
+
 def test_main(mocker):
     # Mock the update_docstrings function
     mocker.patch.object(autodocstrings.main, "update_docstrings", return_value=None)
@@ -352,6 +1315,44 @@ def test_main(mocker):
         "dir1,dir2",
         "--exclude-files",
         "file1,file2",
+        "--concurrency",
+        "8",
+        "--cache-dir",
+        "cache_dir",
+        "--incremental",
+        "--jobs",
+        "2",
+        "--requests-per-minute",
+        "20",
+        "--tokens-per-minute",
+        "40000",
+        "--batch-size",
+        "10",
+        "--max-batch-tokens",
+        "4000",
+        "--no-gitignore",
+        "--metrics-out",
+        "metrics.prom",
+        "--since",
+        "origin/main",
+        "--watch",
+        "--journal",
+        "journal.jsonl",
+        "--resume",
+        "--priority",
+        "public, calls",
+        "--max-requests",
+        "100",
+        "--max-tokens",
+        "500000",
+        "--shard",
+        "2/4",
+        "--report",
+        "report.json",
+        "--max-pending-requests",
+        "50",
+        "--deduplication-window",
+        "1000",
     ]
 
     # Call the main function
@@ -364,4 +1365,95 @@ def test_main(mocker):
         True,
         ["dir1", "dir2"],
         ["file1", "file2"],
+        concurrency=8,
+        cache_dir="cache_dir",
+        manifest_path=".autodocstrings-manifest.json",
+        jobs=2,
+        requests_per_minute=20,
+        tokens_per_minute=40000,
+        batch_size=10,
+        max_batch_tokens=4000,
+        respect_gitignore=False,
+        since="origin/main",
+        shard=Shard(2, 4),
+        api_base=None,
+        metrics_path="metrics.prom",
+        watch=True,
+        journal_path="journal.jsonl",
+        resume=True,
+        priority=["public", "calls"],
+        max_requests=100,
+        max_tokens=500000,
+        report_path="report.json",
+        max_pending_requests=50,
+        deduplication_window=1000,
+    )
+
+
+def test_main_loads_heavy_dependencies_lazily():
+    # --help and a run on an excluded file do not need the API clients or typer
+    script = """
+import contextlib, io, os, sys
+import autodocstrings.main
+sys.argv = ["autodocstrings", "--help"]
+with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):
+    autodocstrings.main.main()
+os.environ["OPENAI_API_KEY"] = "test_key"
+sys.argv = ["autodocstrings", __file__, "--exclude-files", "*.py"]
+autodocstrings.main.main()
+heavy = ("openai", "requests", "typer", "click", "astor", "black")
+print(",".join(sorted(module for module in heavy if module in sys.modules)))
+"""
+    with tempfile.TemporaryDirectory() as test_dir:
+        script_file = os.path.join(test_dir, "startup.py")
+        with open(script_file, "w") as f:
+            f.write(script)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [sys.executable, script_file],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": root},
+        )
+    assert result.stdout.strip() == ""
+
+
+def test_main_profile(mocker):
+    mocker.patch.object(autodocstrings.main, "update_docstrings", return_value=None)
+    test_dir = tempfile.TemporaryDirectory()
+    profile_path = os.path.join(test_dir.name, "profile.out")
+
+    sys.argv = ["autodocstrings", "input_path", "--profile", profile_path]
+    autodocstrings.main.main()
+
+    assert os.path.exists(profile_path)
+    test_dir.cleanup()
+
+
+def test_main_plan(mocker):
+    mocker.patch.object(autodocstrings.main, "update_docstrings", return_value=None)
+    mocker.patch.object(autodocstrings.main, "plan_update", return_value=None)
+
+    sys.argv = ["autodocstrings", "input_path", "--plan"]
+    autodocstrings.main.main()
+
+    autodocstrings.main.update_docstrings.assert_not_called()
+    autodocstrings.main.plan_update.assert_called_once_with(
+        "input_path",
+        False,
+        False,
+        [],
+        [],
+        concurrency=4,
+        cache_dir=None,
+        manifest_path=None,
+        jobs=1,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        batch_size=1,
+        max_batch_tokens=None,
+        respect_gitignore=True,
+        since=None,
+        shard=None,
     )
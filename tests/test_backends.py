@@ -0,0 +1,165 @@
+import openai
+import pytest
+
+from autodocstrings.backends import (
+    CompletionBackend,
+    HTTPBackend,
+    OpenAIBackend,
+    RetryableError,
+    _retry_after,
+    make_backend,
+)
+from autodocstrings.errors import CompletionError
+from autodocstrings.stub_server import StubCompletionServer
+from openai.error import (
+    AuthenticationError,
+    RateLimitError,
+    ServiceUnavailableError,
+)
+
+PARAMETERS = {"max_tokens": 150, "temperature": 0}
+
+
+def test_retry_after():
+    assert _retry_after({"retry-after": "1.5"}) == 1.5
+    assert _retry_after({"Retry-After": "soon"}) is None
+    assert _retry_after(None) is None
+
+
+def test_completion_backend_is_an_interface():
+    with pytest.raises(TypeError):
+        CompletionBackend()
+
+    class Backend(CompletionBackend):
+        def complete(self, model, prompts, parameters):
+            return prompts
+
+    with Backend() as backend:
+        assert backend.complete("model", ["prompt"], PARAMETERS) == ["prompt"]
+
+
+def test_openai_backend(mocker):
+    # The choices are not necessarily returned in the order of the prompts
+    mock_completions = mocker.MagicMock()
+    mock_completions.choices = [mocker.MagicMock(), mocker.MagicMock()]
+    mock_completions.choices[0].index = 1
+    mock_completions.choices[0].text = "Second"
+    mock_completions.choices[1].index = 0
+    mock_completions.choices[1].text = "First"
+    create = mocker.patch.object(
+        openai.Completion, "create", return_value=mock_completions
+    )
+
+    backend = OpenAIBackend("test_key")
+    assert backend.complete("model", ["a", "b"], PARAMETERS) == ["First", "Second"]
+    create.assert_called_once_with(
+        engine="model", prompt=["a", "b"], api_key="test_key", **PARAMETERS
+    )
+
+
+def test_openai_backend_other_errors(mocker):
+    mocker.patch.object(
+        openai.Completion,
+        "create",
+        side_effect=AuthenticationError("Incorrect API key provided"),
+    )
+
+    backend = OpenAIBackend("bad_key")
+    with pytest.raises(CompletionError, match="Incorrect API key"):
+        backend.complete("model", ["a"], PARAMETERS)
+
+
+def test_openai_backend_missing_completions(mocker):
+    # The server only completed the first prompt of the batch
+    mock_completions = mocker.MagicMock()
+    mock_completions.choices = [mocker.MagicMock(index=0, text="First")]
+    mocker.patch.object(openai.Completion, "create", return_value=mock_completions)
+
+    backend = OpenAIBackend()
+    with pytest.raises(CompletionError, match="1 completions to 2 prompts"):
+        backend.complete("model", ["a", "b"], PARAMETERS)
+
+
+def test_openai_backend_retryable_errors(mocker):
+    mocker.patch.object(
+        openai.Completion,
+        "create",
+        side_effect=[
+            RateLimitError(headers={"Retry-After": "3"}),
+            ServiceUnavailableError(),
+        ],
+    )
+
+    backend = OpenAIBackend()
+    with pytest.raises(RetryableError) as error:
+        backend.complete("model", ["a"], PARAMETERS)
+    assert error.value.retry_after == 3
+    with pytest.raises(RetryableError) as error:
+        backend.complete("model", ["a"], PARAMETERS)
+    assert error.value.retry_after is None
+
+
+def test_http_backend_reuses_connections():
+    with StubCompletionServer() as server:
+        with HTTPBackend(server.url + "/", "test_key", pool_size=2) as backend:
+            for _ in range(5):
+                completions = backend.complete(
+                    "model",
+                    ["# Write a docstring for the foo python function", "bar"],
+                    PARAMETERS,
+                )
+                assert completions[0].strip() == "Stub docstring for foo."
+                assert completions[1].strip() == "Stub docstring for function."
+
+        assert server.requests == 5
+        assert server.connections == 1
+
+
+def test_http_backend_retryable_errors():
+    with StubCompletionServer(throttle_rate=1.0, retry_after=2) as server:
+        with HTTPBackend(server.url) as backend:
+            with pytest.raises(RetryableError) as error:
+                backend.complete("model", ["a"], PARAMETERS)
+    assert error.value.retry_after == 2
+
+    with StubCompletionServer(error_rate=1.0) as server:
+        with HTTPBackend(server.url) as backend:
+            with pytest.raises(RetryableError) as error:
+                backend.complete("model", ["a"], PARAMETERS)
+    assert error.value.retry_after is None
+
+    # Nothing listens on the port of the closed server
+    with HTTPBackend(server.url) as backend:
+        with pytest.raises(RetryableError, match="Lost the connection"):
+            backend.complete("model", ["a"], PARAMETERS)
+
+    # The server answers after the timeout
+    with StubCompletionServer(latency=1.0) as server:
+        with HTTPBackend(server.url, timeout=0.1) as backend:
+            with pytest.raises(RetryableError, match="within 0.1 seconds"):
+                backend.complete("model", ["a"], PARAMETERS)
+
+
+def test_http_backend_other_errors():
+    with StubCompletionServer() as server:
+        with HTTPBackend(server.url + "/missing") as backend:
+            with pytest.raises(CompletionError, match="answered 404"):
+                backend.complete("model", ["a"], PARAMETERS)
+
+
+def test_http_backend_missing_completions(mocker):
+    with HTTPBackend("http://localhost") as backend:
+        response = mocker.MagicMock(status_code=200)
+        post = mocker.patch.object(backend._session, "post", return_value=response)
+        # The server only completed the first prompt of the batch
+        response.json.return_value = {"choices": [{"index": 0, "text": "a"}]}
+        with pytest.raises(CompletionError, match="http://localhost answered 1"):
+            backend.complete("model", ["a", "b"], PARAMETERS)
+    post.assert_called_once()
+
+
+def test_make_backend():
+    assert isinstance(make_backend("key"), OpenAIBackend)
+    with make_backend(api_base="http://localhost", pool_size=2) as backend:
+        assert isinstance(backend, HTTPBackend)
+        assert backend.base_url == "http://localhost"
@@ -0,0 +1,75 @@
+import tempfile
+import time
+
+from autodocstrings.cache import DocstringCache
+
+
+def test_cache_stores_and_returns_docstrings():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        key = DocstringCache.make_key(code_block="def foo(): pass", block_name="foo")
+
+        with DocstringCache(cache_dir) as cache:
+            assert cache.get(key) is None
+            cache.set(key, "Test docstring")
+            assert cache.get(key) == "Test docstring"
+
+        # The docstring persists across runs
+        with DocstringCache(cache_dir) as cache:
+            assert cache.get(key) == "Test docstring"
+
+
+def test_cache_contains_does_not_mark_docstrings_as_used(mocker):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = DocstringCache(cache_dir, max_entries=1)
+        cache.set("old", "Old docstring")
+        mocker.patch("time.time", return_value=time.time() + 1)
+        cache.set("new", "New docstring")
+        assert cache.contains("old")
+        assert not cache.contains("missing")
+        cache.close(evict=False)
+
+        with DocstringCache(cache_dir, max_entries=1) as cache:
+            # The old docstring was kept by the last close, but is still the least recently used
+            assert cache.contains("old")
+            cache.evict()
+            assert not cache.contains("old")
+            assert cache.contains("new")
+
+
+def test_cache_key_depends_on_every_field():
+    key = DocstringCache.make_key(engine="a", code_block="pass")
+    assert key == DocstringCache.make_key(code_block="pass", engine="a")
+    assert key != DocstringCache.make_key(engine="b", code_block="pass")
+
+
+def test_cache_expires_old_docstrings(mocker):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with DocstringCache(cache_dir, max_age=60) as cache:
+            cache.set("key", "Test docstring")
+
+            # Move two minutes into the future
+            now = time.time()
+            mocker.patch("time.time", return_value=now + 120)
+            assert cache.get("key") is None
+
+            cache.evict()
+            count = cache._connection.execute("SELECT COUNT(*) FROM docstrings")
+            assert count.fetchone()[0] == 0
+
+
+def test_cache_evicts_least_recently_used_docstrings(mocker):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        clock = mocker.patch("time.time", return_value=1000.0)
+        with DocstringCache(cache_dir, max_entries=2) as cache:
+            for index, key in enumerate(["a", "b", "c"]):
+                clock.return_value = 1000.0 + index
+                cache.set(key, key)
+
+            # Use the oldest entry so that "b" becomes the least recently used
+            clock.return_value = 1010.0
+            assert cache.get("a") == "a"
+
+        with DocstringCache(cache_dir, max_entries=2) as cache:
+            assert cache.get("a") == "a"
+            assert cache.get("b") is None
+            assert cache.get("c") == "c"
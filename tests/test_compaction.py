@@ -0,0 +1,101 @@
+import ast
+
+from autodocstrings.compaction import compact_code
+from autodocstrings.ratelimit import estimate_tokens
+from autodocstrings.prompts import MAX_PROMPT_TOKENS, build_prompt, cache_key
+
+CODE = """@decorator
+def foo(a: int, b: str = "x") -> int:
+    def helper(x):
+        y = x * 2
+        return y
+    text = "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa"
+    table = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]
+    mapping = {1: 2, 3: 4, 5: 6, 7: 8, 9: 10, 11: 12, 13: 14, 15: 16, 17: 18}
+    for i in range(a):
+        print(i)
+        if i > 3:
+            raise ValueError("bad")
+    while True:
+        b += "x"
+    try:
+        pass
+    except KeyError:
+        return 0
+    result = helper(a)
+    return result"""
+
+
+def test_compact_code_keeps_small_functions():
+    assert compact_code(CODE, 1000) == CODE
+
+
+def test_compact_code_elides_nested_bodies_and_long_literals():
+    compacted = compact_code(CODE, estimate_tokens(CODE) - 1)
+
+    assert "def helper(x):\n        ..." in compacted
+    assert "'" + "a" * 40 + "...'" in compacted
+    assert "[1, 2, 3, 4, 5, 6, 7, 8, ...]" in compacted
+    assert "(15): 16, **...}" in compacted
+    # The control flow is still there
+    assert "print(i)" in compacted
+    ast.parse(compacted)
+
+
+def test_compact_code_keeps_exits_and_control_flow():
+    compacted = compact_code(CODE, 110)
+
+    assert compacted.startswith("@decorator\ndef foo(a: int, b: str='x') ->int:")
+    assert "raise ValueError('bad')" in compacted
+    assert "return 0" in compacted
+    assert "return result" in compacted
+    assert "while True:\n        ...\n" in compacted
+    for elided in ("print(i)", "helper(a)", "table ="):
+        assert elided not in compacted
+    assert estimate_tokens(compacted) <= 110
+    ast.parse(compacted)
+
+    # Then only the path to the exits is kept
+    compacted = compact_code(CODE, 60)
+    assert "while True" not in compacted
+    assert "return result" in compacted
+
+
+def test_compact_code_keeps_the_signature_at_least():
+    assert compact_code(CODE, 1) == (
+        "@decorator\ndef foo(a: int, b: str='x') ->int:\n    ..."
+    )
+
+
+def test_compact_code_renders_the_syntax_unknown_to_astor(mocker):
+    # astor has no handler for the syntax added after it, such as match statements
+    mocker.patch(
+        "astor.to_source",
+        side_effect=AttributeError("No defined handler for node of type Match"),
+    )
+
+    assert compact_code(CODE, 1) == (
+        "@decorator\ndef foo(a: int, b: str='x') -> int:\n    ..."
+    )
+
+
+def test_compact_code_ignores_invalid_code():
+    code = "def foo(:\n" + "    pass\n" * 100
+    assert compact_code(code, 10) == code
+    code = "x = 1\n" * 100
+    assert compact_code(code, 10) == code
+
+
+def test_build_prompt_compacts_large_functions():
+    lines = "".join(f"    value_{i} = compute({i})\n" for i in range(2000))
+    code_block = f"def foo(a):\n{lines}    return a"
+
+    prompt = build_prompt(code_block, "foo")
+    assert estimate_tokens(prompt) <= MAX_PROMPT_TOKENS
+    assert "def foo(a):\n    ...\n    return a" in prompt
+
+    # Functions which are compacted the same way share their cache entry
+    other_lines = lines.replace("compute", "evaluate")
+    assert cache_key(code_block, "foo") == cache_key(
+        f"def foo(a):\n{other_lines}    return a", "foo"
+    )
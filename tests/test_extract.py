@@ -0,0 +1,18 @@
+from autodocstrings.extract import find_candidates, may_have_candidates
+
+
+def test_may_have_candidates():
+    assert may_have_candidates("def foo():\n    pass\n", False)
+    assert may_have_candidates("class Foo:\n\tdef  bar(self): pass\n", False)
+    assert not may_have_candidates("x = 1\nasync def foo():\n    pass\n", False)
+    assert may_have_candidates("class Foo:\n    def __init__(self): pass\n", False)
+    assert not may_have_candidates("class Foo:\n    def __init__(self): pass\n", True)
+    # Definitions in strings are only ruled out by parsing
+    assert may_have_candidates('x = """\ndef foo():\n"""\n', False)
+
+
+def test_find_candidates_skips_sources_without_functions():
+    timings = {}
+    # The source is not even parsed
+    assert find_candidates("x = (\n", False, False, timings) == []
+    assert list(timings) == ["scan"]
@@ -0,0 +1,138 @@
+import os
+import pytest
+import subprocess
+import tempfile
+
+from autodocstrings.gitdiff import (
+    GitChanges,
+    GitDiffError,
+    git_changes,
+    parse_diff,
+    unquote_path,
+)
+
+DIFF = """diff --git a/pkg/a.py b/pkg/a.py
+index 1111111..2222222 100644
+--- a/pkg/a.py
++++ b/pkg/a.py
+@@ -3 +3 @@ def foo():
+-    return 1
++    return 2
+@@ -10,0 +11,3 @@ def bar():
++def baz():
++    pass
++
+@@ -20,2 +22,0 @@ def qux():
+-    a = 1
+-    b = 2
+diff --git a/old.py b/old.py
+deleted file mode 100644
+--- a/old.py
++++ /dev/null
+@@ -1,2 +0,0 @@
+-def old():
+-    pass
+"""
+
+
+def git(directory, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=directory,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def test_parse_diff():
+    files = parse_diff(DIFF, "/repo")
+
+    # Removed lines touch the lines around them, and deleted files are left out
+    assert files == {os.path.join("/repo", "pkg/a.py"): [(3, 3), (11, 13), (22, 23)]}
+
+
+def test_parse_diff_decodes_quoted_paths():
+    diff = (
+        "+++ b/my file.py\t\n"
+        "@@ -1 +1 @@\n"
+        '+++ "b/q\\"\\303\\251\\t.py"\n'
+        "@@ -2 +2 @@\n"
+    )
+
+    assert parse_diff(diff, "/repo") == {
+        os.path.join("/repo", "my file.py"): [(1, 1)],
+        os.path.join("/repo", 'q"\u00e9\t.py'): [(2, 2)],
+    }
+    assert unquote_path("plain.py") == "plain.py"
+    assert unquote_path('"\\a\\\\\\x"') == "\a\\x"
+
+
+def test_git_changes_tracks_changed_and_untracked_files():
+    with tempfile.TemporaryDirectory() as test_dir:
+        test_dir = os.path.realpath(test_dir)
+        git(test_dir, "init", "-q")
+        changed_file = os.path.join(test_dir, "changed.py")
+        unchanged_file = os.path.join(test_dir, "unchanged.py")
+        for file in (changed_file, unchanged_file):
+            with open(file, "w") as f:
+                f.write("def foo():\n    pass\n\n\ndef bar():\n    pass\n")
+        git(test_dir, "add", ".")
+        git(test_dir, "commit", "-q", "-m", "initial")
+
+        with open(changed_file, "w") as f:
+            f.write("def foo():\n    pass\n\n\ndef bar():\n    return 1\n")
+        untracked_file = os.path.join(test_dir, "untracked.py")
+        open(untracked_file, "w").close()
+
+        changes = git_changes("HEAD", changed_file)
+
+        assert changes.is_changed(changed_file)
+        assert changes.changed_lines(changed_file) == [(6, 6)]
+        assert not changes.is_changed(unchanged_file)
+        assert changes.is_changed(untracked_file)
+        assert changes.changed_lines(untracked_file) is None
+
+
+def test_git_changes_with_special_characters():
+    with tempfile.TemporaryDirectory() as test_dir:
+        test_dir = os.path.realpath(test_dir)
+        git(test_dir, "init", "-q")
+        changed_files = [
+            os.path.join(test_dir, name) for name in ("my file.py", 'q"\u00e9.py')
+        ]
+        for file in changed_files:
+            with open(file, "w") as f:
+                f.write("def foo():\n    pass\n")
+        git(test_dir, "add", ".")
+        git(test_dir, "commit", "-q", "-m", "initial")
+        for file in changed_files:
+            with open(file, "w") as f:
+                f.write("def foo():\n    return 1\n")
+        untracked_file = os.path.join(test_dir, "new\tfile \u00fc.py")
+        open(untracked_file, "w").close()
+
+        changes = git_changes("HEAD", test_dir)
+
+        for file in changed_files:
+            assert changes.changed_lines(file) == [(2, 2)]
+        assert changes.is_changed(untracked_file)
+
+
+def test_git_changes_errors(mocker):
+    with tempfile.TemporaryDirectory() as test_dir:
+        git(test_dir, "init", "-q")
+
+        with pytest.raises(GitDiffError):
+            git_changes("no-such-ref", test_dir)
+
+        mocker.patch("subprocess.run", side_effect=FileNotFoundError)
+        with pytest.raises(GitDiffError, match="git is not installed"):
+            git_changes("HEAD", test_dir)
+
+
+def test_git_changes_resolves_paths():
+    changes = GitChanges({"a/../b.py": None})
+
+    assert changes.is_changed("b.py")
+    assert changes.changed_lines(os.path.abspath("b.py")) is None
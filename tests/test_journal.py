@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import pytest
+
+from autodocstrings.journal import Journal
+
+SETTINGS = {"replace_existing_docstrings": False}
+
+
+def test_journal_replays_entries_with_the_same_settings():
+    with tempfile.TemporaryDirectory() as test_dir:
+        path = os.path.join(test_dir, "journal.jsonl")
+
+        journal = Journal(path, SETTINGS, resume=False)
+        journal.append("a.py", "Foo.bar", "def bar(self):\n    pass", "Docstring")
+        # The appended entries are written, not kept in memory
+        assert journal.get("a.py", "Foo.bar", "def bar(self):\n    pass") is None
+        journal.close()
+        # Entries appended once the journal is closed are not written
+        journal.append("a.py", "baz", "def baz():\n    pass", "Docstring")
+
+        with open(path) as f:
+            lines = f.read().splitlines()
+        assert json.loads(lines[0]) == {"settings": SETTINGS}
+        assert json.loads(lines[1])["file"] == os.path.abspath("a.py")
+        assert len(lines) == 2
+
+        journal = Journal(path, SETTINGS, resume=True)
+        assert len(journal) == 1
+        assert journal.get("a.py", "Foo.bar", "def bar(self):\n    pass") == (
+            "Docstring"
+        )
+        # The function changed since it was documented
+        assert journal.get("a.py", "Foo.bar", "def bar(self):\n    return 1") is None
+        journal.close()
+
+        # Other settings or a fresh run start a new journal
+        assert len(Journal(path, {}, resume=True)) == 0
+        journal = Journal(path, SETTINGS, resume=True)
+        assert len(journal) == 0
+        journal.discard()
+        assert not os.path.exists(path)
+
+
+def test_journal_skips_torn_entries():
+    with tempfile.TemporaryDirectory() as test_dir:
+        path = os.path.join(test_dir, "journal.jsonl")
+        journal = Journal(path, SETTINGS, resume=False)
+        journal.append("a.py", "foo", "def foo():\n    pass", "Docstring")
+        journal.close()
+        # The run died while writing an entry
+        with open(path, "a") as f:
+            f.write('{"file": "a.py", "func')
+
+        journal = Journal(path, SETTINGS, resume=True)
+        assert len(journal) == 1
+        journal.append("a.py", "bar", "def bar():\n    pass", "Docstring")
+        journal.close()
+        assert len(Journal(path, SETTINGS, resume=True)) == 2
+
+        # A journal without a valid header is not replayed
+        with open(path, "w") as f:
+            f.write('{"sett')
+        assert len(Journal(path, SETTINGS, resume=True)) == 0
+
+
+def test_journal_is_created_exclusively():
+    with tempfile.TemporaryDirectory() as test_dir:
+        path = os.path.join(test_dir, "journal.jsonl")
+        first = Journal(path, SETTINGS, resume=False)
+
+        # Another run cannot truncate the journal in use
+        with pytest.raises(FileExistsError):
+            Journal(path, SETTINGS, resume=False)
+
+        # The journal removed by another run is discarded anyway
+        os.remove(path)
+        first.discard()
+        assert not os.path.exists(path)
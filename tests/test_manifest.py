@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+from autodocstrings.manifest import Manifest
+
+
+def create_test_file(directory: str, contents: str) -> str:
+    file = os.path.join(directory, "test_file.py")
+    with open(file, "w") as f:
+        f.write(contents)
+    return file
+
+
+def test_manifest_detects_unchanged_files():
+    with tempfile.TemporaryDirectory() as test_dir:
+        manifest_path = os.path.join(test_dir, "manifest.json")
+        file = create_test_file(test_dir, "def foo():\n    pass\n")
+
+        manifest = Manifest(manifest_path, {"setting": 1})
+        assert not manifest.is_unchanged(file)
+        manifest.record(file)
+        manifest.save()
+
+        # The recorded state is reloaded by the next run
+        manifest = Manifest(manifest_path, {"setting": 1})
+        assert manifest.is_unchanged(file)
+
+        # The manifest is discarded when the settings change
+        assert not Manifest(manifest_path, {"setting": 2}).is_unchanged(file)
+
+
+def test_manifest_detects_changed_files():
+    with tempfile.TemporaryDirectory() as test_dir:
+        manifest = Manifest(os.path.join(test_dir, "manifest.json"), {})
+        file = create_test_file(test_dir, "def foo():\n    pass\n")
+        manifest.record(file)
+
+        # Same size, different contents and modification time
+        create_test_file(test_dir, "def bar():\n    pass\n")
+        os.utime(file, ns=(0, 0))
+        assert not manifest.is_unchanged(file)
+
+        # Different size
+        create_test_file(test_dir, "def foo():\n    return 1\n")
+        assert not manifest.is_unchanged(file)
+
+
+def test_manifest_ignores_touched_files(mocker):
+    with tempfile.TemporaryDirectory() as test_dir:
+        manifest = Manifest(os.path.join(test_dir, "manifest.json"), {})
+        file = create_test_file(test_dir, "def foo():\n    pass\n")
+        manifest.record(file)
+
+        # Only the modification time changes
+        os.utime(file, ns=(0, 0))
+        assert manifest.is_unchanged(file)
+
+        # The new modification time is recorded so the file is not read again
+        hash_file = mocker.patch("autodocstrings.manifest._hash_file")
+        assert manifest.is_unchanged(file)
+        hash_file.assert_not_called()
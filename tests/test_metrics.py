@@ -0,0 +1,116 @@
+import cProfile
+import json
+import os
+import pstats
+import tempfile
+import threading
+
+import autodocstrings.metrics
+
+from autodocstrings.metrics import Metrics, profile
+
+
+def test_metrics_timers_and_counters(mocker):
+    metrics = Metrics()
+    with metrics.timer("parse"):
+        pass
+    metrics.add_time("parse", 2.0)
+    assert list(metrics.timed_iter("walk", ["a.py", "b.py"])) == ["a.py", "b.py"]
+    metrics.increment("retries")
+    metrics.increment("retry_delay_seconds", 1.5)
+    metrics.record_file("a.py", 3.0, 2)
+
+    data = metrics.to_dict()
+    assert data["phases"]["parse"]["count"] == 2
+    assert data["phases"]["parse"]["seconds"] >= 2.0
+    # The end of the iteration is timed too
+    assert data["phases"]["walk"]["count"] == 3
+    assert data["counters"] == {"retries": 1, "retry_delay_seconds": 1.5}
+    assert data["files"] == {"a.py": {"seconds": 3.0, "functions": 2}}
+    assert "cache_hit_rate" not in data
+
+
+def test_metrics_histograms_and_cache_hit_rate():
+    metrics = Metrics()
+    for latency in [0.05, 0.3, 0.4, 120]:
+        metrics.observe("api_latency_seconds", latency)
+    metrics.increment("cache_hits", 3)
+    metrics.increment("cache_misses")
+
+    data = metrics.to_dict()
+    histogram = data["histograms"]["api_latency_seconds"]
+    assert histogram["buckets"]["0.1"] == 1
+    assert histogram["buckets"]["0.5"] == 3
+    assert histogram["buckets"]["60"] == 3
+    assert histogram["buckets"]["+Inf"] == 4
+    assert histogram["count"] == 4
+    assert data["cache_hit_rate"] == 0.75
+
+
+def test_metrics_prometheus_format():
+    metrics = Metrics()
+    metrics.add_time("parse", 0.5)
+    metrics.increment("api_requests", 2)
+    metrics.increment("cache_hits")
+    metrics.observe("api_latency_seconds", 0.2)
+    metrics.record_file('dir/"quoted".py', 1.0, 3)
+
+    text = metrics.to_prometheus()
+    assert 'autodocstrings_phase_seconds_total{phase="parse"} 0.5' in text
+    assert 'autodocstrings_phase_calls_total{phase="parse"} 1' in text
+    assert "autodocstrings_api_requests_total 2" in text
+    assert "autodocstrings_cache_hit_rate 1.0" in text
+    assert 'autodocstrings_api_latency_seconds_bucket{le="0.25"} 1' in text
+    assert 'autodocstrings_api_latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "autodocstrings_api_latency_seconds_count 1" in text
+    assert 'autodocstrings_file_functions{file="dir/\\"quoted\\".py"} 3' in text
+
+
+def test_metrics_write():
+    metrics = Metrics()
+    metrics.increment("api_requests")
+    with tempfile.TemporaryDirectory() as test_dir:
+        json_path = os.path.join(test_dir, "metrics.json")
+        prometheus_path = os.path.join(test_dir, "metrics.prom")
+        metrics.write(json_path)
+        metrics.write(prometheus_path)
+
+        with open(json_path, "r") as f:
+            assert json.load(f)["counters"] == {"api_requests": 1}
+        with open(prometheus_path, "r") as f:
+            assert "autodocstrings_api_requests_total 1" in f.read()
+
+
+def work_in_thread():
+    return sum(range(1000))
+
+
+def test_profile_includes_threads():
+    with tempfile.TemporaryDirectory() as test_dir:
+        path = os.path.join(test_dir, "profile.out")
+        with profile(path):
+            thread = threading.Thread(target=work_in_thread)
+            thread.start()
+            thread.join()
+
+        functions = [function for _, _, function in pstats.Stats(path).stats]
+        assert "work_in_thread" in functions
+
+
+def test_profile_skips_threads_seen_by_the_main_profiler(mocker):
+    # Only one profiler can be enabled at a time since Python 3.12
+    thread_profiler = mocker.MagicMock()
+    thread_profiler.enable.side_effect = ValueError
+    mocker.patch.object(
+        autodocstrings.metrics.cProfile,
+        "Profile",
+        side_effect=[cProfile.Profile(), thread_profiler],
+    )
+
+    with tempfile.TemporaryDirectory() as test_dir:
+        path = os.path.join(test_dir, "profile.out")
+        with profile(path):
+            thread = threading.Thread(target=work_in_thread)
+            thread.start()
+            thread.join()
+        assert os.path.exists(path)
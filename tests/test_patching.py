@@ -0,0 +1,165 @@
+import ast
+
+from autodocstrings.patching import (
+    Edit,
+    apply_edits,
+    function_source,
+    has_docstring,
+    line_offsets,
+    locate_docstring,
+    render_docstring,
+)
+
+
+def insert_docstrings(source: str, docstring: str = "Test docstring") -> str:
+    # Write the same docstring into every function of the source
+    offsets = line_offsets(source)
+    nodes = [n for n in ast.walk(ast.parse(source)) if isinstance(n, ast.FunctionDef)]
+    edits = [locate_docstring(source, offsets, n).edit(docstring) for n in nodes]
+    return apply_edits(source, edits)
+
+
+def docstrings(source: str) -> dict:
+    tree = ast.parse(source)
+    return {
+        node.name: ast.get_docstring(node)
+        for node in ast.walk(tree)
+        if isinstance(node, ast.FunctionDef)
+    }
+
+
+def test_insert_docstring_keeps_comments_and_formatting():
+    source = (
+        "# Header\n\n\ndef foo(a,b):  # Comment\n    # Body comment\n    return a+b\n"
+    )
+    assert insert_docstrings(source) == (
+        "# Header\n\n\ndef foo(a,b):  # Comment\n"
+        '    # Body comment\n    """\n    Test docstring\n    """\n    return a+b\n'
+    )
+
+
+def test_replace_docstring():
+    source = 'class A:\n    def foo(self):\n        """Old."""\n        return 1\n'
+    assert insert_docstrings(source) == (
+        'class A:\n    def foo(self):\n        """\n        Test docstring\n'
+        '        """\n        return 1\n'
+    )
+
+
+def test_insert_docstring_in_one_line_function():
+    source = "def foo(): pass\ndef bar(): '''Old.'''\n"
+    updated_source = insert_docstrings(source)
+    assert updated_source.startswith('def foo():\n    """\n')
+    assert docstrings(updated_source) == {
+        "foo": "Test docstring",
+        "bar": "Test docstring",
+    }
+
+
+def test_insert_docstring_before_decorated_and_nested_functions():
+    source = (
+        "def outer():\n"
+        "    @decorator\n"
+        "    def inner():\n"
+        "        def innermost(): pass\n"
+        "        return innermost\n"
+        "    return inner\n"
+    )
+    updated_source = insert_docstrings(source)
+    assert "    @decorator\n    def inner():" in updated_source
+    assert docstrings(updated_source) == {
+        "outer": "Test docstring",
+        "inner": "Test docstring",
+        "innermost": "Test docstring",
+    }
+
+
+def test_insert_docstring_after_non_ascii_characters():
+    source = "def héllo(): return 'é'\n"
+    assert docstrings(insert_docstrings(source)) == {"héllo": "Test docstring"}
+
+
+def test_insert_docstring_keeps_line_breaks():
+    source = "def foo():\r\n\treturn 1\r\n"
+    assert insert_docstrings(source) == (
+        'def foo():\r\n\t"""\r\n\tTest docstring\r\n\t"""\r\n\treturn 1\r\n'
+    )
+
+
+def test_insert_docstring_in_source_without_line_break():
+    assert docstrings(insert_docstrings("def foo(): pass")) == {"foo": "Test docstring"}
+
+
+def test_render_docstring():
+    # The indentation generated by the model is normalized
+    assert render_docstring("\nSummary.\n\n    Args:\n        x: X.\n", "    ") == (
+        '"""\n    Summary.\n\n        Args:\n            x: X.\n    """'
+    )
+    assert render_docstring("Summary.\n    Details.\n    ", "  ") == (
+        '"""\n  Summary.\n  Details.\n  """'
+    )
+    # Quotes and backslashes cannot end the string literal
+    literal = render_docstring('Returns """ or \\', "")
+    assert ast.literal_eval(literal).strip() == 'Returns """ or \\'
+
+
+def test_has_docstring():
+    tree = ast.parse("def foo():\n    'Doc.'\ndef bar():\n    1\n")
+    assert [has_docstring(node) for node in tree.body] == [True, False]
+
+
+def test_apply_edits():
+    edits = [Edit(4, 5, "B"), Edit(0, 0, ">"), Edit(8, 9, "")]
+    assert apply_edits("abc d efgh", edits) == ">abc B efh"
+
+
+def function_sources(source: str) -> dict:
+    offsets = line_offsets(source)
+    return {
+        node.name: function_source(source, offsets, node)
+        for node in ast.walk(ast.parse(source))
+        if isinstance(node, ast.FunctionDef)
+    }
+
+
+def test_function_source():
+    source = (
+        "class Foo:\r\n"
+        "    @property\r\n"
+        "    def bar(self):  # A comment\r\n"
+        '        """Existing docstring"""\r\n'
+        "\r\n"
+        "        def baz():\r\n"
+        "            return 1\r\n"
+        "        return baz()\r\n"
+        "\r\n"
+        "def qux():\r\n"
+        "    'Only a docstring'"
+    )
+
+    assert function_sources(source) == {
+        "bar": (
+            "@property\n"
+            "def bar(self):  # A comment\n"
+            "\n"
+            "    def baz():\n"
+            "        return 1\n"
+            "    return baz()"
+        ),
+        "baz": "def baz():\n    return 1",
+        "qux": "def qux():\n",
+    }
+
+
+def test_function_source_cannot_slice_every_function():
+    source = (
+        "def foo(): 'Docstring'\n"
+        "def bar():\n"
+        "    'Docstring'; return 1\n"
+        "class Foo:\n"
+        "    def baz(self):\n"
+        "        return '''\n"
+        "Multi-line string'''\n"
+    )
+
+    assert function_sources(source) == {"foo": None, "bar": None, "baz": None}
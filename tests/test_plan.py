@@ -0,0 +1,211 @@
+import os
+import tempfile
+
+from autodocstrings.cache import DocstringCache
+from autodocstrings.gitdiff import GitChanges
+from autodocstrings.manifest import Manifest
+from autodocstrings.plan import (
+    Plan,
+    estimate_duration,
+    format_duration,
+    make_plan,
+    print_plan,
+)
+from autodocstrings.prompts import build_prompt, cache_key, run_settings
+from autodocstrings.ratelimit import estimate_tokens
+from autodocstrings.routing import MODEL_ENGINE, SMALL_MODEL_ENGINE, route
+
+
+def create_test_file(directory: str, name: str, contents: str) -> str:
+    file = os.path.join(directory, name)
+    with open(file, "w") as f:
+        f.write(contents)
+    return file
+
+
+SOURCE = '''class Foo:
+    def __init__(self):
+        pass
+
+    def bar(self):
+        """Existing docstring"""
+        return 1
+
+
+def baz():
+    return 2
+'''
+
+# The maximum number of tokens of the docstrings of the functions of SOURCE
+COMPLETION_TOKENS = route("def baz():\n    return 2").max_tokens
+
+
+def test_make_plan_applies_skip_rules():
+    with tempfile.TemporaryDirectory() as test_dir:
+        file = create_test_file(test_dir, "a.py", SOURCE)
+
+        plan = make_plan([file], False, False)
+        assert plan.files == 1
+        assert plan.functions == 2
+        assert plan.requests == 2
+        assert plan.completion_tokens == 2 * COMPLETION_TOKENS
+        assert plan.prompt_tokens == estimate_tokens(
+            build_prompt("def __init__(self):\n    pass", "__init__")
+        ) + estimate_tokens(build_prompt("def baz():\n    return 2", "baz"))
+
+        assert make_plan([file], True, False).functions == 3
+        assert make_plan([file], True, True).functions == 2
+
+
+def test_make_plan_batches_requests():
+    with tempfile.TemporaryDirectory() as test_dir:
+        files = [
+            create_test_file(
+                test_dir,
+                f"{name}.py",
+                SOURCE.replace("self", f"self_{name}").replace("2", name),
+            )
+            for name in "abc"
+        ]
+
+        assert make_plan(files, True, False, batch_size=4).requests == 3
+        assert make_plan(files, True, False, batch_size=9).requests == 1
+        # Every function is bigger than half the token limit
+        assert (
+            make_plan(files, True, False, batch_size=9, max_batch_tokens=9).requests
+            == 9
+        )
+
+
+def test_make_plan_deduplicates_identical_functions():
+    with tempfile.TemporaryDirectory() as test_dir:
+        files = [create_test_file(test_dir, f"{name}.py", SOURCE) for name in "abc"]
+        # Indented copies of a function are identical once dedented
+        files.append(
+            create_test_file(
+                test_dir, "d.py", "class Foo:\n    def baz():\n        return 2\n"
+            )
+        )
+
+        plan = make_plan(files, True, False, batch_size=9)
+        assert plan.functions == 10
+        assert plan.duplicate_functions == 7
+        assert plan.requests == 1
+        assert plan.completion_tokens == 3 * COMPLETION_TOKENS
+
+
+def test_make_plan_routes_functions():
+    with tempfile.TemporaryDirectory() as test_dir:
+        complex_function = "def qux(a, b):\n" + "".join(
+            f"    if a > {i}:\n        b += {i}\n" for i in range(5)
+        )
+        file = create_test_file(
+            test_dir,
+            "a.py",
+            SOURCE
+            + "\n\n"
+            + complex_function
+            + "\n\nclass Bar:\n    def get(self):\n        return self._value\n",
+        )
+        assert route(complex_function).model == MODEL_ENGINE
+        assert route("def baz():\n    return 2").model == SMALL_MODEL_ENGINE
+
+        plan = make_plan([file], False, False, batch_size=9)
+        # The getter is documented from a template, and each model gets its own request
+        assert (plan.functions, plan.templated_functions) == (4, 1)
+        assert plan.requests == 2
+        assert (
+            plan.completion_tokens
+            == 2 * COMPLETION_TOKENS + route(complex_function).max_tokens
+        )
+
+
+def test_make_plan_counts_unparsable_files():
+    with tempfile.TemporaryDirectory() as test_dir:
+        files = [
+            create_test_file(test_dir, "a.py", SOURCE),
+            create_test_file(test_dir, "b.py", "def broken(:\n    pass\n"),
+        ]
+        with open(os.path.join(test_dir, "c.py"), "wb") as f:
+            f.write(b"def foo():\n    return '\xff'\n")
+        files.append(os.path.join(test_dir, "c.py"))
+
+        plan = make_plan(files, False, False)
+        assert (plan.files, plan.failed_files, plan.functions) == (3, 2, 2)
+
+
+def test_make_plan_with_jobs():
+    with tempfile.TemporaryDirectory() as test_dir:
+        files = [create_test_file(test_dir, f"{name}.py", SOURCE) for name in "abc"]
+
+        assert make_plan(files, False, False, jobs=2) == make_plan(files, False, False)
+
+
+def test_make_plan_skips_cached_functions_and_unchanged_files():
+    with tempfile.TemporaryDirectory() as test_dir:
+        file_1 = create_test_file(test_dir, "a.py", SOURCE)
+        file_2 = create_test_file(test_dir, "b.py", "def foo():\n    pass\n")
+        manifest = Manifest(
+            os.path.join(test_dir, "manifest.json"), run_settings(False, False)
+        )
+        manifest.record(file_2)
+
+        with DocstringCache(os.path.join(test_dir, "cache")) as cache:
+            cache.set(cache_key("def baz():\n    return 2", "baz"), "Test docstring")
+            plan = make_plan([file_1, file_2], False, False, cache, manifest)
+
+        assert plan == Plan(1, 1, 2, 1, 0, 1, plan.prompt_tokens, COMPLETION_TOKENS)
+
+
+def test_make_plan_with_changes():
+    with tempfile.TemporaryDirectory() as test_dir:
+        file_1 = create_test_file(test_dir, "a.py", SOURCE)
+        file_2 = create_test_file(test_dir, "b.py", SOURCE)
+        file_3 = create_test_file(
+            test_dir, "c.py", "@decorator\ndef foo():\n    pass\n"
+        )
+
+        # Only baz changed in the first file, the second did not change, the third is new
+        changes = GitChanges({file_1: [(11, 11)], file_3: None})
+        plan = make_plan([file_1, file_2, file_3], True, False, changes=changes)
+        assert (plan.files, plan.unchanged_files, plan.functions) == (2, 1, 2)
+
+        # A changed decorator changes its function
+        changes = GitChanges({file_3: [(1, 1)]})
+        assert make_plan([file_3], True, False, changes=changes).functions == 1
+        changes = GitChanges({file_3: [(4, 4)]})
+        assert make_plan([file_3], True, False, changes=changes).functions == 0
+
+
+def test_estimate_duration():
+    plan = Plan(10, 0, 100, 0, 0, 100, 40000, 15000)
+
+    assert estimate_duration(plan, latency=2) == 200
+    assert estimate_duration(plan, concurrency=8, latency=2) == 26
+    # The first minute of budget is available right away
+    assert estimate_duration(plan, 8, requests_per_minute=20, latency=2) == 240
+    assert estimate_duration(plan, 8, tokens_per_minute=5000, latency=2) == 600
+
+
+def test_format_duration():
+    assert format_duration(4.2) == "5s"
+    assert format_duration(125) == "2m 05s"
+    assert format_duration(3725) == "1h 02m 05s"
+
+
+def test_print_plan(capsys):
+    print_plan(Plan(10, 2, 100, 5, 0, 19, 40000, 14250), 125)
+
+    output = capsys.readouterr().out
+    assert (
+        "Files: 10 to parse, 2 unchanged since the last run, 0 failing to parse"
+        in output
+    )
+    assert (
+        "Functions: 100 to document, 5 already cached, 0 duplicates, 0 from templates"
+        in output
+    )
+    assert "Requests: 19" in output
+    assert "Prompt tokens: ~40000" in output
+    assert "Completion tokens: at most 14250" in output
+    assert "Expected wall time: ~2m 05s" in output
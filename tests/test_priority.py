@@ -0,0 +1,66 @@
+import os
+import tempfile
+
+from autodocstrings.extract import find_candidates
+from autodocstrings.priority import count_calls, is_public, prioritize
+
+
+def test_count_calls():
+    source = (
+        "def foo(x):\n"
+        "    return bar(x) + self.bar (x)\n"
+        "\n"
+        "async def baz():\n"
+        "    foo(1)\n"
+    )
+
+    assert count_calls(source) == {"bar": 2, "foo": 1}
+
+
+def test_is_public():
+    assert is_public("foo")
+    assert is_public("Foo.bar")
+    assert is_public("Foo.__init__")
+    assert not is_public("_foo")
+    assert not is_public("Foo._bar")
+    assert not is_public("_Foo.bar")
+    assert not is_public("foo.<locals>.inner")
+
+
+def test_prioritize():
+    with tempfile.TemporaryDirectory() as test_dir:
+        old_file = os.path.join(test_dir, "old.py")
+        new_file = os.path.join(test_dir, "new.py")
+        sources = {
+            old_file: (
+                "def _helper():\n"
+                "    pass\n"
+                "\n"
+                "def large():\n"
+                "    x = small()\n"
+                "    return x\n"
+            ),
+            new_file: "def small():\n    _helper()\n    _helper()\n",
+        }
+        for file, source in sources.items():
+            with open(file, "w") as f:
+                f.write(source)
+        os.utime(old_file, (0, 0))
+        functions = [
+            (file, candidate)
+            for file, source in sources.items()
+            for candidate in find_candidates(source, False, False)
+        ]
+
+        def names(priorities):
+            return [
+                candidate.name
+                for _, candidate in prioritize(functions, priorities, sources)
+            ]
+
+        assert names([]) == ["_helper", "large", "small"]
+        assert names(["public"]) == ["large", "small", "_helper"]
+        assert names(["calls"]) == ["_helper", "small", "large"]
+        assert names(["size"]) == ["large", "small", "_helper"]
+        assert names(["recent"]) == ["small", "_helper", "large"]
+        assert names(["public", "recent"]) == ["small", "large", "_helper"]
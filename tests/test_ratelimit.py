@@ -0,0 +1,109 @@
+import threading
+
+from autodocstrings.ratelimit import Budget, RateLimiter, estimate_tokens
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_rate_limiter_waits_for_the_request_budget(mocker):
+    mocker.patch("time.monotonic", return_value=100.0)
+    sleep = mocker.patch("time.sleep")
+    rate_limiter = RateLimiter(requests_per_minute=2, max_concurrency=3)
+    rate_limiter._requests.updated_at = 100.0
+
+    # The first two requests fit in the budget of the minute
+    for _ in range(2):
+        rate_limiter.acquire(10)
+    sleep.assert_not_called()
+
+    # The third one waits until the budget is replenished
+    rate_limiter.acquire(10)
+    sleep.assert_called_once_with(30.0)
+
+
+def test_rate_limiter_waits_for_the_token_budget(mocker):
+    mocker.patch("time.monotonic", return_value=100.0)
+    sleep = mocker.patch("time.sleep")
+    rate_limiter = RateLimiter(tokens_per_minute=600)
+    rate_limiter._tokens.updated_at = 100.0
+
+    rate_limiter.acquire(500)
+    rate_limiter.release(True)
+    sleep.assert_not_called()
+
+    rate_limiter.acquire(200)
+    sleep.assert_called_once_with(10.0)
+
+
+def test_rate_limiter_backs_off_when_throttled(mocker):
+    mocker.patch("time.monotonic", return_value=100.0)
+    sleep = mocker.patch("time.sleep")
+    mocker.patch("random.uniform", return_value=0.0)
+    rate_limiter = RateLimiter(max_concurrency=8, base_delay=1.0, max_delay=10.0)
+
+    # The backoff grows exponentially up to the maximum delay
+    assert rate_limiter.throttle(0) == 0.5
+    assert rate_limiter.throttle(3) == 4.0
+    assert rate_limiter.throttle(10) == 5.0
+    # The delay requested by the server is honored
+    assert rate_limiter.throttle(0, retry_after=20.0) == 20.0
+
+    # The concurrency is halved once per burst of throttled requests
+    assert rate_limiter.concurrency == 4.0
+
+    # The next request waits for the end of the longest delay
+    rate_limiter.acquire(10)
+    sleep.assert_called_once_with(20.0)
+
+
+def test_rate_limiter_adapts_concurrency(mocker):
+    mocker.patch("time.sleep")
+    rate_limiter = RateLimiter(max_concurrency=2)
+    rate_limiter.throttle(0, retry_after=0.0)
+    assert rate_limiter.concurrency == 1.0
+
+    # A second request waits for the first one to complete
+    rate_limiter.acquire(10)
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (rate_limiter.acquire(10), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.1)
+    rate_limiter.release(True)
+    assert acquired.wait(5)
+    thread.join()
+
+    # Successful requests let the concurrency grow back up to its maximum
+    assert rate_limiter.concurrency == 2.0
+    rate_limiter.release(True)
+    assert rate_limiter.concurrency == 2.0
+
+
+def test_budget_limits_the_requests():
+    budget = Budget(max_requests=2)
+
+    assert budget.reserve([10, 20]) == 2
+    assert budget.reserve([10]) == 1
+    assert not budget.exhausted
+    assert budget.reserve([10]) == 0
+    assert budget.exhausted
+    assert (budget.requests, budget.tokens) == (2, 40)
+
+
+def test_budget_limits_the_tokens():
+    budget = Budget(max_tokens=100)
+
+    # Only the prompts which fit are sent, and the budget is then exhausted
+    assert budget.reserve([40, 50, 20]) == 2
+    assert budget.exhausted
+    # A later prompt small enough to fit is not sent either, to keep the order
+    assert budget.reserve([5]) == 0
+    assert (budget.requests, budget.tokens) == (1, 90)
+
+    # A request none of whose prompts fits is not counted
+    budget = Budget(max_tokens=10)
+    assert budget.reserve([20]) == 0
+    assert (budget.requests, budget.tokens) == (0, 0)
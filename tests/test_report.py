@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+
+from autodocstrings.metrics import Metrics
+from autodocstrings.report import (
+    RunReport,
+    merge_reports,
+    missing_shards,
+    print_report,
+)
+from autodocstrings.walker import Shard
+
+
+def test_run_report():
+    metrics = Metrics()
+    metrics.increment("api_requests", 2)
+    report = RunReport(Shard(1, 2))
+    report.record("b.py", "modified", documented=2, undocumented=1)
+    report.record("a.py", "failed", error="invalid syntax")
+    report.record("c.py", "skipped")
+
+    with tempfile.TemporaryDirectory() as test_dir:
+        path = os.path.join(test_dir, "report.json")
+        report.write(path, metrics)
+        with open(path) as f:
+            written = json.load(f)
+
+    assert written["shards"] == ["1/2"]
+    assert written["counters"] == {"api_requests": 2}
+    assert written["files"] == {
+        "a.py": {"status": "failed", "error": "invalid syntax"},
+        "b.py": {"status": "modified", "documented": 2, "undocumented": 1},
+        "c.py": {"status": "skipped"},
+    }
+    assert RunReport().to_dict(metrics)["shards"] == []
+
+
+def test_merge_reports():
+    reports = [
+        {
+            "shards": ["1/3"],
+            "run_seconds": 10.0,
+            "counters": {"api_requests": 2, "cache_hits": 1},
+            "files": {"b.py": {"status": "modified", "documented": 2}},
+        },
+        {
+            "shards": ["3/3"],
+            "run_seconds": 12.0,
+            "counters": {"api_requests": 3},
+            "files": {"a.py": {"status": "untouched"}},
+        },
+    ]
+
+    merged = merge_reports(reports)
+    assert merged == {
+        "shards": ["1/3", "3/3"],
+        "run_seconds": 12.0,
+        "counters": {"api_requests": 5, "cache_hits": 1},
+        "files": {
+            "a.py": {"status": "untouched"},
+            "b.py": {"status": "modified", "documented": 2},
+        },
+    }
+    assert missing_shards(merged) == ["2/3"]
+
+    # A merged report can be merged again
+    assert merge_reports([merged]) == merged
+    assert missing_shards(merge_reports([])) == []
+
+
+def test_print_report(capsys):
+    print_report(
+        {
+            "shards": ["1/2"],
+            "run_seconds": 3.0,
+            "counters": {},
+            "files": {
+                "a.py": {"status": "modified", "documented": 1},
+                "b.py": {"status": "failed", "error": "invalid syntax"},
+            },
+        }
+    )
+
+    output = capsys.readouterr().out
+    assert (
+        "Files: 1 modified, 0 untouched, 0 skipped, 1 failed, in 3.0 seconds" in output
+    )
+    assert "Failed b.py: invalid syntax" in output
+    assert "Missing shards: 2/2" in output
@@ -0,0 +1,86 @@
+import ast
+import textwrap
+
+from autodocstrings.routing import (
+    MAX_COMPLETION_TOKENS,
+    MIN_COMPLETION_TOKENS,
+    MODEL_ENGINE,
+    SMALL_MODEL_ENGINE,
+    SPECIAL_METHOD_DOCSTRINGS,
+    Route,
+    complexity,
+    route,
+    template_docstring,
+)
+
+
+def parse_function(code_block):
+    return ast.parse(textwrap.dedent(code_block)).body[0]
+
+
+def test_complexity():
+    assert complexity(parse_function("def foo():\n    pass\n")) == 1
+    # The instance is not counted among the arguments
+    assert complexity(parse_function("def foo(self, a, *b, c, **d):\n    pass\n")) == 5
+    # Every branch counts twice as much as a statement
+    code_block = (
+        "async def foo(a):\n"
+        "    if a and a > 1:\n"
+        "        return [b for b in a]\n"
+        "    return 0\n"
+    )
+    assert complexity(parse_function(code_block)) == 3 + 1 + 2 * 3
+
+
+def test_template_docstring():
+    getter = "@property\ndef full_name(self):\n    return self._full_name\n"
+    assert template_docstring(parse_function(getter)) == (
+        "Get the full name.\n\nReturns:\n    The full name."
+    )
+    setter = "def set_name(self, name):\n    self.name = name\n"
+    assert template_docstring(parse_function(setter)) == (
+        "Set the name.\n\nArgs:\n    name: The new name."
+    )
+    special = "def __len__(self):\n    return len(self.items)\n"
+    assert (
+        template_docstring(parse_function(special))
+        == SPECIAL_METHOD_DOCSTRINGS["__len__"]
+    )
+
+    # The functions doing more than that are sent to a model
+    for code_block in [
+        "def name(self):\n    return self.compute()\n",
+        "def name(self):\n    print(self)\n",
+        "def name(self, a):\n    return self.a\n",
+        "def set_name(self, name):\n    self.name = name.strip()\n",
+        "def set_name(self, name):\n    self.name = self.other = name\n",
+        "def set_name(self, name):\n    name.value = name\n",
+        "def set_name(self, name):\n    self.name += name\n",
+        "def __eq__(self, other):\n" + "    if other:\n        pass\n" * 3,
+        "def __init__(self):\n    pass\n",
+        # Constructors and other special methods are not accessors
+        "def __init__(self, x):\n    self._x = x\n",
+        "def __set_name__(self, name):\n    self.name = name\n",
+        "def __index__(self):\n    return self.value\n",
+    ]:
+        assert template_docstring(parse_function(code_block)) is None
+
+
+def test_route():
+    assert route("    def foo(self):\n        return self.foo\n") == Route(
+        None, 0, "Get the foo.\n\nReturns:\n    The foo."
+    )
+
+    # The completions grow with the complexity of the functions
+    simple = route("def foo():\n    pass\n")
+    assert simple.model == SMALL_MODEL_ENGINE
+    assert simple.max_tokens > MIN_COMPLETION_TOKENS
+    larger = route("def foo(a, b):\n    if a:\n        return b\n    return a\n")
+    assert larger.model == SMALL_MODEL_ENGINE
+    assert larger.max_tokens > simple.max_tokens
+    code_block = "def foo(a):\n" + "    if a:\n        a += 1\n" * 50
+    assert route(code_block) == Route(MODEL_ENGINE, MAX_COMPLETION_TOKENS)
+
+    # The code blocks which cannot be analyzed go to the largest model
+    assert route("def foo(:\n    pass\n") == Route(MODEL_ENGINE, MAX_COMPLETION_TOKENS)
+    assert route("foo = 1\n") == Route(MODEL_ENGINE, MAX_COMPLETION_TOKENS)
@@ -0,0 +1,209 @@
+import threading
+import time
+import pytest
+
+from autodocstrings.scheduler import DocstringScheduler
+
+
+def describe(requests):
+    return [f"{name}: {code}" for code, name in requests]
+
+
+def test_scheduler_returns_generated_docstrings():
+    with DocstringScheduler(describe, 2) as scheduler:
+        futures = [scheduler.submit("pass", name) for name in ["foo", "bar"]]
+        assert [future.result() for future in futures] == ["foo: pass", "bar: pass"]
+
+
+def test_scheduler_runs_requests_concurrently():
+    # Every request waits until all of them are in flight together
+    barrier = threading.Barrier(3, timeout=5)
+
+    def generate(requests):
+        barrier.wait()
+        return describe(requests)
+
+    with DocstringScheduler(generate, 3) as scheduler:
+        futures = [scheduler.submit("pass", name) for name in ["a", "b", "c"]]
+        assert [future.result() for future in futures] == [
+            "a: pass",
+            "b: pass",
+            "c: pass",
+        ]
+
+
+def test_scheduler_groups_requests_into_batches():
+    batches = []
+
+    def generate(requests):
+        batches.append([name for _, name in requests])
+        return describe(requests)
+
+    with DocstringScheduler(generate, 1, batch_size=2, linger=60) as scheduler:
+        futures = [scheduler.submit("pass", name) for name in ["a", "b", "c"]]
+    assert [future.result() for future in futures] == [
+        "a: pass",
+        "b: pass",
+        "c: pass",
+    ]
+
+    # The last batch is sent without waiting for the linger delay on shutdown
+    assert batches == [["a", "b"], ["c"]]
+
+
+def test_scheduler_waits_to_fill_batches():
+    batches = []
+
+    def generate(requests):
+        batches.append([name for _, name in requests])
+        return describe(requests)
+
+    with DocstringScheduler(generate, 1, batch_size=2, linger=60) as scheduler:
+        first = scheduler.submit("pass", "a")
+        time.sleep(0.1)
+        # The batch is sent as soon as it is full
+        second = scheduler.submit("pass", "b")
+        assert second.result(timeout=5) == "b: pass"
+        assert first.result() == "a: pass"
+
+    assert batches == [["a", "b"]]
+
+
+def test_scheduler_limits_batch_tokens():
+    batches = []
+
+    def generate(requests):
+        batches.append([name for _, name in requests])
+        return describe(requests)
+
+    scheduler = DocstringScheduler(
+        generate, 1, batch_size=10, max_batch_tokens=2, linger=0
+    )
+    with scheduler:
+        # Hold the worker until every request is pending
+        with scheduler._condition:
+            futures = [scheduler.submit("x" * 4, name) for name in "abc"]
+            futures.append(scheduler.submit("x" * 12, "d"))
+        for future in futures:
+            future.result()
+
+    # The first request of a batch is always sent, even above the limit
+    assert batches == [["a", "b"], ["c"], ["d"]]
+
+
+def test_scheduler_propagates_errors():
+    def generate(requests):
+        raise SystemExit(1)
+
+    with DocstringScheduler(generate, 1, batch_size=2) as scheduler:
+        futures = [scheduler.submit("pass", name) for name in ["a", "b"]]
+        for future in futures:
+            with pytest.raises(SystemExit):
+                future.result()
+
+
+def test_scheduler_rejects_requests_after_shutdown():
+    scheduler = DocstringScheduler(describe)
+    scheduler.shutdown()
+    with pytest.raises(RuntimeError):
+        scheduler.submit("pass", "foo")
+
+
+def test_scheduler_rejects_invalid_settings():
+    with pytest.raises(ValueError):
+        DocstringScheduler(describe, 0)
+    with pytest.raises(ValueError):
+        DocstringScheduler(describe, 1, batch_size=0)
+
+
+def test_scheduler_deduplicates_identical_requests():
+    requests = []
+    release = threading.Event()
+
+    def generate(batch):
+        release.wait(5)
+        requests.extend(batch)
+        return describe(batch)
+
+    with DocstringScheduler(generate, 2) as scheduler:
+        first = scheduler.submit("def foo():\n    pass", "foo")
+        # The same function, indented, while the first request is in flight
+        second = scheduler.submit("    def foo():\n        pass", "foo")
+        other = scheduler.submit("def foo():\n    pass", "bar")
+        release.set()
+        assert first.result() == "foo: def foo():\n    pass"
+        assert second is first
+        # The function is not generated again once its docstring is known
+        assert (
+            scheduler.submit("def foo():\n    pass", "foo").result() == first.result()
+        )
+        other.result()
+
+    assert [name for _, name in requests] == ["foo", "bar"]
+    assert scheduler.deduplicated == 2
+
+
+def test_scheduler_retries_failed_duplicates():
+    calls = []
+
+    def generate(batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise RuntimeError("failed")
+        return describe(batch)
+
+    with DocstringScheduler(generate, 1) as scheduler:
+        with pytest.raises(RuntimeError):
+            scheduler.submit("pass", "foo").result()
+        assert scheduler.submit("pass", "foo").result() == "foo: pass"
+
+    assert len(calls) == 2
+
+
+def test_scheduler_applies_backpressure():
+    started = threading.Event()
+    release = threading.Event()
+
+    def generate(batch):
+        started.set()
+        release.wait(5)
+        return describe(batch)
+
+    with DocstringScheduler(generate, 1, linger=0, max_pending=1) as scheduler:
+        first = scheduler.submit("pass", "foo")
+        started.wait(5)
+        second = scheduler.submit("pass", "bar")
+
+        # The queue is full, so the next submission waits for the worker
+        futures = []
+        submitter = threading.Thread(
+            target=lambda: futures.append(scheduler.submit("pass", "baz"))
+        )
+        submitter.start()
+        submitter.join(0.1)
+        assert submitter.is_alive()
+        # A duplicate does not need room in the queue
+        assert scheduler.submit("pass", "bar") is second
+
+        release.set()
+        submitter.join(5)
+        assert [future.result() for future in [first, second, futures[0]]] == [
+            "foo: pass",
+            "bar: pass",
+            "baz: pass",
+        ]
+
+
+def test_scheduler_forgets_old_requests():
+    calls = []
+
+    def generate(batch):
+        calls.extend(name for _, name in batch)
+        return describe(batch)
+
+    with DocstringScheduler(generate, deduplication_window=2) as scheduler:
+        for name in ["foo", "bar", "foo", "baz", "bar"]:
+            scheduler.submit("pass", name).result()
+
+    # foo was used again recently, bar was forgotten
+    assert calls == ["foo", "bar", "baz", "bar"]
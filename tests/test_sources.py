@@ -0,0 +1,115 @@
+import openai
+import os
+import pytest
+import subprocess
+import sys
+
+from autodocstrings.backends import CompletionBackend, RetryableError
+from autodocstrings.errors import RetriesExceededError
+from autodocstrings.sources import (
+    FunctionResult,
+    SourceDocumenter,
+    SourceResult,
+    document_sources,
+)
+from autodocstrings.stub_server import StubCompletionServer
+
+
+class RecordingBackend(CompletionBackend):
+    def __init__(self):
+        self.prompts = []
+
+    def complete(self, model, prompts, parameters):
+        self.prompts.extend(prompts)
+        return ["Docstring"] * len(prompts)
+
+
+class ThrottledBackend(CompletionBackend):
+    def complete(self, model, prompts, parameters):
+        raise RetryableError("Throttled")
+
+
+def test_document_sources():
+    sources = [
+        ("a.py", "def foo():\n    pass\n"),
+        ("b.py", 'class Bar:\n    def baz(self):\n        """Kept."""\n'),
+        ("c.py", "def broken(:\n    pass\n"),
+        ("d.py", "def foo():\n    pass\n"),
+    ]
+    with StubCompletionServer() as server:
+        results = document_sources(sources, concurrency=2, api_base=server.url)
+
+    assert [result.name for result in results] == ["a.py", "b.py", "c.py", "d.py"]
+    assert "Stub docstring for foo." in results[0].source
+    [function] = results[0].functions
+    assert (function.path, function.name) == ("foo", "foo")
+    assert function.docstring.strip() == "Stub docstring for foo."
+    assert results[0].error is None
+    # The existing docstrings are kept
+    assert results[1] == SourceResult("b.py", sources[1][1], [])
+    # The source which cannot be parsed is returned unchanged
+    assert results[2].source == sources[2][1] and results[2].functions == []
+    assert results[2].error is not None
+    # The identical functions are documented by a single request
+    assert results[3].source == results[0].source
+    assert server.requests == 1
+
+
+def test_source_documenter_shares_the_backend(mocker):
+    backend = RecordingBackend()
+    mocker.patch.object(backend, "close")
+    with SourceDocumenter(True, True, backend=backend, batch_size=4) as documenter:
+        first = documenter.document(
+            [
+                (
+                    "a",
+                    "class Foo:\n    def __init__(self):\n        pass\n    def bar(self):\n        'Old.'\n",
+                )
+            ]
+        )
+        second = documenter.document([("b", "def baz():\n    pass\n")])
+
+    # The constructor is skipped and the existing docstring replaced
+    assert first[0].functions == [FunctionResult("Foo.bar", "bar", "Docstring")]
+    assert "Old." not in first[0].source
+    assert second[0].functions == [FunctionResult("baz", "baz", "Docstring")]
+    assert len(backend.prompts) == 2
+    assert documenter.metrics.counter("documented_functions") == 2
+    # The backend is left open for its owner
+    backend.close.assert_not_called()
+
+
+def test_document_sources_with_openai(mocker):
+    choice = mocker.MagicMock(index=0, text="Docstring")
+    create = mocker.patch.object(
+        openai.Completion, "create", return_value=mocker.MagicMock(choices=[choice])
+    )
+
+    [result] = document_sources([("a", "def foo():\n    pass\n")], api_key="key")
+
+    assert result.functions == [FunctionResult("foo", "foo", "Docstring")]
+    assert create.call_args.kwargs["api_key"] == "key"
+
+
+def test_source_documenter_raises_api_errors(mocker):
+    mocker.patch("time.sleep")
+
+    with SourceDocumenter(backend=ThrottledBackend()) as documenter:
+        with pytest.raises(RetriesExceededError):
+            documenter.document([("a", "def foo():\n    pass\n")])
+
+
+def test_sources_do_not_load_the_command_line():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, autodocstrings.sources; print('autodocstrings.main' in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": root},
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,46 @@
+import json
+import sys
+import urllib.request
+
+import autodocstrings.stub_server
+
+from autodocstrings.stub_server import StubCompletionServer
+
+
+def post(url: str, payload: dict) -> dict:
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"))
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def test_stub_server_answers_every_prompt():
+    with StubCompletionServer(latency=0.01) as server:
+        response = post(
+            server.url + "/completions",
+            {"model": "model", "prompt": "for the foo python function"},
+        )
+
+    assert response["model"] == "model"
+    assert [choice["index"] for choice in response["choices"]] == [0]
+    assert "Stub docstring for foo." in response["choices"][0]["text"]
+
+
+def test_stub_server_failure_rates():
+    server = StubCompletionServer(throttle_rate=0.25, error_rate=0.25, seed=1)
+    statuses = [server.next_status() for _ in range(1000)]
+    server.server_close()
+
+    assert 200 < statuses.count(429) < 300
+    assert 200 < statuses.count(500) < 300
+    assert server.requests == 1000
+
+
+def test_main(mocker):
+    serve_forever = mocker.patch.object(
+        StubCompletionServer, "serve_forever", side_effect=KeyboardInterrupt
+    )
+    sys.argv = ["autodocstrings-stub-server", "--port", "0", "--latency", "0.5"]
+
+    autodocstrings.stub_server.main()
+
+    serve_forever.assert_called_once()
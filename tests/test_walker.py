@@ -0,0 +1,179 @@
+import os
+import pytest
+import tempfile
+
+from autodocstrings.walker import (
+    GitIgnore,
+    Shard,
+    iter_python_files,
+    matches_any,
+    parse_gitignore,
+)
+
+
+def create_tree(root: str, paths: list) -> None:
+    for path in paths:
+        full_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        open(full_path, "w").close()
+
+
+def relative_paths(root: str, files) -> list:
+    return [os.path.relpath(file, root).replace(os.sep, "/") for file in files]
+
+
+def test_iter_python_files_finds_python_files_in_order():
+    with tempfile.TemporaryDirectory() as root:
+        create_tree(root, ["b.py", "a.py", "notes.txt", "pkg/c.py", "pkg/sub/d.py"])
+        os.makedirs(os.path.join(root, ".git"))
+        create_tree(root, [".git/hooks/e.py"])
+
+        files = iter_python_files(root)
+        assert next(files) == os.path.join(root, "a.py")
+        assert relative_paths(root, files) == ["b.py", "pkg/c.py", "pkg/sub/d.py"]
+
+
+def test_iter_python_files_excludes_glob_patterns():
+    with tempfile.TemporaryDirectory() as root:
+        create_tree(
+            root,
+            [
+                "a.py",
+                "a_pb2.py",
+                "build/b.py",
+                "src/migrations/c.py",
+                "src/d.py",
+                "tests/test_e.py",
+            ],
+        )
+        files = iter_python_files(
+            root,
+            exclude_directories=["build", "*/src/migrations"],
+            exclude_files=["*_pb2.py", "test_*.py"],
+        )
+        assert relative_paths(root, files) == ["a.py", "src/d.py"]
+
+
+def test_iter_python_files_respects_gitignore():
+    with tempfile.TemporaryDirectory() as repository:
+        os.makedirs(os.path.join(repository, ".git"))
+        with open(os.path.join(repository, ".gitignore"), "w") as f:
+            f.write("# Virtual environments\n.venv/\n/generated.py\n*_pb2.py\n")
+        create_tree(
+            repository,
+            [
+                ".venv/lib/a.py",
+                "generated.py",
+                "src/generated.py",
+                "src/api_pb2.py",
+                "src/keep_pb2.py",
+                "src/vendor/b.py",
+                "src/vendor/c.py",
+                "src/d.py",
+                "tools/e.py",
+            ],
+        )
+        with open(os.path.join(repository, "src", ".gitignore"), "w") as f:
+            f.write("!keep_pb2.py\nvendor/*\n!vendor/c.py\n")
+
+        # The .gitignore files of the repository apply to its subdirectories
+        src = os.path.join(repository, "src")
+        assert relative_paths(src, iter_python_files(src)) == [
+            "d.py",
+            "generated.py",
+            "keep_pb2.py",
+            "vendor/c.py",
+        ]
+
+        # The .gitignore files of subdirectories only apply to them
+        assert relative_paths(repository, iter_python_files(repository)) == [
+            "src/d.py",
+            "src/generated.py",
+            "src/keep_pb2.py",
+            "src/vendor/c.py",
+            "tools/e.py",
+        ]
+
+        # They can be disregarded
+        assert len(list(iter_python_files(repository, respect_gitignore=False))) == 9
+
+
+def test_gitignore_outside_of_a_repository_only_uses_the_tree():
+    with tempfile.TemporaryDirectory() as parent:
+        with open(os.path.join(parent, ".gitignore"), "w") as f:
+            f.write("*.py\n")
+        root = os.path.join(parent, "root")
+        create_tree(root, ["a.py"])
+        assert relative_paths(root, iter_python_files(root)) == ["a.py"]
+        assert GitIgnore(root)._rules == []
+
+
+def test_parse_gitignore_patterns():
+    def ignored(pattern: str, path: str, is_directory: bool = False) -> bool:
+        matched = False
+        for rule in parse_gitignore([pattern]):
+            if rule.directory_only and not is_directory:
+                continue
+            if rule.regex.match(path):
+                matched = not rule.negated
+        return matched
+
+    assert ignored("*.py", "a/b.py")
+    assert not ignored("/*.py", "a/b.py")
+    assert ignored("a/*.py", "a/b.py")
+    assert not ignored("a/*.py", "a/c/b.py")
+    assert ignored("a/**/b.py", "a/c/d/b.py")
+    assert ignored("**/b.py", "b.py")
+    assert ignored("a/**", "a/b/c.py")
+    assert ignored("a**", "abc/d")
+    assert ignored("b?.py", "b1.py")
+    assert ignored("b[0-9].py", "b1.py")
+    assert not ignored("b[!0-9].py", "b1.py")
+    assert ignored("\\#b.py", "#b.py")
+    assert ignored("b.py\\ ", "b.py ")
+    assert ignored("build/", "build", is_directory=True)
+    assert not ignored("build/", "build")
+    assert parse_gitignore(["", "# Comment", "/", "!"]) == []
+
+
+def test_matches_any():
+    assert matches_any("src/build", ["build"])
+    assert matches_any("src/build/", ["build"])
+    assert matches_any("src/a_pb2.py", ["*_pb2.py"])
+    assert matches_any("src/gen/a.py", ["src/gen/*"])
+    assert not matches_any("src/a.py", ["b.py"])
+    assert not matches_any("src/a.py", [])
+
+
+def test_shard_parse():
+    assert Shard.parse("2/4") == Shard(2, 4)
+    assert str(Shard(2, 4)) == "2/4"
+
+    for value in ("0/4", "5/4", "1", "a/b"):
+        with pytest.raises(ValueError):
+            Shard.parse(value)
+
+
+def test_iter_python_files_by_shard():
+    def shards(root):
+        return [
+            {
+                os.path.relpath(file, root)
+                for file in iter_python_files(root, shard=Shard(i, 3))
+            }
+            for i in (1, 2, 3)
+        ]
+
+    paths = [f"package_{i}/module_{j}.py" for i in range(4) for j in range(5)]
+    with tempfile.TemporaryDirectory() as root:
+        create_tree(root, paths)
+
+        # Every file belongs to exactly one shard
+        first = shards(root)
+        assert all(first)
+        assert sorted(path for shard in first for path in shard) == sorted(paths)
+
+    # The shards do not depend on where the files are checked out
+    with tempfile.TemporaryDirectory() as root:
+        create_tree(root, paths)
+        assert shards(root) == first
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import threading
+
+from autodocstrings.watch import Watcher, diff_lines
+
+
+def write(file: str, contents: str) -> None:
+    with open(file, "w") as f:
+        f.write(contents)
+    # Make sure the modification time changes, even on coarse clocks
+    stat = os.stat(file)
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_diff_lines():
+    old = "a\nb\nc\nd\n"
+
+    assert diff_lines(old, old) == []
+    assert diff_lines(old, "a\nB\nc\nd\n") == [(2, 2)]
+    assert diff_lines(old, "a\nb\nx\ny\nc\nd\n") == [(3, 4)]
+    # Removed lines touch the lines around them
+    assert diff_lines(old, "a\nd\n") == [(1, 2)]
+    assert diff_lines(old, "b\nc\nd\n") == [(1, 1)]
+    assert diff_lines("", "a\n") == [(1, 1)]
+
+
+def test_watcher_reports_debounced_changes():
+    with tempfile.TemporaryDirectory() as test_dir:
+        changed_file = os.path.join(test_dir, "changed.py")
+        deleted_file = os.path.join(test_dir, "deleted.py")
+        touched_file = os.path.join(test_dir, "touched.py")
+        new_file = os.path.join(test_dir, "new.py")
+        for file in (changed_file, deleted_file, touched_file):
+            write(file, "def foo():\n    pass\n")
+
+        def list_files():
+            return [
+                os.path.join(test_dir, name) for name in sorted(os.listdir(test_dir))
+            ]
+
+        watcher = Watcher(list_files, interval=0.01, debounce=0.05)
+        changes = watcher.changes()
+
+        # A burst of saves is reported at once
+        write(changed_file, "def foo():\n    return 1\n")
+        write(new_file, "def bar():\n    pass\n")
+        write(touched_file, "def foo():\n    pass\n")
+        os.remove(deleted_file)
+        assert next(changes) == {changed_file: [(2, 2)], new_file: [(1, 2)]}
+
+        # The files written by the watcher's owner are not reported
+        write(changed_file, "def foo():\n    'Docstring'\n    return 1\n")
+        watcher.record(changed_file)
+        write(new_file, "def bar():\n    return 2\n")
+        # Saves during the debounce delay extend the burst
+        watcher.debounce = 0.5
+        threading.Timer(0.1, write, (new_file, "def bar():\n    return 3\n")).start()
+        assert next(changes) == {new_file: [(2, 2)]}
+
+
+def test_watcher_stops():
+    with tempfile.TemporaryDirectory() as test_dir:
+        file = os.path.join(test_dir, "file.py")
+        write(file, "pass\n")
+        watcher = Watcher(lambda: [file], interval=0.01, debounce=60)
+        changes = watcher.changes()
+
+        # Stop while a burst of saves is settling
+        write(file, "x = 1\n")
+        threading.Timer(0.1, watcher.stop).start()
+        assert list(changes) == []
+
+        # A file which cannot be read is forgotten
+        watcher.record(os.path.join(test_dir, "missing.py"))
+        assert list(watcher.changes()) == []
+
+
+def test_watcher_requeues_changes():
+    with tempfile.TemporaryDirectory() as test_dir:
+        file = os.path.join(test_dir, "file.py")
+        write(file, "a\nb\nc\n")
+        watcher = Watcher(lambda: [file], interval=0.01, debounce=0.02)
+        changes = watcher.changes()
+
+        write(file, "A\nb\nc\n")
+        assert next(changes) == {file: [(1, 1)]}
+
+        # The changes dropped by the owner are reported again with the next ones
+        write(file, "A\nb\nC\n")
+        watcher.requeue(file)
+        assert next(changes) == {file: [(1, 1), (3, 3)]}